@@ -1,23 +1,87 @@
 import math
-import pandas as pd
 import numpy as np
 from numpy import fft
 import sys
+from Profiler import Profiler
 
 class AmmarGrag:
 
-    def compute_leastsquares(self, t, H, x, F):
+    def __init__(self, cache=None, profiler=None):
+        """ initialise class
+
+        Arguments
+        ---------
+        cache (FactorCache) : shared cache of filters and gap systems (optional)
+        profiler (Profiler) : times 'levinson', 'whiten', 'gaps' and 'solve'
+                              (optional)
         """
-        AmmarGrag : 
+
+        self.cache = cache
+        self.profiler = Profiler(False) if profiler is None else profiler
+
+
+
+    def durbin_levinson(self, t, r=None, delta=None, ln_det_C=0.0):
+        """
+        durbin_levinson :
+            Durbin-Levinson recursion on the first column of C. It can be
+            continued from a previous, shorter, state.
+
+        Arguments
+        ---------
+        t (m*1 matrix)   : first column of Toeplitz covariance matrix C
+        r (p*1 matrix)   : previous state, order p+1 predictor (optional)
+        delta (float)    : previous prediction error variance
+        ln_det_C (float) : previous log(det(C))
+
+        Returns
+        -------
+        r (m-1*1 matrix) : order m predictor, e = x[m] + r.x[0:m] is the
+                           innovation of a new observation x[m]
+        delta (float)    : prediction error variance of order m predictor
+        ln_det_C (float) : log(det(C))
+        """
+
+        m = len(t)
+
+        #--- Start from scratch or from previous state
+        if r is None:
+            p = 0
+            r = np.zeros(m-1)
+            delta = t[0]
+            ln_det_C = math.log(delta)
+        else:
+            p = len(r)
+            r = np.concatenate((r,np.zeros(m-1-p)))
+
+        for i in range(p,m-1):
+            if i==0:
+                gamma = -t[i+1]/delta
+            else:
+                gamma = -(t[i+1] + np.dot(t[1:i+1],r[0:i]))/delta
+                r[1:i+1] = r[0:i] + gamma*r[i-1::-1]
+
+            r[0] = gamma
+            delta = t[0] + np.dot(t[1:i+2],r[i::-1])
+            ln_det_C += math.log(delta)
+
+        return [r,delta,ln_det_C]
+
+
+
+    def compute_leastsquares(self, t, H, x, F, key=None):
+        """
+        AmmarGrag :
             AmmarGrag minimization method
- 
+
         Arguments
         ---------
         t (m*1 matrix) : first column of Toeplitz covariance matrix C
         H (m*n matrix) : design matrix
         y (m*1 matrix) : observations
         F (m*k matrix) : Missing data matrix
-   
+        key (tuple)    : key of t in the cache (optional), see compute_cached
+
         Returns
         -------
         theta (n*1 matrix)    : estimated parameters
@@ -32,21 +96,130 @@ class AmmarGrag:
         #--- Get size of matrix F which number of columns = count missing data
         (m,k) = F.shape
 
+        #--- Currently there might be NaN's in H and x. Make those zero
+        gaps = np.isnan(x)
+        xm = np.where(gaps,0.0,x)
+        Hm = np.where(gaps[:,None],0.0,H)
+
+        if self.cache is None:
+            #--- Durbin-Levinson to compute l1 and l2, and their FFT
+            [l1,l2,Fl1,Fl2,ln_det_C] = self.compute_filters(t)
+
+            #--- Whiten x, the columns of H and the columns of F in one batch
+            [y1,y2] = self.whiten(Fl1,Fl2,np.column_stack((xm,Hm,F)))
+            G1 = y1[:,n+1:].T
+            G2 = y2[:,n+1:].T
+            gap = None
+        else:
+            #--- Filters and gap system shared by series with same m,
+            #    noise parameters and gap pattern
+            [Fl1,Fl2,ln_det_C,G1,G2,gap] = self.compute_cached(t,F,gaps,key)
+            [y1,y2] = self.whiten(Fl1,Fl2,np.column_stack((xm,Hm)))
+
+        A1 = y1[:,1:n+1].T
+        A2 = y2[:,1:n+1].T
+        y1 = y1[:,0]
+        y2 = y2[:,0]
+
+        return self.solve(y1,y2,A1,A2,G1,G2,ln_det_C,gap)
+
+
+
+    def compute_cached(self, t, F, gaps, key=None):
+        """
+        compute_cached :
+            Filters and factorized gap system, taken from the cache or
+            computed and stored in it
+
+        Arguments
+        ---------
+        t (m*1 matrix)    : first column of Toeplitz covariance matrix C
+        F (m*k matrix)    : Missing data matrix
+        gaps (m*1 matrix) : boolean mask of missing data
+        key (tuple)       : key of t, e.g. Covariance.cache_key, by default
+                            t is hashed
+
+        Returns
+        -------
+        Fl1, Fl2 (m+1*1 matrix) : rfft of l1 and l2
+        ln_det_C (float)        : log(det(C)) of complete series
+        G1, G2 (k*m matrix)     : (L1 @ F)' and (L2 @ F)'
+        gap (list)              : see factor_gaps
+        """
+
+        #--- Levinson only depends on t
+        if key is None:
+            key = self.cache.make_key(t)
+        filters = self.cache.get(key)
+        if filters is None:
+            [l1,l2,Fl1,Fl2,ln_det_C] = self.compute_filters(t)
+            filters = [Fl1,Fl2,ln_det_C]
+            self.cache.put(key,filters)
+        [Fl1,Fl2,ln_det_C] = filters
+
+        #--- k*k gap system depends on t and the gap pattern
+        key = (key, self.cache.make_key(gaps))
+        system = self.cache.get(key)
+        if system is None:
+            [G1,G2] = self.whiten(Fl1,Fl2,F)
+            G1 = G1.T
+            G2 = G2.T
+            with self.profiler.timer('gaps'):
+                gap = self.factor_gaps(G1,G2) if F.shape[1]>0 else None
+            system = [G1,G2,gap]
+            self.cache.put(key,system)
+
+        return filters + system
+
+
+
+    def factor_gaps(self, G1, G2):
+        """
+        factor_gaps :
+            Cholesky factorization of the k*k gap system G1 G1' - G2 G2'
+
+        Arguments
+        ---------
+        G1, G2 (k*m matrix) : (L1 @ F)' and (L2 @ F)'
+
+        Returns
+        -------
+        gap (list) : [Minv, ln_det_M], inverse of Cholesky factor M and
+                     2*log(det(M))
+        """
+
+        #--- Compute matrix M
+        M = np.linalg.cholesky(G1 @ G1.T - G2 @ G2.T)
+
+        return [np.linalg.inv(M), 2.0*np.sum(np.log(np.diag(M)))]
+
+
+
+    def compute_filters(self, t):
+        """
+        compute_filters :
+            Gohberg-Semencul factors of the inverse of C, C^-1 = L1'L1 - L2'L2
+            with L1 and L2 lower triangular Toeplitz matrices
+
+        Arguments
+        ---------
+        t (m*1 matrix) : first column of Toeplitz covariance matrix C
+
+        Returns
+        -------
+        l1 (2m*1 matrix)    : first column of L1, zero padded
+        l2 (2m*1 matrix)    : first column of L2, zero padded
+        Fl1 (m+1*1 matrix)  : rfft of l1
+        Fl2 (m+1*1 matrix)  : rfft of l2
+        ln_det_C (float)    : log(det(C))
+        """
+
+        m = len(t)
+
         #--- Durbin-Levinson to compute l1 and l2
-        r = np.zeros(m-1)
-        delta = t[0]
-        ln_det_C = math.log(delta)
-        for i in range(0,m-1):
-            if i==0:
-                gamma = -t[i+1]/delta
-            else:
-                gamma = -(t[i+1] + np.dot(t[1:i+1],r[0:i]))/delta
-                r[1:i+1] = r[0:i] + gamma*r[i-1::-1]
+        with self.profiler.timer('levinson'):
+            [r,delta,ln_det_C] = self.durbin_levinson(t)
 
-            r[0] = gamma
-            delta = t[0] + np.dot(t[1:i+2],r[i::-1])
-            ln_det_C += math.log(delta)
-    
         #--- create l1 & l2 using r
         l1 = np.zeros(2*m)
         l2 = np.zeros(2*m)
@@ -60,79 +233,175 @@ class AmmarGrag:
         l2 *= 1.0/math.sqrt(delta)
 
         #--- Perform FFT on l1 and l2
-        Fl1 = fft.fft(l1)
-        Fl2 = fft.fft(l2) 
+        Fl1 = fft.rfft(l1)
+        Fl2 = fft.rfft(l2)
 
-        #--- Currently there might be NaN's in H and x. Make those zero
-        xm = np.zeros(m)
-        Hm = np.zeros((m,n))
-        for i in range(0,m):
-            if math.isnan(x[i])==True:
-                xm[i]   = 0.0
-                Hm[i,:] = 0.0
-            else:
-                xm[i]   = x[i]
-                Hm[i,:] = H[i,:]
-
-        #--- Create auxiliary matrices and vectors
-        z   = np.zeros(m)
-        Fx  = fft.fft(np.concatenate((xm,z)))
-        y1  = (fft.ifft(Fl1 * Fx).real)[0:m]
-        y2  = (fft.ifft(Fl2 * Fx).real)[0:m]
-
-        #--- Design matrix
-        A1 = np.zeros((n,m))
-        A2 = np.zeros((n,m))
-        for i in range(0,n):
-            FH = fft.fft(np.concatenate((Hm[:,i].T,z)))
-            A1[i,:] = (fft.ifft(Fl1 * FH).real)[0:m]
-            A2[i,:] = (fft.ifft(Fl2 * FH).real)[0:m]
+        return [l1,l2,Fl1,Fl2,ln_det_C]
+
+
+
+    def solve(self, y1, y2, A1, A2, G1, G2, ln_det_C, gap=None):
+        """
+        solve :
+            Least-squares on whitened observations, design matrix and
+            missing data matrix
+
+        Arguments
+        ---------
+        y1, y2 (m*1 matrix) : L1 @ x and L2 @ x
+        A1, A2 (n*m matrix) : (L1 @ H)' and (L2 @ H)'
+        G1, G2 (k*m matrix) : (L1 @ F)' and (L2 @ F)'
+        ln_det_C (float)    : log(det(C)) of complete series
+        gap (list)          : factorized gap system, see factor_gaps (optional)
+
+        Returns
+        -------
+        theta (n*1 matrix)    : estimated parameters
+        C_theta  (n*n matrix) : covariance matrix of estimated parameters
+        ln_det_C (float)      : log(det(C))
+        sigma_eta (float)     : driving noise
+        """
+
+        m = len(y1)
+        k = G1.shape[0]
 
         #--- Only when there are missing data
         if k>0:
 
-            #--- matrix F
-            G1 = np.zeros((k,m))
-            G2 = np.zeros((k,m))
-            for i in range(0,k):
-                FF = fft.fft(np.concatenate((F[:,i].T,z)))
-                G1[i,:] = (fft.ifft(Fl1 * FF).real)[0:m]
-                G2[i,:] = (fft.ifft(Fl2 * FF).real)[0:m]
-
-            #--- Compute matrix M
-            M = np.linalg.cholesky(G1 @ G1.T - G2 @ G2.T)
-
-            #--- Update ln_det_C
-            for i in range(0,k):
-                ln_det_C += 2.0*math.log(M[i,i])
-
-            #--- Compute QA and Qy
-            Minv = np.linalg.inv(M)
-            QA = Minv @ (G1 @ A1.T - G2 @ A2.T)
-            Qy = Minv @ (G1 @ y1.T - G2 @ y2.T)
-
-            #--- Least-squares
-            C_theta = np.linalg.inv(A1 @ A1.T - A2 @ A2.T - QA.T @ QA)
-            theta = C_theta @ (A1 @ y1.T - A2 @ y2.T - QA.T @ Qy) 
-            
-            #--- Compute sigma_eta
-            t1 = y1 - A1.T @ theta
-            t2 = y2 - A2.T @ theta
-
-            #--- Compute Qt
-            Qt = Minv @ (G1 @ t1.T - G2 @ t2.T)
-
-            sigma_eta = math.sqrt((np.dot(t1,t1) - np.dot(t2,t2) \
+            with self.profiler.timer('gaps'):
+                #--- Compute matrix M
+                if gap is None:
+                    gap = self.factor_gaps(G1,G2)
+                [Minv,ln_det_M] = gap
+
+                #--- Update ln_det_C
+                ln_det_C += ln_det_M
+
+                #--- Compute QA and Qy
+                QA = Minv @ (G1 @ A1.T - G2 @ A2.T)
+                Qy = Minv @ (G1 @ y1.T - G2 @ y2.T)
+
+            with self.profiler.timer('solve'):
+                #--- Least-squares
+                C_theta = np.linalg.inv(A1 @ A1.T - A2 @ A2.T - QA.T @ QA)
+                theta = C_theta @ (A1 @ y1.T - A2 @ y2.T - QA.T @ Qy)
+
+                #--- Compute sigma_eta
+                t1 = y1 - A1.T @ theta
+                t2 = y2 - A2.T @ theta
+
+                #--- Compute Qt
+                Qt = Minv @ (G1 @ t1.T - G2 @ t2.T)
+
+                sigma_eta = math.sqrt((np.dot(t1,t1) - np.dot(t2,t2) \
 						      - np.dot(Qt,Qt))/(m-k))
         else:
-            #--- Least-squares with no missing data
-            C_theta = np.linalg.inv(A1 @ A1.T - A2 @ A2.T)
-            theta = C_theta @ (A1 @ y1.T - A2 @ y2.T) 
+            with self.profiler.timer('solve'):
+                #--- Least-squares with no missing data
+                C_theta = np.linalg.inv(A1 @ A1.T - A2 @ A2.T)
+                theta = C_theta @ (A1 @ y1.T - A2 @ y2.T)
+
+                #--- Compute sigma_eta
+                t1 = y1 - A1.T @ theta
+                t2 = y2 - A2.T @ theta
+                sigma_eta = math.sqrt((np.dot(t1,t1) - np.dot(t2,t2))/m)
+
+
+        return [theta,C_theta,ln_det_C,sigma_eta]
+
+
+
+    def whiten(self, Fl1, Fl2, X):
+        """
+        whiten :
+            Multiplies the columns of X by the lower triangular Toeplitz
+            matrices L1 and L2, using one batched FFT.
 
-            #--- Compute sigma_eta
-            t1 = y1 - A1.T @ theta
-            t2 = y2 - A2.T @ theta
-            sigma_eta = math.sqrt((np.dot(t1,t1) - np.dot(t2,t2))/m)
+        Arguments
+        ---------
+        Fl1 (m+1*1 matrix) : rfft of l1 (length 2m)
+        Fl2 (m+1*1 matrix) : rfft of l2 (length 2m)
+        X (m*p matrix)     : columns to whiten
+
+        Returns
+        -------
+        Y1 (m*p matrix) : L1 @ X
+        Y2 (m*p matrix) : L2 @ X
+        """
+
+        with self.profiler.timer('whiten'):
+            m = X.shape[0]
+            FX = fft.rfft(X,2*m,axis=0)
+            Y1 = fft.irfft(Fl1[:,None] * FX,2*m,axis=0)[0:m,:]
+            Y2 = fft.irfft(Fl2[:,None] * FX,2*m,axis=0)[0:m,:]
+
+        return [Y1,Y2]
+
+
+
+    def apply_inverse(self, Fl1, Fl2, V):
+        """
+        apply_inverse :
+            C^-1 V = L1'L1 V - L2'L2 V, the transposed products are the
+            whitening of the reversed columns, reversed again
+
+        Arguments
+        ---------
+        Fl1 (m+1*1 matrix) : rfft of l1 (length 2m)
+        Fl2 (m+1*1 matrix) : rfft of l2 (length 2m)
+        V (m*p matrix)     : columns
+
+        Returns
+        -------
+        W (m*p matrix) : C^-1 V
+        """
+
+        [Y1,Y2] = self.whiten(Fl1,Fl2,V)
+
+        return self.apply_transposed(Fl1,Fl2,Y1[::-1],Y2[::-1])[::-1]
+
+
+
+    def inverse_columns(self, l1, l2, Fl1, Fl2, columns):
+        """
+        inverse_columns :
+            Columns of C^-1 at the given epochs. L1 and L2 times a unit
+            vector are shifted copies of l1 and l2, only the transposed
+            products need FFTs
+
+        Arguments
+        ---------
+        l1, l2 (2m*1 matrix)     : first columns of L1 and L2, zero padded
+        Fl1, Fl2 (m+1*1 matrix)  : rfft of l1 and l2
+        columns (p*1 matrix)     : epochs (indexes) of the columns
+
+        Returns
+        -------
+        W (m*p matrix) : columns of C^-1
+        """
+
+        m = len(l1)//2
+
+        #--- Reversed L1 e_j, [m-1-i] = l1[m-1-i-j], zero where negative
+        i = np.arange(m)[:,None]
+        shift = 2*m-1-i-np.asarray(columns)[None,:]
+        padded1 = np.concatenate((np.zeros(m),l1[0:m]))
+        padded2 = np.concatenate((np.zeros(m),l2[0:m]))
+
+        return self.apply_transposed(Fl1,Fl2,padded1[shift],padded2[shift])[::-1]
+
+
+
+    def apply_transposed(self, Fl1, Fl2, R1, R2):
+        """
+        apply_transposed :
+            Reversed L1'Y1 - L2'Y2 from the reversed columns R1 and R2 of Y1
+            and Y2, one inverse FFT for both products
+        """
 
+        with self.profiler.timer('whiten'):
+            m = R1.shape[0]
+            FZ = Fl1[:,None]*fft.rfft(R1,2*m,axis=0) - Fl2[:,None]*fft.rfft(R2,2*m,axis=0)
+            Z = fft.irfft(FZ,2*m,axis=0)[0:m,:]
 
-        return [theta,C_theta,ln_det_C,sigma_eta]
\ No newline at end of file
+        return Z
@@ -0,0 +1,275 @@
+import os, time, math
+import numpy as np
+from support_readwrite import readControl, writeToFile
+
+class CostModel:
+
+    #--- Seconds per unit of work of each kernel, overwritten by calibrate
+    coefficients = {
+        'kernel'   : 1.2e-8,   # autocovariance, per epoch and noise model
+        'loop'     : 1.6e-7,   # Python loop iteration filling Fullcov matrix
+        'levinson' : 3.5e-9,   # Durbin-Levinson, per m^2
+        'fft'      : 5.4e-10,  # real FFT, per L*log2(L) and column
+        'dense'    : 5.3e-11,  # LAPACK/BLAS, per flop
+    }
+
+    #--- Methods chosen by default when they fit in the memory budget
+    DEFAULT_METHODS = ['Fullcov','AmmarGrag']
+
+    #--- Worker processes sharing the physical memory, set in every worker
+    #    of a pool by set_processes
+    processes = 1
+
+    def __init__(self, path=None):
+        """ initialise class, predicts time per likelihood evaluation and
+            peak memory of the minimization methods from the size of the
+            problem
+
+        Arguments
+        ---------
+        path (string) : calibrated coefficients written by calibrate
+                        (optional, built-in defaults otherwise)
+        """
+
+        self.coefficients = dict(CostModel.coefficients)
+        if path is not None:
+            self.coefficients.update(readControl(path))
+
+
+
+    def predict(self, m, k, n, Nmodels=1, iterations=20, chunk=None, logdet='exact'):
+        """ Predicted cost of each minimization method
+
+        Arguments
+        ---------
+        m (int)          : number of epochs
+        k (int)          : number of missing epochs
+        n (int)          : number of columns of design matrix
+        Nmodels (int)    : number of noise models
+        iterations (int) : conjugate gradient iterations assumed for Matfree
+        chunk (int)      : columns transformed at once by Matfree (optional)
+        logdet (string)  : log-determinant of Matfree, 'exact' or 'slq'
+
+        Returns
+        -------
+        costs (dict) : method : [seconds per evaluation, peak bytes]
+        """
+
+        c = self.coefficients
+        N = m - k
+        L = 2*m
+        fft = c['fft']*L*math.log2(max(L,2))
+        kernel = c['kernel']*m*Nmodels
+
+        #--- Dense F (m*k) and H are allocated by the caller, Matfree only
+        #    needs H
+        base = 8.0*(m*k + m*n)
+
+        costs = {}
+
+        #--- Fullcov : Python loops fill Cm, then Cholesky and two inverses
+        costs['Fullcov'] = [kernel + c['loop']*N*m + c['dense']*(N**3*(1.0/3.0 + 2.0) + N*N*n),
+                            base + 8.0*3*N*N]
+
+        #--- AmmarGrag : Levinson, whitening of x, H and F (one rfft and two
+        #    irfft per column), k*k gap system
+        costs['AmmarGrag'] = [kernel + c['levinson']*m*m + 3*fft*(n+1+k) \
+                              + c['dense']*(4.0*k*k*m + (1.0/3.0 + 2.0)*k**3 + 8.0*k*m*n),
+                              base + 8.0*(2*k*m + 2*k*k + 3*L*(n+1+k))]
+
+        #--- Matfree : Levinson for the preconditioner and log(det(C)), per
+        #    PCG iteration a product with C_oo (2 transforms) and C^-1 (6
+        #    transforms), C^-1 at the k gaps (3 transforms per column). The
+        #    copies of x and H with zero gaps, the Gohberg-Semencul filters
+        #    and the circulant embedding come first, the FFT work arrays
+        #    hold at most 'chunk' columns
+        from Matfree import Matfree
+        small = min(k,N)
+        columns = max(n+1,min(k,Matfree.GAP_CHUNK))
+        columns = columns if chunk is None else min(columns,chunk)
+        block = min(k,Matfree.GAP_CHUNK if chunk is None else chunk)
+        seconds = kernel + c['levinson']*m*m + 8*fft*iterations*(n+1)
+        memory = 8.0*m*n + 8.0*(3*m*(n+1) + 5*m + 3*L + 6*L*columns)
+        if logdet=='exact':
+            #--- In-place Cholesky factor of the smaller of the k*k and N*N
+            #    blocks, filled 'block' columns at a time through an index
+            #    array and a gathered copy, or through the symmetrized copy
+            correction = 3*fft*k if k<=N else c['dense']*N*N
+            costs['Matfree'] = [seconds + correction + c['dense']*small**3/3.0,
+                                memory + 8.0*(small*small + 2*small*block)]
+        else:
+            #--- Inverse Cholesky factors of the diagonal blocks of (C^-1)_gg
+            #    (at most 2*k*block with the padding), the probes and, per
+            #    probe run at once, Lanczos vectors at the gaps and an FFT
+            #    product with C^-1 (6 transforms) per step
+            probes = min(block,Matfree.SLQ_PROBES)
+            steps = Matfree.SLQ_PROBES*Matfree.SLQ_STEPS
+            costs['Matfree'] = [seconds + 3*fft*k + c['dense']*k*block*block \
+                                  + steps*(6*fft + c['dense']*4.0*k*block),
+                                memory + 8.0*(2*k*block + k*Matfree.SLQ_PROBES \
+                                  + (5*k + m + 6*L)*probes)]
+
+        return costs
+
+
+
+    def choose(self, m, k, n, Nmodels=1, budget=None, methods=None):
+        """ Fastest method whose peak memory fits in the budget, or the one
+            with the smallest peak memory if none fits
+
+        Arguments
+        ---------
+        m, k, n, Nmodels (int) : see predict
+        budget (float)         : available bytes, unlimited when None
+        methods (list)         : candidates, all predicted methods by default
+
+        Returns
+        -------
+        method (string) : chosen minimization method
+        cost (list)     : its [seconds per evaluation, peak bytes]
+        """
+
+        costs = self.predict(m,k,n,Nmodels)
+        if methods is None:
+            methods = list(costs.keys())
+
+        fits = [method for method in methods if budget is None or costs[method][1]<=budget]
+        if fits==[]:
+            method = min(methods, key=lambda method : costs[method][1])
+        else:
+            method = min(fits, key=lambda method : costs[method][0])
+
+        return [method,costs[method]]
+
+
+
+    def choose_default(self, m, k, n, Nmodels=1, budget=None):
+        """ Method for 'MinimizationMethod : Default', the fastest of the
+            established methods Fullcov and AmmarGrag that fits in the
+            budget. Matfree is only chosen when neither of them fits
+
+        Arguments
+        ---------
+        m, k, n, Nmodels (int) : see predict
+        budget (float)         : available bytes, unlimited when None
+
+        Returns
+        -------
+        method (string) : chosen minimization method
+        cost (list)     : its [seconds per evaluation, peak bytes]
+        """
+
+        [method,cost] = self.choose(m,k,n,Nmodels,budget,CostModel.DEFAULT_METHODS)
+        if budget is not None and cost[1]>budget:
+            [method,cost] = self.choose(m,k,n,Nmodels,budget)
+
+        return [method,cost]
+
+
+
+    def matfree_chunk(self, m, k, n, budget, logdet='exact'):
+        """ Largest number of columns Matfree may transform at once within
+            the budget, 0 if even one column does not fit
+        """
+
+        base = self.predict(m,k,n,chunk=0,logdet=logdet)['Matfree'][1]
+        column = self.predict(m,k,n,chunk=1,logdet=logdet)['Matfree'][1] - base
+        return int(max(0.0,budget - base)/column)
+
+
+
+    def matfree_logdet(self, m, k, n, budget):
+        """ Log-determinant of Matfree within the budget, 'exact' when the
+            dense block of the smaller of k*k and N*N fits with at least one
+            column, 'slq' otherwise
+        """
+
+        if self.matfree_chunk(m,k,n,budget,'exact')>=1:
+            return 'exact'
+        return 'slq'
+
+
+
+    @staticmethod
+    def memory_budget(control):
+        """ Bytes per process from 'MemoryBudget' (MB) in the control file,
+            otherwise half of the physical memory shared by the worker
+            processes (see set_processes), None if unknown
+        """
+
+        if 'MemoryBudget' in control:
+            return float(control['MemoryBudget'])*1.0e6
+        try:
+            return 0.5*os.sysconf('SC_PAGE_SIZE')*os.sysconf('SC_PHYS_PAGES')/CostModel.processes
+        except (AttributeError, ValueError, OSError):
+            return None
+
+
+
+    @staticmethod
+    def set_processes(processes):
+        """ Number of worker processes that share the physical memory, used
+            as initializer of a pool so that the default budget of each
+            worker is its share
+
+        Arguments
+        ---------
+        processes (int) : number of worker processes
+        """
+
+        CostModel.processes = max(1,int(processes))
+
+
+
+    def calibrate(self, path=None, repeat=3):
+        """ Times the kernels of the model on this machine and sets the
+            coefficients to the median seconds per unit of work
+
+        Arguments
+        ---------
+        path (string) : file where the coefficients are written (optional)
+        repeat (int)  : number of sizes timed per kernel
+
+        Returns
+        -------
+        coefficients (dict) : calibrated coefficients
+        """
+
+        from Covariance import Covariance
+        from AmmarGrag import AmmarGrag
+
+        def seconds(f):
+            t0 = time.perf_counter()
+            f()
+            return time.perf_counter() - t0
+
+        samples = {key : [] for key in self.coefficients}
+        cov = Covariance(['Powerlaw','White'])
+        method = AmmarGrag()
+        for i in range(0,repeat):
+            m = 1000*(i+1)
+
+            t = cov.create_t(m,[0.5,-0.5])
+            samples['kernel'].append(seconds(lambda : cov.create_t(m,[0.5,-0.5]))/(2*m))
+            samples['levinson'].append(seconds(lambda : method.durbin_levinson(t))/(m*m))
+
+            X = np.random.standard_normal((2*m,20))
+            L = 2*m
+            samples['fft'].append(seconds(lambda : np.fft.rfft(X,axis=0))/(20*L*math.log2(L)))
+
+            A = np.random.standard_normal((m//2,m//2))
+            A = A @ A.T + m*np.eye(m//2)
+            samples['dense'].append(seconds(lambda : np.linalg.inv(A))/(2.0*(m//2)**3))
+
+            def loop():
+                s = 0.0
+                for a in range(0,100):
+                    for b in range(0,m):
+                        s += t[abs(a-b)]
+            samples['loop'].append(seconds(loop)/(100*m))
+
+        self.coefficients = {key : float(np.median(v)) for key, v in samples.items()}
+        if path is not None:
+            writeToFile(self.coefficients, path)
+
+        return self.coefficients
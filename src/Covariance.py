@@ -4,26 +4,65 @@ import math
 
 class Covariance:
 
+    #--- kappa=-1 is not stationary, flicker noise is power-law noise with
+    #    the same limit as penalty_Powerlaw in every representation
+    FLICKER_KAPPA = -1.0 + 0.00001
 
-    def __init__(self,noisemodels):
+
+    def __init__(self,noisemodels,AR_p=1,MA_q=0,GGM_1mphi=6.9e-06, \
+                                              PowerlawApprox_L=1000):
         """ initialise class
 
         Arguments
         ---------
-        noisemodels (array string) : list of noise model names
+        noisemodels (array string) : list of noise model names, PLWN is
+                                     short for Powerlaw + White
+        AR_p (int) : number of AR coefficients of ARMA and ARFIMA
+        MA_q (int) : number of MA coefficients of ARMA and ARFIMA
+        GGM_1mphi (float) : 1-phi of the GGM models
+        PowerlawApprox_L (int) : length of truncated power-law kernel
         """
 
-        self.noisemodels = noisemodels[:]
+        self.noisemodels = []
+        for noisemodel in noisemodels:
+            if noisemodel=='PLWN':
+                self.noisemodels += ['Powerlaw','White']
+            else:
+                self.noisemodels.append(noisemodel)
         self.Nmodels = len(self.noisemodels)
         self.Nparam = self.Nmodels-1  # weight parameters
-        
+        self.AR_p = AR_p
+        self.MA_q = MA_q
+        self.GGM_1mphi = GGM_1mphi
+        self.phi = 1.0 - GGM_1mphi
+        self.L = PowerlawApprox_L
+
         #--- Do we need to estimate additional noise parameters?
+        self.Nparam_model = []
         for noisemodel in self.noisemodels:
             if noisemodel=='Powerlaw':
-                self.Nparam += 1
+                self.Nparam_model.append(1)
             elif noisemodel=='White':
-                self.Nparam += 0
-           
+                self.Nparam_model.append(0)
+            elif noisemodel=='Flicker':
+                self.Nparam_model.append(0)
+            elif noisemodel=='PowerlawApprox':
+                self.Nparam_model.append(1)
+            elif noisemodel=='GGM':
+                self.Nparam_model.append(1)
+            elif noisemodel=='FlickerGGM':
+                self.Nparam_model.append(0)
+            elif noisemodel=='RandomWalkGGM':
+                self.Nparam_model.append(0)
+            elif noisemodel=='ARMA':
+                self.Nparam_model.append(self.AR_p + self.MA_q)
+            elif noisemodel=='ARFIMA':
+                self.Nparam_model.append(self.AR_p + self.MA_q + 1)
+            else:
+                print('Unrecognizable noise model: {0:s}'.format(noisemodel))
+                sys.exit(0)
+        self.Nparam += sum(self.Nparam_model)
+
 
 
     def get_Nparam(self):
@@ -99,14 +138,34 @@ class Covariance:
 
         #--- Extra penalties for noise model parameters
         k = len(self.noisemodels)-1
-        for noisemodel in self.noisemodels:
-            method = getattr(self,'penalty_{0:s}'.format(noisemodel))
+        for i in range(0,self.Nmodels):
+            method = getattr(self,'penalty_{0:s}'.format(self.noisemodels[i]))
             penalty += method(k,param)
+            k += self.Nparam_model[i]
 
         return penalty
 
 
 
+    def cache_key(self,m,param):
+        """ Key of the autocovariance of create_t in a FactorCache, cheaper
+            than hashing t
+
+        Arguments
+        ---------
+        m (int) : length of time series
+        param (array float) : array of parameters to estimate
+
+        Returns
+        -------
+        key (tuple) : noise models, model options, m and parameters
+        """
+
+        return (tuple(self.noisemodels), self.AR_p, self.MA_q, self.GGM_1mphi, \
+                self.L, m, tuple(np.asarray(param,dtype=float).tolist()))
+
+
+
     def create_t(self,m,param):
         """
 
@@ -129,11 +188,188 @@ class Covariance:
             fraction = self.compute_fraction(i,param)
             method = getattr(self,'create_{0:s}_t'.format(self.noisemodels[i]))
             t += fraction*method(m,k,param)
+            k += self.Nparam_model[i]
 
         return t
 
 
 
+    def create_psd(self,f,param):
+        """ Power spectral density of the combined noise models
+
+        Arguments
+        ---------
+        f (array float) : frequencies in cycles per sampling period (0:0.5]
+        param (array float) : array of parameters to estimate
+
+        Returns
+        -------
+        G (array float) : PSD for a driving noise of unit variance
+        """
+
+        #--- Create empty PSD array
+        G = np.zeros(len(f))
+
+        #--- Add PSD of each noise model
+        k = self.Nmodels-1
+        for i in range(0,self.Nmodels):
+            fraction = self.compute_fraction(i,param)
+            method = getattr(self,'create_{0:s}_psd'.format(self.noisemodels[i]))
+            G += fraction*method(f,k,param)
+            k += self.Nparam_model[i]
+
+        return G
+
+
+
+    def compute_fractions(self,params):
+        """ Compute fractions of all noise models for many parameter vectors
+
+        Arguments
+        ---------
+        params (p*q matrix) : parameter vectors, one per row
+
+        Returns
+        -------
+        fractions (p*Nmodels matrix) : fraction of each noise model
+        """
+
+        #--- Constant
+        hpi = 2.0*math.atan(1.0)
+
+        p = params.shape[0]
+        if self.Nmodels==1:
+            return np.ones((p,1))
+
+        #--- Same products as compute_fraction, one column per model
+        fractions = np.ones((p,self.Nmodels))
+        for i in range(0,self.Nmodels):
+            fractions[:,i] = np.prod(np.sin(hpi*params[:,0:i]),axis=1)
+            if i<self.Nmodels-1:
+                fractions[:,i] *= np.cos(hpi*params[:,i])
+
+        return np.power(np.minimum(fractions,1.0),2.0)
+
+
+
+    def create_psd_batch(self,f,params,sigma_eta,sp):
+        """ One-sided power spectral density of the combined noise models
+            for many estimated parameter vectors at once, in physical units
+
+        Arguments
+        ---------
+        f (array float)         : frequencies in Hz
+        params (p*q matrix)     : parameter vectors, one per row
+        sigma_eta (array float) : driving noise of each parameter vector
+        sp (float)              : sampling period in days
+
+        Returns
+        -------
+        G (p*len(f) matrix) : PSD in unit^2/Hz
+        """
+
+        #--- Frequencies in cycles per sampling period
+        T = sp*86400.0
+        fc = np.asarray(f,dtype=float)*T
+        params = np.atleast_2d(np.asarray(params,dtype=float))
+        p = params.shape[0]
+        fractions = self.compute_fractions(params)
+
+        #--- Models without parameters are evaluated once, Powerlaw and GGM
+        #    broadcast a column of parameters against the row of frequencies
+        G = np.zeros((p,len(fc)))
+        k = self.Nmodels-1
+        for i in range(0,self.Nmodels):
+            method = getattr(self,'create_{0:s}_psd'.format(self.noisemodels[i]))
+            if self.Nparam_model[i]==0:
+                G_i = method(fc,k,params[0])
+            elif self.noisemodels[i] in ['Powerlaw','GGM']:
+                G_i = method(fc[None,:],k,params.T[:,:,None])
+            else:
+                G_i = np.array([method(fc,k,param) for param in params])
+            G += fractions[:,i,None]*G_i
+            k += self.Nparam_model[i]
+
+        #--- Scale by driving noise variance, one-sided PSD per Hz
+        sigma_eta = np.asarray(sigma_eta,dtype=float).reshape(-1,1)
+
+        return 2.0*T*np.power(sigma_eta,2.0)*G
+
+
+
+    def has_ss(self):
+        """ Do all noise models have a finite-order state-space form?
+
+        Returns
+        -------
+        True or False
+        """
+
+        for noisemodel in self.noisemodels:
+            if not hasattr(self,'create_{0:s}_ss'.format(noisemodel)):
+                return False
+        return True
+
+
+
+    def create_ss(self,param):
+        """ State-space representation of the combined noise models
+
+            y_i      = Z a_i + e_i,        var(e_i) = h
+            a_{i+1}  = T a_i + R eta_i,    var(eta_i) = 1
+
+        Arguments
+        ---------
+        param (array float) : array of parameters to estimate
+
+        Returns
+        -------
+        T  (s*s matrix) : transition matrix
+        R  (s*r matrix) : state noise matrix
+        Z  (s*1 matrix) : observation vector
+        P0 (s*s matrix) : covariance matrix of the initial state
+        h (float)       : variance of observation noise
+        """
+
+        T_list  = []
+        R_list  = []
+        Z_list  = []
+        P0_list = []
+        h = 0.0
+
+        #--- Stack the state of each noise model, scaled by its fraction
+        k = self.Nmodels-1
+        for i in range(0,self.Nmodels):
+            fraction = self.compute_fraction(i,param)
+            method = getattr(self,'create_{0:s}_ss'.format(self.noisemodels[i]))
+            [T_i,R_i,Z_i,P0_i,h_i] = method(k,param)
+            T_list.append(T_i)
+            R_list.append(math.sqrt(fraction)*R_i)
+            Z_list.append(Z_i)
+            P0_list.append(fraction*P0_i)
+            h += fraction*h_i
+            k += self.Nparam_model[i]
+
+        #--- Block diagonal matrices
+        s = sum([len(Z_i) for Z_i in Z_list])
+        r = sum([R_i.shape[1] for R_i in R_list])
+        T  = np.zeros((s,s))
+        R  = np.zeros((s,r))
+        P0 = np.zeros((s,s))
+        ii = jj = 0
+        for i in range(0,self.Nmodels):
+            (s_i,r_i) = R_list[i].shape
+            T[ii:ii+s_i,ii:ii+s_i]  = T_list[i]
+            R[ii:ii+s_i,jj:jj+r_i]  = R_list[i]
+            P0[ii:ii+s_i,ii:ii+s_i] = P0_list[i]
+            ii += s_i
+            jj += r_i
+        Z = np.concatenate(Z_list)
+
+        return [T,R,Z,P0,h]
+
+
+
     def create_Powerlaw_t(self,m,k,param):
         """ Create first row of covariance matrix of power-law noise
     
@@ -148,19 +384,17 @@ class Covariance:
         t (row (m,1)   ) : first row Toeplitz covariance matrix 
         """
 
-        #--- Constant
-        EPS = 1.0e-6
-
         #--- Parse param
         kappa = param[k]
         k += 1   # increase k for next model
 
-        #--- Create first row vector of Covariance matrix
-        t = np.zeros(m)
-
+        #--- Create first row vector of Covariance matrix, 
+        #    t[i] = (i - 0.5*kappa - 1.0)/(i + 0.5*kappa) * t[i-1]
+        t = np.empty(m)
         t[0] = math.gamma(1.0+kappa)/pow(math.gamma(1+0.5*kappa),2.0) 
-        for i in range(1,m):
-            t[i] = (i - 0.5*kappa - 1.0)/(i + 0.5*kappa) * t[i-1]
+        i = np.arange(1,m)
+        t[1:] = (i - 0.5*kappa - 1.0)/(i + 0.5*kappa)
+        np.cumprod(t,out=t)
 
         return t 
 
@@ -187,48 +421,717 @@ class Covariance:
         return t 
 
 
-  
-    def penalty_Powerlaw(self,k,param):
-        """ Computes penalty for power-law noise
+    def create_Flicker_t(self,m,k,param):
+        """ Create first row of covariance matrix of flicker noise
+    
+        Arguments
+        ---------
+        m (int) : length of time series
+        k (int) : index of param
+        param (array float) : --- nothing ---
+        
+        Returns
+        -------
+        t (row (m,1)   ) : first row Toeplitz covariance matrix 
+        """
+
+        return self.create_Powerlaw_t(m,0,[Covariance.FLICKER_KAPPA])
 
+
+
+    def create_PowerlawApprox_t(self,m,k,param):
+        """ Create first row of covariance matrix of power-law noise whose
+            impulse response is truncated after L terms. The autocovariance
+            is zero beyond lag L and costs O(L log L) for any m.
+    
         Arguments
         ---------
+        m (int) : length of time series
         k (int) : index of param
         param (array float) : spectral index
         
         Returns
         -------
-        penalty (float)
+        t (row (m,1)   ) : first row Toeplitz covariance matrix 
         """
 
-        LARGE = 1.0e8
-        penalty = 0.0 
-        kappa = param[k]
-        k += 1           # move one place for next model
-        #--- Check range of parameters
-        if kappa<-1.0:
-            penalty += (-1.0 - kappa)*LARGE
-            param[k-1] = -1.0 + 0.00001
-        elif kappa>1.0:
-            penalty += (kappa - 1.0)*LARGE
-            kappa = 1.0
-            param[k-1] = 1.0 - 0.00001
-        return penalty
+        #--- Truncated impulse response
+        h = self.create_PowerlawApprox_h(k,param)
+        L = len(h)
+
+        #--- Autocorrelation of h using FFT
+        nfft = 2**int(math.ceil(math.log2(2*L)))
+        Fh = np.fft.rfft(h,nfft)
+        t = np.zeros(m)
+        n = min(m,L)
+        t[0:n] = np.fft.irfft(Fh*np.conj(Fh),nfft)[0:n]
+
+        return t
+
+
+
+    def create_PowerlawApprox_h(self,k,param):
+        """ Truncated impulse response of power-law noise, (1-B)^(kappa/2)
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : spectral index
+
+        Returns
+        -------
+        h (array float) : first L coefficients of impulse response
+        """
+
+        #--- h[j] = (j - 1 + d)/j * h[j-1] with d = -kappa/2
+        d = -0.5*param[k]
+        j = np.arange(1,self.L)
+        h = np.ones(self.L)
+        h[1:] = (j - 1.0 + d)/j
+
+        return np.cumprod(h)
 
 
-  
-    def penalty_White(self,k,param):
-        """ Computes penalty for power-law noise
 
+    def create_GGM_t(self,m,k,param):
+        """ Create first row of covariance matrix of Generalised Gauss-Markov
+            noise (1 - phi B)^(kappa/2)
+    
+        Arguments
+        ---------
+        m (int) : length of time series
+        k (int) : index of param
+        param (array float) : spectral index
+        
+        Returns
+        -------
+        t (row (m,1)   ) : first row Toeplitz covariance matrix 
+        """
+
+        from scipy.special import hyp2f1
+
+        #--- Parse param
+        d = -0.5*param[k]
+        phi = self.phi
+        z = phi*phi
+
+        #--- Zero lag, t[0] = 2F1(d,d;1;phi^2)
+        t = np.zeros(m)
+        t[0] = hyp2f1(d,d,1.0,z)
+        if m==1 or d==0.0:
+            return t
+
+        #--- The other lags satisfy the three term recurrence
+        #      phi*(h+1-d)*t[h+1] = (1+phi^2)*h*t[h] - phi*(h-1+d)*t[h-1]
+        #    Evaluating hyp2f1 for each lag is slow and inaccurate near 1.
+        #    Forward recursion is stable when phi^(-2m) remains small,
+        #    otherwise use backward recursion (Miller) for decaying solution.
+        ln_phi = -math.log(phi)
+        if 2.0*m*ln_phi<10.0:
+            t[1] = d*phi*hyp2f1(d,d+1.0,2.0,z)
+            t0 = t[0]
+            t1 = t[1]
+            for h in range(1,m-1):
+                t2 = ((1.0+z)*h*t1 - phi*(h-1.0+d)*t0)/(phi*(h+1.0-d))
+                t[h+1] = t2
+                t0 = t1
+                t1 = t2
+        else:
+            top = min(m-1,int(600.0/ln_phi))          # avoid overflow
+            n = top + int(18.4/ln_phi) + 2            # phi^(2(n-top))<1e-16
+            t1 = 0.0
+            t0 = 1.0e-300
+            for h in range(n,0,-1):
+                t2 = ((1.0+z)*h*t0 - phi*(h+1.0-d)*t1)/(phi*(h-1.0+d))
+                if h-1<=top:
+                    t[h-1] = t2
+                t1 = t0
+                t0 = t2
+            t[0:top+1] *= hyp2f1(d,d,1.0,z)/t[0]
+
+        return t
+
+
+
+    def create_FlickerGGM_t(self,m,k,param):
+        """ Create first row of covariance matrix of GGM noise with kappa=-1
+    
         Arguments
         ---------
+        m (int) : length of time series
         k (int) : index of param
         param (array float) : --- nothing ---
         
         Returns
         -------
-        penalty (float)
+        t (row (m,1)   ) : first row Toeplitz covariance matrix 
         """
 
-        penalty = 0.0 
+        return self.create_GGM_t(m,0,[-1.0])
+
+
+
+    def create_RandomWalkGGM_t(self,m,k,param):
+        """ Create first row of covariance matrix of GGM noise with kappa=-2,
+            which is an AR(1) process with coefficient phi
+    
+        Arguments
+        ---------
+        m (int) : length of time series
+        k (int) : index of param
+        param (array float) : --- nothing ---
+        
+        Returns
+        -------
+        t (row (m,1)   ) : first row Toeplitz covariance matrix 
+        """
+
+        return np.power(self.phi,np.arange(m))/(1.0 - self.phi*self.phi)
+
+
+
+    def create_ARMA_t(self,m,k,param):
+        """ Create first row of covariance matrix of ARMA(p,q) noise
+    
+        Arguments
+        ---------
+        m (int) : length of time series
+        k (int) : index of param
+        param (array float) : AR coefficients followed by MA coefficients
+        
+        Returns
+        -------
+        t (row (m,1)   ) : first row Toeplitz covariance matrix 
+        """
+
+        from scipy.signal import lfilter, lfiltic
+
+        #--- First lags follow from the state-space form
+        [T,R,Z,P0,h] = self.create_ARMA_ss(k,param)
+        s = len(Z)
+        t = np.zeros(m)
+        TP = P0[:,0]
+        for i in range(0,min(s,m)):
+            t[i] = TP[0]
+            TP = T @ TP
+
+        #--- Remaining lags satisfy the AR recursion
+        phi = np.asarray(param[k:k+self.AR_p],dtype=float)
+        if m>s and self.AR_p>0:
+            a = np.concatenate(([1.0],-phi))
+            zi = lfiltic([1.0],a,t[s-1::-1])
+            t[s:] = lfilter([1.0],a,np.zeros(m-s),zi=zi)[0]
+
+        return t
+
+
+
+    def create_ARFIMA_t(self,m,k,param):
+        """ Create first row of covariance matrix of ARFIMA(p,d,q) noise. It
+            is the convolution of the ARMA and the fractional noise
+            autocovariances.
+    
+        Arguments
+        ---------
+        m (int) : length of time series
+        k (int) : index of param
+        param (array float) : AR coefficients, MA coefficients and d
+        
+        Returns
+        -------
+        t (row (m,1)   ) : first row Toeplitz covariance matrix 
+        """
+
+        from scipy.signal import fftconvolve
+
+        #--- Constant
+        EPS = 1.0e-10
+
+        #--- Parse param
+        d = param[k+self.AR_p+self.MA_q]
+
+        #--- ARMA autocovariance, truncated when negligible
+        t_arma = self.create_ARMA_t(m,k,param)
+        J = np.flatnonzero(np.abs(t_arma)>EPS*t_arma[0])[-1]
+        t_arma = np.concatenate((t_arma[J:0:-1],t_arma[0:J+1]))
+
+        #--- Fractional noise autocovariance for lags -J ... m-1+J
+        t_fn = self.create_Powerlaw_t(m+J,0,[-2.0*d])
+        t_fn = np.concatenate((t_fn[J:0:-1],t_fn))
+
+        return fftconvolve(t_arma,t_fn)[2*J:2*J+m]
+
+
+
+    def create_Powerlaw_psd(self,f,k,param):
+        """ PSD of power-law noise
+
+        Arguments
+        ---------
+        f (array float) : frequencies in cycles per sampling period
+        k (int) : index of param
+        param (array float) : spectral index
+
+        Returns
+        -------
+        G (array float) : PSD at frequencies f
+        """
+
+        #--- Parse param
+        kappa = param[k]
+
+        return np.power(2.0*np.sin(math.pi*f),kappa)
+
+
+
+    def create_White_psd(self,f,k,param):
+        """ PSD of white noise
+
+        Arguments
+        ---------
+        f (array float) : frequencies in cycles per sampling period
+        k (int) : index of param
+        param (array float) : --- nothing ---
+
+        Returns
+        -------
+        G (array float) : PSD at frequencies f
+        """
+
+        return np.ones(len(f))
+
+
+    def create_Flicker_psd(self,f,k,param):
+        """ PSD of flicker noise
+
+        Arguments
+        ---------
+        f (array float) : frequencies in cycles per sampling period
+        k (int) : index of param
+        param (array float) : --- nothing ---
+
+        Returns
+        -------
+        G (array float) : PSD at frequencies f
+        """
+
+        return self.create_Powerlaw_psd(f,0,[Covariance.FLICKER_KAPPA])
+
+
+
+    def create_PowerlawApprox_psd(self,f,k,param):
+        """ PSD of truncated power-law noise
+
+        Arguments
+        ---------
+        f (array float) : frequencies in cycles per sampling period
+        k (int) : index of param
+        param (array float) : spectral index
+
+        Returns
+        -------
+        G (array float) : PSD at frequencies f
+        """
+
+        #--- |sum h_j z^j|^2 on the unit circle (Horner)
+        h = self.create_PowerlawApprox_h(k,param)
+        z = np.exp(-2.0j*math.pi*np.asarray(f))
+
+        return np.abs(np.polyval(h[::-1],z))**2
+
+
+
+    def create_GGM_psd(self,f,k,param):
+        """ PSD of Generalised Gauss-Markov noise
+
+        Arguments
+        ---------
+        f (array float) : frequencies in cycles per sampling period
+        k (int) : index of param
+        param (array float) : spectral index
+
+        Returns
+        -------
+        G (array float) : PSD at frequencies f
+        """
+
+        #--- Parse param
+        kappa = param[k]
+
+        return np.power(1.0 + self.phi*self.phi - \
+                        2.0*self.phi*np.cos(2.0*math.pi*f),0.5*kappa)
+
+
+
+    def create_FlickerGGM_psd(self,f,k,param):
+        """ PSD of GGM noise with kappa=-1
+
+        Arguments
+        ---------
+        f (array float) : frequencies in cycles per sampling period
+        k (int) : index of param
+        param (array float) : --- nothing ---
+
+        Returns
+        -------
+        G (array float) : PSD at frequencies f
+        """
+
+        return self.create_GGM_psd(f,0,[-1.0])
+
+
+
+    def create_RandomWalkGGM_psd(self,f,k,param):
+        """ PSD of GGM noise with kappa=-2
+
+        Arguments
+        ---------
+        f (array float) : frequencies in cycles per sampling period
+        k (int) : index of param
+        param (array float) : --- nothing ---
+
+        Returns
+        -------
+        G (array float) : PSD at frequencies f
+        """
+
+        return 1.0/(1.0 + self.phi*self.phi - 2.0*self.phi*np.cos(2.0*math.pi*f))
+
+
+
+    def create_ARMA_psd(self,f,k,param):
+        """ PSD of ARMA(p,q) noise
+
+        Arguments
+        ---------
+        f (array float) : frequencies in cycles per sampling period
+        k (int) : index of param
+        param (array float) : AR coefficients followed by MA coefficients
+
+        Returns
+        -------
+        G (array float) : PSD at frequencies f
+        """
+
+        #--- Parse param
+        phi   = np.asarray(param[k:k+self.AR_p],dtype=float)
+        theta = np.asarray(param[k+self.AR_p:k+self.AR_p+self.MA_q],dtype=float)
+
+        #--- |theta(z)|^2/|phi(z)|^2 on the unit circle
+        z = np.exp(-2.0j*math.pi*np.outer(f,np.arange(1,max(self.AR_p,self.MA_q)+1)))
+        num = 1.0 + z[:,0:self.MA_q] @ theta
+        den = 1.0 - z[:,0:self.AR_p] @ phi
+
+        return np.abs(num)**2/np.abs(den)**2
+
+
+
+    def create_ARFIMA_psd(self,f,k,param):
+        """ PSD of ARFIMA(p,d,q) noise
+
+        Arguments
+        ---------
+        f (array float) : frequencies in cycles per sampling period
+        k (int) : index of param
+        param (array float) : AR coefficients, MA coefficients and d
+
+        Returns
+        -------
+        G (array float) : PSD at frequencies f
+        """
+
+        #--- Parse param
+        d = param[k+self.AR_p+self.MA_q]
+
+        return self.create_ARMA_psd(f,k,param) * \
+                                  self.create_Powerlaw_psd(f,0,[-2.0*d])
+
+
+
+    def create_White_ss(self,k,param):
+        """ State-space form of white noise, only observation noise
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : --- nothing ---
+
+        Returns
+        -------
+        [T,R,Z,P0,h] : see create_ss
+        """
+
+        return [np.zeros((0,0)),np.zeros((0,0)),np.zeros(0),np.zeros((0,0)),1.0]
+
+
+
+    def create_RandomWalkGGM_ss(self,k,param):
+        """ State-space form of GGM noise with kappa=-2, AR(1)
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : --- nothing ---
+
+        Returns
+        -------
+        [T,R,Z,P0,h] : see create_ss
+        """
+
+        T  = np.array([[self.phi]])
+        R  = np.ones((1,1))
+        Z  = np.ones(1)
+        P0 = np.array([[1.0/(1.0 - self.phi*self.phi)]])
+
+        return [T,R,Z,P0,0.0]
+
+
+
+    def create_ARMA_ss(self,k,param):
+        """ State-space form of ARMA(p,q) noise (Harvey)
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : AR coefficients followed by MA coefficients
+
+        Returns
+        -------
+        [T,R,Z,P0,h] : see create_ss
+        """
+
+        from scipy.linalg import solve_discrete_lyapunov
+
+        #--- Parse param
+        p = self.AR_p
+        q = self.MA_q
+        s = max(p,q+1)
+
+        #--- Companion form
+        T = np.zeros((s,s))
+        T[0:p,0] = param[k:k+p]
+        T[0:s-1,1:s] = np.eye(s-1)
+        R = np.zeros((s,1))
+        R[0,0] = 1.0
+        R[1:q+1,0] = param[k+p:k+p+q]
+        Z = np.zeros(s)
+        Z[0] = 1.0
+
+        #--- Stationary covariance of the state
+        P0 = solve_discrete_lyapunov(T,R @ R.T)
+
+        return [T,R,Z,P0,0.0]
+
+
+  
+    def penalty_Powerlaw(self,k,param):
+        """ Computes penalty for power-law noise
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : spectral index
+        
+        Returns
+        -------
+        penalty (float)
+        """
+
+        LARGE = 1.0e8
+        penalty = 0.0 
+        kappa = param[k]
+        k += 1           # move one place for next model
+        #--- Check range of parameters
+        if kappa<-1.0:
+            penalty += (-1.0 - kappa)*LARGE
+            param[k-1] = -1.0 + 0.00001
+        elif kappa>1.0:
+            penalty += (kappa - 1.0)*LARGE
+            kappa = 1.0
+            param[k-1] = 1.0 - 0.00001
+        return penalty
+
+
+  
+    def penalty_White(self,k,param):
+        """ Computes penalty for power-law noise
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : --- nothing ---
+        
+        Returns
+        -------
+        penalty (float)
+        """
+
+        penalty = 0.0 
+        return penalty
+
+
+
+    def penalty_RandomWalkGGM(self,k,param):
+        """ Computes penalty for GGM noise with kappa=-2
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : --- nothing ---
+        
+        Returns
+        -------
+        penalty (float)
+        """
+
+        penalty = 0.0 
+        return penalty
+
+
+
+    def penalty_ARMA(self,k,param):
+        """ Computes penalty for ARMA noise, the AR part must be stationary
+            and the MA part invertible
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : AR coefficients followed by MA coefficients
+        
+        Returns
+        -------
+        penalty (float)
+        """
+
+        LARGE = 1.0e8
+        penalty = 0.0 
+
+        #--- Roots of z^p - phi_1 z^(p-1) - ... - phi_p must be inside unit circle
+        if self.AR_p>0:
+            phi = np.asarray(param[k:k+self.AR_p],dtype=float)
+            root = np.max(np.abs(np.roots(np.concatenate(([1.0],-phi)))))
+            if root>0.999:
+                penalty += (root - 0.999)*LARGE
+                #--- scaling phi_i by c^i scales the roots by c
+                for i in range(0,self.AR_p):
+                    param[k+i] *= pow(0.999/root,i+1)
+
+        #--- Same for MA polynomial
+        if self.MA_q>0:
+            theta = np.asarray(param[k+self.AR_p:k+self.AR_p+self.MA_q],dtype=float)
+            root = np.max(np.abs(np.roots(np.concatenate(([1.0],theta)))))
+            if root>0.999:
+                penalty += (root - 0.999)*LARGE
+                for i in range(0,self.MA_q):
+                    param[k+self.AR_p+i] *= pow(0.999/root,i+1)
+
+        return penalty
+
+
+
+    def penalty_Flicker(self,k,param):
+        """ Computes penalty for flicker noise
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : --- nothing ---
+        
+        Returns
+        -------
+        penalty (float)
+        """
+
+        penalty = 0.0 
+        return penalty
+
+
+
+    def penalty_PowerlawApprox(self,k,param):
+        """ Computes penalty for truncated power-law noise
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : spectral index
+        
+        Returns
+        -------
+        penalty (float)
+        """
+
+        return self.penalty_Powerlaw(k,param)
+
+
+
+    def penalty_GGM(self,k,param):
+        """ Computes penalty for GGM noise
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : spectral index
+        
+        Returns
+        -------
+        penalty (float)
+        """
+
+        LARGE = 1.0e8
+        penalty = 0.0 
+        kappa = param[k]
+        #--- Check range of parameters
+        if kappa<-2.0:
+            penalty += (-2.0 - kappa)*LARGE
+            param[k] = -2.0 + 0.00001
+        elif kappa>2.0:
+            penalty += (kappa - 2.0)*LARGE
+            param[k] = 2.0 - 0.00001
+        return penalty
+
+
+
+    def penalty_FlickerGGM(self,k,param):
+        """ Computes penalty for GGM noise with kappa=-1
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : --- nothing ---
+        
+        Returns
+        -------
+        penalty (float)
+        """
+
+        penalty = 0.0 
+        return penalty
+
+
+
+    def penalty_ARFIMA(self,k,param):
+        """ Computes penalty for ARFIMA noise, ARMA part as for ARMA and
+            d must be in the stationary range
+
+        Arguments
+        ---------
+        k (int) : index of param
+        param (array float) : AR coefficients, MA coefficients and d
+        
+        Returns
+        -------
+        penalty (float)
+        """
+
+        LARGE = 1.0e8
+        penalty = self.penalty_ARMA(k,param)
+        i = k+self.AR_p+self.MA_q
+        d = param[i]
+        #--- Check range of parameters
+        if d<-0.5:
+            penalty += (-0.5 - d)*LARGE
+            param[i] = -0.5 + 0.00001
+        elif d>0.5:
+            penalty += (d - 0.5)*LARGE
+            param[i] = 0.5 - 0.00001
         return penalty
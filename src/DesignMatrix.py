@@ -4,7 +4,7 @@ import numpy as np
 class DesignMatrix:
 
     @classmethod
-    def create_DesignMatrix(cls, sp, offsets, tsindexes, periods):
+    def create_DesignMatrix(cls, sp, offsets, tsindexes, periods, first=0, m_centre=None):
         """
         create_DesignMatrix :
             Creates a Design matrix according to specifications in its arguments.
@@ -19,6 +19,10 @@ class DesignMatrix:
             List that contains the timeseries' indexes.
         periods : list
             List of periodic signals in unit days.
+        first : int
+            Index of the first epoch in 'tsindexes', when these extend an existing series.
+        m_centre : int
+            Length of the series the trend is centred on, by default the length of 'tsindexes'.
 
         Returns
         -------
@@ -41,22 +45,63 @@ class DesignMatrix:
             print('Zero length of time series!? am crashing...')
             sys.exit()
             
+        if m_centre is None:
+            m_centre = m
+
         n = 2 + 2 * n_periods + n_offsets
         H = np.zeros((m,n))
         
-        for i in range(0,m):
+        for ii in range(0,m):
             
-            H[i,0] = 1.0
-            H[i,1] = i - 0.5 * (m-1)
+            i = first + ii
+            H[ii,0] = 1.0
+            H[ii,1] = i - 0.5 * (m_centre-1)
 
             #   Calculate value with each periodic signals    
             for j in range(0, n_periods):
-                H[i, 2+2*j+0] = math.cos(2*math.pi * i * sp/periods[j])
-                H[i, 2+2*j+1] = math.sin(2*math.pi * i * sp/periods[j])
+                H[ii, 2+2*j+0] = math.cos(2*math.pi * i * sp/periods[j])
+                H[ii, 2+2*j+1] = math.sin(2*math.pi * i * sp/periods[j])
             
             for k in range(0, n_offsets):
-                if offsets[k] < tsindexes[i] + EPS:
-                    H[i, 2+2*n_periods+k] = 1.0
+                if offsets[k] < tsindexes[ii] + EPS:
+                    H[ii, 2+2*n_periods+k] = 1.0
                     
         #   Return the design matrix
         return H
+
+
+    @classmethod
+    def create_postseismic(cls, tsindexes, log, exp):
+        """
+        create_postseismic :
+            Creates the columns of postseismic relaxations, to be appended to a design matrix.
+
+        Parameters
+        ----------
+        tsindexes : list
+            List that contains the timeseries' indexes.
+        log : list
+            List of [epoch, relaxation time] pairs, log(1 + dt/T) after the epoch.
+        exp : list
+            List of [epoch, relaxation time] pairs, 1 - exp(-dt/T) after the epoch.
+
+        Returns
+        -------
+        H : numpy [m,len(log)+len(exp)]
+            Postseismic columns, zero before each epoch.
+        """
+
+        t = np.asarray(tsindexes, dtype=float)[:,None]
+        columns = [np.zeros((len(t),0))]
+
+        if len(log) > 0:
+            [t0,T] = np.asarray(log, dtype=float).T
+            dt = np.maximum(t - t0, 0.0)
+            columns.append(np.log1p(dt/T))
+
+        if len(exp) > 0:
+            [t0,T] = np.asarray(exp, dtype=float).T
+            dt = np.maximum(t - t0, 0.0)
+            columns.append(-np.expm1(-dt/T))
+
+        return np.hstack(columns)
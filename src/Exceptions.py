@@ -3,3 +3,6 @@ class FileMalformationError(Exception):
 
 class UnidentifiedHeaderError(Exception):
     pass
+
+class MemoryBudgetError(MemoryError):
+    pass
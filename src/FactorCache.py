@@ -0,0 +1,111 @@
+import hashlib
+import numpy as np
+from collections import OrderedDict
+
+class FactorCache:
+
+    def __init__(self, maxsize=16, maxbytes=256*2**20):
+        """ initialise class, least recently used cache of factorizations
+            that can be shared by series with the same length, gap pattern
+            and noise parameters (e.g. the three components of a station).
+            A gap system of AmmarGrag holds two k*m and one k*k matrix, so
+            the cache is bounded by the bytes of its arrays as well.
+
+        Arguments
+        ---------
+        maxsize (int)  : maximum number of stored factorizations
+        maxbytes (int) : maximum number of bytes of the stored arrays, a
+                         factorization larger than this is not stored
+        """
+
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+
+    def make_key(self, *arrays):
+        """ Key of a factorization
+
+        Arguments
+        ---------
+        arrays (numpy arrays) : e.g. the gap mask. Hashing is O(m), callers
+                                that know the noise parameters should use
+                                those to key the autocovariance instead of t
+
+        Returns
+        -------
+        key (tuple) : shapes and hashes of the arrays
+        """
+
+        key = []
+        for a in arrays:
+            a = np.ascontiguousarray(a)
+            if a.dtype==bool:
+                a = np.packbits(a)
+            key.append((a.shape, hashlib.sha1(a.tobytes()).hexdigest()))
+        return tuple(key)
+
+
+
+    def get(self, key):
+        """ Returns stored factorization or None
+        """
+
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+
+
+    def size(self, value):
+        """ Number of bytes of the numpy arrays in a factorization
+
+        Arguments
+        ---------
+        value (list) : arrays, floats or nested lists of them
+
+        Returns
+        -------
+        nbytes (int) : sum of nbytes of the arrays
+        """
+
+        if isinstance(value, np.ndarray):
+            return value.nbytes
+        if isinstance(value, (list,tuple)):
+            return sum(self.size(v) for v in value)
+        return 0
+
+
+
+    def put(self, key, value):
+        """ Stores factorization, removing the least recently used ones while
+            there are more than maxsize entries or maxbytes bytes
+        """
+
+        nbytes = self.size(value)
+        if key in self.entries:
+            self.nbytes -= self.size(self.entries.pop(key))
+        if nbytes>self.maxbytes:
+            return
+        self.entries[key] = value
+        self.nbytes += nbytes
+        while len(self.entries)>self.maxsize or self.nbytes>self.maxbytes:
+            self.nbytes -= self.size(self.entries.popitem(last=False)[1])
+
+
+
+    def clear(self):
+        """ Removes all stored factorizations
+        """
+
+        self.entries.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
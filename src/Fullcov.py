@@ -1,10 +1,21 @@
 import math
-import pandas as pd
 import numpy as np
-from numpy import fft
+from Profiler import Profiler
 
 class Fullcov:
 
+    def __init__(self, profiler=None):
+        """ initialise class
+
+        Arguments
+        ---------
+        profiler (Profiler) : times 'gaps', 'cholesky' and 'solve' (optional)
+        """
+
+        self.profiler = Profiler(False) if profiler is None else profiler
+
+
+
     def compute_leastsquares(self, t, H, x, F):
         """
         Fullcov :
@@ -31,41 +42,44 @@ class Fullcov:
         #--- Get size of matrix F which number of columns = count missing data
         (m,k) = F.shape
        
-        #--- leave out rows & colums with gaps 
-        xm = np.zeros((m-k))
-        Hm = np.zeros((m-k,n))
-        Cm = np.zeros((m-k,m-k))
-        ii = 0
-        for i in range(0,m): 
-            if not math.isnan(x[i]):
-                xm[ii] = x[i]
-                Hm[ii,:] = H[i,:]
-                jj = 0
-                for j in range(0,m):
-                    if not math.isnan(x[j]):
-                        Cm[ii,jj] = t[abs(j-i)]
-                        jj += 1
-                ii += 1
+        with self.profiler.timer('gaps'):
+            #--- leave out rows & colums with gaps 
+            xm = np.zeros((m-k))
+            Hm = np.zeros((m-k,n))
+            Cm = np.zeros((m-k,m-k))
+            ii = 0
+            for i in range(0,m): 
+                if not math.isnan(x[i]):
+                    xm[ii] = x[i]
+                    Hm[ii,:] = H[i,:]
+                    jj = 0
+                    for j in range(0,m):
+                        if not math.isnan(x[j]):
+                            Cm[ii,jj] = t[abs(j-i)]
+                            jj += 1
+                    ii += 1
 
-        #--- Already compute inverse of C
-        U = np.linalg.cholesky(Cm)
-        U_inv = np.linalg.inv(U)
-        A = U_inv @ Hm
-        y = U_inv @ xm
+        with self.profiler.timer('cholesky'):
+            #--- Already compute inverse of C
+            U = np.linalg.cholesky(Cm)
+            U_inv = np.linalg.inv(U)
+            A = U_inv @ Hm
+            y = U_inv @ xm
 
-        #--- Compute logarithm of determinant of C
-        ln_det_C = 0.0
-        for i in range(0,m-k):
-            ln_det_C += math.log(U[i,i])
-        ln_det_C *= 2.0
+            #--- Compute logarithm of determinant of C
+            ln_det_C = 0.0
+            for i in range(0,m-k):
+                ln_det_C += math.log(U[i,i])
+            ln_det_C *= 2.0
 
-        #--- Compute C_theta
-        C_theta = np.linalg.inv(A.T @ A)
-        theta = C_theta @ (A.T @ y)
+        with self.profiler.timer('solve'):
+            #--- Compute C_theta
+            C_theta = np.linalg.inv(A.T @ A)
+            theta = C_theta @ (A.T @ y)
 
-        #--- Compute model, whitened residuals and sigma_eta
-        yhat = A @ theta
-        r = y - yhat
-        sigma_eta = math.sqrt(np.dot(r,r)/(m-k))
+            #--- Compute model, whitened residuals and sigma_eta
+            yhat = A @ theta
+            r = y - yhat
+            sigma_eta = math.sqrt(np.dot(r,r)/(m-k))
 
         return [theta,C_theta,ln_det_C,sigma_eta]
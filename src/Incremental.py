@@ -0,0 +1,320 @@
+import math, json
+import numpy as np
+from AmmarGrag import AmmarGrag
+from Covariance import Covariance
+from DesignMatrix import DesignMatrix
+from MLE import MLE
+
+class Incremental:
+
+    def __init__(self, mjd, x, sp, offsets, periods, cov, min_method='AmmarGrag', \
+                 reestimate_every=30, drift_tol=0.05, param=None):
+        """ initialise class, noise parameters are estimated from scratch.
+            New epochs are added with append, which costs O(m) for fixed
+            noise parameters.
+
+        Arguments
+        ---------
+        mjd (array float)      : epochs of observations
+        x (array float)        : observations (may contain NaN's)
+        sp (float)             : sampling period
+        offsets (list)         : epochs of offsets
+        periods (list)         : periodic signals in unit days
+        cov (Covariance)       : noise models
+        min_method (string)    : minimization method of full estimation
+        reestimate_every (int) : number of new epochs after which the noise
+                                 parameters are estimated again
+        drift_tol (float)      : change of log-likelihood per epoch that
+                                 triggers a new estimation
+        param (array float)    : noise parameters of a previous estimation,
+                                 skips the full estimation when given
+        """
+
+        #--- Copy observations into class
+        self.mjd = np.array(mjd, dtype=float)
+        self.x   = np.array(x, dtype=float)
+        self.sp  = sp
+        self.offsets = offsets[:]
+        self.periods = periods[:]
+        self.cov = cov
+        self.min_method = min_method
+        self.reestimate_every = reestimate_every
+        self.drift_tol = drift_tol
+        self.levinson = AmmarGrag()
+
+        #--- Estimate noise parameters and set up incremental state
+        if param is None:
+            self.estimate()
+        else:
+            self.param = np.array(param, dtype=float)
+            self.seed(None)
+
+
+
+    def estimate(self):
+        """ Full estimation of noise parameters with MLE, followed by new
+            incremental state
+        """
+
+        #--- Design matrix and missing data matrix
+        m = len(self.x)
+        H = DesignMatrix.create_DesignMatrix(self.sp, self.offsets, self.mjd, self.periods)
+        gaps = np.flatnonzero(np.isnan(self.x))
+        F = np.zeros((m,len(gaps)))
+        F[gaps,np.arange(len(gaps))] = 1.0
+
+        #--- Previous solution is the initial guess
+        param0 = getattr(self,'param',None)
+        mle = MLE(self.x, F, self.min_method, H, self.cov)
+        [theta,C_theta,ln_det_C,sigma_eta,param] = mle.estimate_parameters(param0)
+        self.param = param
+
+        self.seed(theta)
+
+        #--- Gaps are only approximated by seed, start from the exact solution
+        if len(gaps)>0:
+            self.N = m - len(gaps)
+            self.normal = np.linalg.inv(C_theta/pow(sigma_eta,2.0))
+            self.rhs = self.normal @ theta
+            self.ss = pow(sigma_eta,2.0)*self.N + np.dot(self.rhs,theta)
+            self.ln_det_C = ln_det_C
+            self.solve()
+            self.logL0 = self.log_likelihood()/self.N
+
+
+
+    def seed(self, theta):
+        """ Runs the Levinson recursion over the whole series, storing the
+            whitened normal equations. Missing epochs are replaced by their
+            one-step prediction, which needs a trajectory model theta. This
+            is exact without gaps and an approximation otherwise: the
+            prediction ignores later observations.
+
+        Arguments
+        ---------
+        theta (n*1 matrix) : trajectory model for missing epochs (optional)
+        """
+
+        #--- Trend is centred on the current length, kept fixed afterwards
+        m = len(self.x)
+        self.m0 = m
+        self.H = DesignMatrix.create_DesignMatrix(self.sp, self.offsets, self.mjd, self.periods)
+        n = self.H.shape[1]
+        self.theta = np.zeros(n) if theta is None else theta
+        self.xi = self.x.copy()    # observations with predictions in gaps
+
+        #--- Empty state
+        self.t = self.cov.create_t(m, self.param)
+        self.r = np.zeros(0)
+        self.delta = self.t[0]
+        self.ln_det_C = 0.0
+        self.N = 0
+        self.normal = np.zeros((n,n))
+        self.rhs = np.zeros(n)
+        self.ss = 0.0
+        self.added = 0
+
+        for i in range(0,m):
+            self.__add_epoch(i)
+
+        #--- Log-likelihood per epoch of this estimation, to detect drift
+        self.solve()
+        self.logL0 = self.log_likelihood()/self.N
+
+
+
+    def __add_epoch(self, i):
+        """ One Levinson step and update of whitened normal equations
+
+        Arguments
+        ---------
+        i (int) : index of new epoch
+        """
+
+        #--- Order i predictor, costs O(i)
+        if i>0:
+            [self.r,self.delta,ln_det_C] = self.levinson.durbin_levinson( \
+                                           self.t[0:i+1], self.r, self.delta)
+
+        #--- Innovation of observations and of design matrix
+        h = self.H[i,:] + self.r @ self.H[0:i,:]
+        if math.isnan(self.x[i]):
+            #--- Prediction gives zero innovation, no information
+            e_theta = h @ self.theta
+            self.xi[i] = e_theta - np.dot(self.r,self.xi[0:i])
+            return
+        e = self.xi[i] + np.dot(self.r,self.xi[0:i])
+
+        #--- Update whitened normal equations
+        h /= math.sqrt(self.delta)
+        e /= math.sqrt(self.delta)
+        self.normal += np.outer(h,h)
+        self.rhs += h*e
+        self.ss += e*e
+        self.ln_det_C += math.log(self.delta)
+        self.N += 1
+
+
+
+    def solve(self):
+        """ Solve whitened normal equations
+
+        Returns
+        -------
+        theta (n*1 matrix)    : estimated parameters
+        C_theta  (n*n matrix) : covariance matrix of estimated parameters
+        ln_det_C (float)      : log(det(C))
+        sigma_eta (float)     : driving noise
+        """
+
+        C_theta = np.linalg.inv(self.normal)
+        self.theta = C_theta @ self.rhs
+        self.sigma_eta = math.sqrt(max(self.ss - np.dot(self.rhs,self.theta),0.0)/self.N)
+
+        return [self.theta,C_theta,self.ln_det_C,self.sigma_eta]
+
+
+
+    def log_likelihood(self):
+        """ Log likelihood value of current state
+        """
+
+        return -0.5 * (self.N*math.log(2*math.pi) + self.ln_det_C + \
+                       2.0*self.N*math.log(self.sigma_eta) + self.N)
+
+
+
+    def append(self, mjd, value):
+        """ Adds a new epoch. For fixed noise parameters the trend is updated
+            in O(m). The noise parameters are estimated again after
+            'reestimate_every' new epochs or when the log-likelihood per
+            epoch drifts more than 'drift_tol'.
+
+        Arguments
+        ---------
+        mjd (float)   : epoch of new observation
+        value (float) : new observation, may be NaN
+
+        Returns
+        -------
+        [theta, C_theta, ln_det_C, sigma_eta, param] : as MLE.estimate_parameters,
+                                                       trend centred on new length
+        """
+
+        m = len(self.x)
+        self.mjd = np.append(self.mjd, mjd)
+        self.x = np.append(self.x, value)
+        self.xi = np.append(self.xi, value)
+
+        #--- Autocovariance does not depend on m, only one lag is added
+        self.t = self.cov.create_t(m+1, self.param)
+        row = DesignMatrix.create_DesignMatrix(self.sp, self.offsets, [mjd], self.periods, \
+                                               first=m, m_centre=self.m0)
+        self.H = np.vstack((self.H,row))
+        self.__add_epoch(m)
+        self.added += 1
+        self.solve()
+
+        #--- Full estimation on schedule or when likelihood drifts
+        drift = abs(self.log_likelihood()/self.N - self.logL0)
+        if self.added>=self.reestimate_every or drift>self.drift_tol:
+            self.estimate()
+
+        return self.get_results()
+
+
+
+    def get_results(self):
+        """ Results with trend centred on the current length of the series
+
+        Returns
+        -------
+        [theta, C_theta, ln_det_C, sigma_eta, param] : as MLE.estimate_parameters
+        """
+
+        [theta,C_theta,ln_det_C,sigma_eta] = self.solve()
+
+        #--- Move centre of trend from m0 to m
+        J = np.eye(len(theta))
+        J[0,1] = 0.5*(len(self.x) - self.m0)
+        theta = J @ theta
+        C_theta = J @ C_theta @ J.T
+
+        return [theta, pow(sigma_eta,2.0)*C_theta, ln_det_C, sigma_eta, self.param]
+
+
+
+    def save(self, path):
+        """ Stores incremental state in .npz format
+
+        Arguments
+        ---------
+        path (string) : path to file
+        """
+
+        header = {
+            'Sampling period'  : self.sp,
+            'Offsets'          : self.offsets,
+            'Periods'          : self.periods,
+            'NoiseModels'      : self.cov.noisemodels,
+            'AR_p'             : self.cov.AR_p,
+            'MA_q'             : self.cov.MA_q,
+            'GGM_1mphi'        : 1.0 - self.cov.phi,
+            'PowerlawApprox_L' : self.cov.L,
+            'MinimizationMethod' : self.min_method,
+            'Reestimate every' : self.reestimate_every,
+            'Drift tolerance'  : self.drift_tol,
+            'm0'               : self.m0,
+            'N'                : self.N,
+            'Added'            : self.added,
+            'ln_det_C'         : self.ln_det_C,
+            'delta'            : self.delta,
+            'ss'               : self.ss,
+            'logL0'            : self.logL0
+        }
+        np.savez(path, header=json.dumps(header), mjd=self.mjd, x=self.x, xi=self.xi, \
+                 H=self.H, t=self.t, r=self.r, normal=self.normal, rhs=self.rhs, \
+                 theta=self.theta, param=self.param)
+
+
+
+    @classmethod
+    def load(cls, path):
+        """ Restores incremental state stored by save
+
+        Arguments
+        ---------
+        path (string) : path to file
+
+        Returns
+        -------
+        inc (Incremental) : incremental estimator
+        """
+
+        data = np.load(path)
+        header = json.loads(str(data['header']))
+        cov = Covariance(header['NoiseModels'], AR_p=header['AR_p'], MA_q=header['MA_q'], \
+                         GGM_1mphi=header['GGM_1mphi'], PowerlawApprox_L=header['PowerlawApprox_L'])
+
+        #--- Skip the constructor, the state is already known
+        inc = cls.__new__(cls)
+        inc.sp = header['Sampling period']
+        inc.offsets = header['Offsets']
+        inc.periods = header['Periods']
+        inc.cov = cov
+        inc.min_method = header['MinimizationMethod']
+        inc.reestimate_every = header['Reestimate every']
+        inc.drift_tol = header['Drift tolerance']
+        inc.levinson = AmmarGrag()
+        inc.m0 = header['m0']
+        inc.N = header['N']
+        inc.added = header['Added']
+        inc.ln_det_C = header['ln_det_C']
+        inc.delta = header['delta']
+        inc.ss = header['ss']
+        inc.logL0 = header['logL0']
+        for key in ['mjd','x','xi','H','t','r','normal','rhs','theta','param']:
+            setattr(inc, key, data[key])
+        inc.solve()
+
+        return inc
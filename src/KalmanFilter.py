@@ -0,0 +1,101 @@
+import math
+import numpy as np
+from Profiler import Profiler
+
+class KalmanFilter:
+
+    def __init__(self, profiler=None):
+        """ initialise class
+
+        Arguments
+        ---------
+        profiler (Profiler) : times 'filter' and 'solve' (optional)
+        """
+
+        self.profiler = Profiler(False) if profiler is None else profiler
+
+
+
+    def compute_leastsquares(self, ss, H, x, F):
+        """
+        KalmanFilter :
+            Kalman filter minimization method, O(m) for noise models with a
+            finite-order state-space form. Missing data are skipped in the
+            update step, matrix F is not needed.
+
+        Arguments
+        ---------
+        ss (list)      : [T,R,Z,P0,h] state-space form, see Covariance.create_ss
+        H (m*n matrix) : design matrix
+        y (m*1 matrix) : observations
+        F (m*k matrix) : Missing data matrix
+
+        Returns
+        -------
+        theta (n*1 matrix)    : estimated parameters
+        C_theta  (n*n matrix) : covariance matrix of estimated parameters
+        ln_det_C (float)      : log(det(C))
+        sigma_eta (float)     : driving noise
+        """
+
+        #--- Constant
+        EPS = 1.0e-12
+
+        #--- Get size of matrix H
+        (m,n) = H.shape
+
+        #--- Parse state-space form
+        [T,R,Z,P0,h] = ss
+        Q = R @ R.T
+
+        #--- Filter observations and columns of H at once, the gains do
+        #    not depend on the data
+        Y = np.column_stack((x,H))
+        a = np.zeros((len(Z),n+1))
+        P = P0.copy()
+        W = np.zeros((m,n+1))   # whitened innovations
+        ln_det_C = 0.0
+        steady = False
+        N = 0
+
+        with self.profiler.timer('filter'):
+            for i in range(0,m):
+                if math.isnan(x[i]):
+                    #--- Prediction only
+                    a = T @ a
+                    P = T @ P @ T.T + Q
+                    steady = False
+                    continue
+
+                #--- Innovation and its variance
+                if not steady:
+                    PZ = P @ Z
+                    f  = np.dot(Z,PZ) + h
+                    K  = (T @ PZ)/f
+                    sqrt_f = math.sqrt(f)
+                    ln_f = math.log(f)
+                v = Y[i,:] - Z @ a
+                W[N,:] = v/sqrt_f
+                ln_det_C += ln_f
+                N += 1
+
+                #--- Update
+                a = T @ a + np.outer(K,v)
+                if not steady:
+                    P_new = T @ P @ T.T + Q - f*np.outer(K,K)
+                    steady = P.size==0 or \
+                        np.max(np.abs(P_new - P)) < EPS*max(1.0,np.max(np.abs(P)))
+                    P = P_new
+
+        with self.profiler.timer('solve'):
+            #--- Least-squares on whitened innovations
+            y = W[0:N,0]
+            A = W[0:N,1:]
+            C_theta = np.linalg.inv(A.T @ A)
+            theta = C_theta @ (A.T @ y)
+
+            #--- Compute sigma_eta
+            r = y - A @ theta
+            sigma_eta = math.sqrt(np.dot(r,r)/N)
+
+        return [theta,C_theta,ln_det_C,sigma_eta]
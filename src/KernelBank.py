@@ -0,0 +1,281 @@
+import os, sys, math, json
+import numpy as np
+from multiprocessing import Pool
+from AmmarGrag import AmmarGrag
+from MLE import MLE
+
+class KernelBank:
+
+    def __init__(self, cov, m, grid, path, processes=1):
+        """ initialise class, precomputes the rfft of the filters l1 and l2
+            and log(det(C)) of every noise parameter vector of the grid for
+            series of length m. They are stored in memory-mapped files in
+            the folder path, and an existing bank with the same noise models,
+            model options, m and grid is reused.
+
+        Arguments
+        ---------
+        cov (Covariance)   : noise models
+        m (int)            : length of time series
+        grid (g*q matrix)  : noise parameter vectors, see grid_Powerlaw
+        path (string)      : folder of memory-mapped files
+        processes (int)    : number of worker processes to build the bank
+        """
+
+        self.cov = cov
+        self.m = m
+        self.grid = np.array(grid, dtype=float)
+        if self.grid.ndim!=2 or self.grid.shape[1]!=cov.get_Nparam():
+            print('Grid needs {0:d} noise parameters per row'.format(cov.get_Nparam()))
+            sys.exit(0)
+        self.path = path
+        self.method = AmmarGrag()
+
+        header = {
+            'NoiseModels'      : cov.noisemodels,
+            'AR_p'             : cov.AR_p,
+            'MA_q'             : cov.MA_q,
+            'GGM_1mphi'        : cov.GGM_1mphi,
+            'PowerlawApprox_L' : cov.L,
+            'm'                : m,
+            'Grid'             : self.grid.tolist()
+        }
+
+        #--- Reuse bank if it was built for the same problem
+        header_file = os.path.join(path,'header.json')
+        if os.path.exists(header_file):
+            with open(header_file,'r') as fp:
+                if json.load(fp)==header:
+                    [self.Fl1,self.Fl2,self.ln_det_C] = self.__open('r')
+                    return
+
+        #--- Kernels are written one by one, the bank need not fit in memory.
+        #    The old header goes first, an interrupted rebuild is never
+        #    taken for the old bank
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(header_file):
+            os.remove(header_file)
+        [Fl1,Fl2,ln_det_C] = self.__open('w+')
+        g = len(self.grid)
+        if processes>1:
+            with Pool(processes) as pool:
+                kernels = pool.imap(self.compute_kernel, range(0,g))
+                for i,kernel in enumerate(kernels):
+                    [Fl1[i],Fl2[i],ln_det_C[i]] = kernel
+        else:
+            for i in range(0,g):
+                [Fl1[i],Fl2[i],ln_det_C[i]] = self.compute_kernel(i)
+        Fl1.flush()
+        Fl2.flush()
+        ln_det_C.flush()
+        del Fl1, Fl2, ln_det_C
+
+        #--- Header is written last, an interrupted build is not reused
+        with open(header_file,'w') as fp:
+            json.dump(header,fp)
+
+        [self.Fl1,self.Fl2,self.ln_det_C] = self.__open('r')
+
+
+
+    def __open(self, mode):
+        """ Opens memory-mapped files
+
+        Arguments
+        ---------
+        mode (string) : 'r' to read or 'w+' to create
+
+        Returns
+        -------
+        Fl1, Fl2 (g*m+1 matrix) : rfft of l1 and l2 of each grid point
+        ln_det_C (g*1 matrix)   : log(det(C)) of each grid point
+        """
+
+        g = len(self.grid)
+        shape = (g,self.m+1)
+        Fl1 = np.lib.format.open_memmap(os.path.join(self.path,'Fl1.npy'), \
+                                    mode=mode, dtype=complex, shape=shape)
+        Fl2 = np.lib.format.open_memmap(os.path.join(self.path,'Fl2.npy'), \
+                                    mode=mode, dtype=complex, shape=shape)
+        ln_det_C = np.lib.format.open_memmap(os.path.join(self.path, \
+                          'ln_det_C.npy'), mode=mode, dtype=float, shape=(g,))
+
+        return [Fl1,Fl2,ln_det_C]
+
+
+
+    @classmethod
+    def grid_Powerlaw(cls, kappas, fractions):
+        """ Grid of noise parameters of Powerlaw + White noise
+
+        Arguments
+        ---------
+        kappas (array float)    : spectral indices
+        fractions (array float) : fractions of power-law noise
+
+        Returns
+        -------
+        grid (g*2 matrix) : noise parameters [param, kappa]
+        """
+
+        #--- Constant
+        hpi = 2.0*math.atan(1.0)
+
+        #--- fraction = cos^2(hpi*param)
+        param = np.arccos(np.sqrt(np.clip(fractions,0.0,1.0)))/hpi
+        [P,K] = np.meshgrid(param,kappas)
+
+        return np.column_stack((P.ravel(),K.ravel()))
+
+
+
+    def compute_kernel(self, i):
+        """ Filters of one grid point
+
+        Arguments
+        ---------
+        i (int) : index of grid point
+
+        Returns
+        -------
+        Fl1, Fl2 (m+1*1 matrix) : rfft of l1 and l2
+        ln_det_C (float)        : log(det(C))
+        """
+
+        param = self.grid[i].copy()
+        self.cov.compute_penalty(param)
+        t = self.cov.create_t(self.m,param)
+        [l1,l2,Fl1,Fl2,ln_det_C] = self.method.compute_filters(t)
+
+        return [Fl1,Fl2,ln_det_C]
+
+
+
+    def compute_loglikelihood(self, X, H):
+        """ Log-likelihood of every series at every grid point. Series with
+            the same gap pattern are whitened in one batched transform.
+
+        Arguments
+        ---------
+        X (m*p matrix) : observations, one column per series (may contain NaN's)
+        H (m*n matrix) : design matrix
+
+        Returns
+        -------
+        logL (p*g matrix)      : log-likelihood values
+        sigma_eta (p*g matrix) : driving noise
+        """
+
+        X = np.array(X, dtype=float)
+        if X.ndim==1:
+            X = X[:,None]
+        (m,p) = X.shape
+        if m!=self.m:
+            print('Kernel bank is for m={0:d}, series have m={1:d}'.format(self.m,m))
+            sys.exit(0)
+        n = H.shape[1]
+        g = len(self.grid)
+        logL = np.full((p,g), np.nan)
+        sigma_eta = np.full((p,g), np.nan)
+
+        #--- Group series with equal gaps
+        gaps = np.isnan(X)
+        groups = {}
+        for c in range(0,p):
+            groups.setdefault(gaps[:,c].tobytes(),[]).append(c)
+
+        for group in groups.values():
+            mask = gaps[:,group[0]]
+            missing = np.flatnonzero(mask)
+            k = len(missing)
+            N = m - k
+            F = np.zeros((m,k))
+            F[missing,np.arange(k)] = 1.0
+            Xm = np.where(mask[:,None],0.0,X[:,group])
+            Hm = np.where(mask[:,None],0.0,H)
+            B = np.column_stack((Xm,Hm,F))
+            q = len(group)
+
+            for i in range(0,g):
+                [Y1,Y2] = self.method.whiten(self.Fl1[i],self.Fl2[i],B)
+                y1 = Y1[:,0:q]
+                y2 = Y2[:,0:q]
+                A1 = Y1[:,q:q+n]
+                A2 = Y2[:,q:q+n]
+                G1 = Y1[:,q+n:]
+                G2 = Y2[:,q+n:]
+                ln_det_C = self.ln_det_C[i]
+
+                #--- Least-squares of all series in group, C^-1 = L1'L1 - L2'L2
+                if k>0:
+                    try:
+                        M = np.linalg.cholesky(G1.T @ G1 - G2.T @ G2)
+                    except np.linalg.LinAlgError:
+                        continue
+                    ln_det_C += 2.0*np.sum(np.log(np.diag(M)))
+                    Minv = np.linalg.inv(M)
+                    QA = Minv @ (G1.T @ A1 - G2.T @ A2)
+                    Qy = Minv @ (G1.T @ y1 - G2.T @ y2)
+                    C_theta = np.linalg.inv(A1.T @ A1 - A2.T @ A2 - QA.T @ QA)
+                    theta = C_theta @ (A1.T @ y1 - A2.T @ y2 - QA.T @ Qy)
+                    t1 = y1 - A1 @ theta
+                    t2 = y2 - A2 @ theta
+                    Qt = Minv @ (G1.T @ t1 - G2.T @ t2)
+                    ss = np.sum(t1*t1,axis=0) - np.sum(t2*t2,axis=0) - np.sum(Qt*Qt,axis=0)
+                else:
+                    C_theta = np.linalg.inv(A1.T @ A1 - A2.T @ A2)
+                    theta = C_theta @ (A1.T @ y1 - A2.T @ y2)
+                    t1 = y1 - A1 @ theta
+                    t2 = y2 - A2 @ theta
+                    ss = np.sum(t1*t1,axis=0) - np.sum(t2*t2,axis=0)
+
+                sigma = np.sqrt(np.maximum(ss,0.0)/N)
+                sigma_eta[group,i] = sigma
+                logL[group,i] = -0.5 * (N*math.log(2*math.pi) + ln_det_C + \
+                                        2.0*N*np.log(sigma) + N)
+
+        return [logL,sigma_eta]
+
+
+
+    def estimate(self, X, H, refine='no', min_method='AmmarGrag'):
+        """ Grid optimum of each series, optionally refined by MLE
+
+        Arguments
+        ---------
+        X (m*p matrix)      : observations, one column per series
+        H (m*n matrix)      : design matrix
+        refine (string)     : 'yes' to start MLE from the grid optimum
+        min_method (string) : minimization method of refinement
+
+        Returns
+        -------
+        param (p*q matrix)     : noise parameters of each series
+        logL (p*1 matrix)      : log-likelihood at grid optimum
+        sigma_eta (p*1 matrix) : driving noise at grid optimum
+        results (list)         : MLE results of each series when refined
+        """
+
+        X = np.array(X, dtype=float)
+        if X.ndim==1:
+            X = X[:,None]
+        [logL,sigma_eta] = self.compute_loglikelihood(X,H)
+
+        #--- Grid optimum, -inf where the likelihood could not be computed
+        best = np.argmax(np.where(np.isnan(logL),-np.inf,logL),axis=1)
+        p = X.shape[1]
+        param = self.grid[best]
+        logL = logL[np.arange(p),best]
+        sigma_eta = sigma_eta[np.arange(p),best]
+
+        results = []
+        if refine=='yes':
+            for c in range(0,p):
+                missing = np.flatnonzero(np.isnan(X[:,c]))
+                F = np.zeros((self.m,len(missing)))
+                F[missing,np.arange(len(missing))] = 1.0
+                mle = MLE(X[:,c], F, min_method, H, self.cov)
+                results.append(mle.estimate_parameters(param[c].copy()))
+            param = np.array([r[4] for r in results])
+
+        return [param,logL,sigma_eta,results]
@@ -1,14 +1,39 @@
 import numpy as np
 import sys
 import math
-from scipy.optimize import minimize
-from Fullcov import Fullcov
-from AmmarGrag import AmmarGrag
+from CostModel import CostModel
+from Exceptions import MemoryBudgetError
+from Profiler import Profiler
 
 class MLE:
 
-    def __init__(self, x, F, min_method, H, t):
+    def __init__(self, x, F, min_method, H, t, whittle='no', cache=None, budget=None, profiler=None, \
+                 costmodel=None):
         """ initialise class
+
+        Arguments
+        ---------
+        F (m*k matrix)   : missing data matrix, None to derive it from the
+                           NaN's of x only when the method needs it
+        budget (float)   : bytes this process may use. When the predicted peak
+                           memory of min_method exceeds it, the fastest method
+                           that fits is used instead, or Matfree on chunks of
+                           columns, with the log-determinant estimated when
+                           its dense block does not fit (optional, no check
+                           when None)
+        costmodel (CostModel) : predicts the memory checked against budget,
+                                e.g. Observations.get_costmodel (optional,
+                                built-in coefficients by default)
+        cache (FactorCache) : factorizations shared with other series with the
+                              same gap pattern, only used by AmmarGrag
+        profiler (Profiler) : stage timers, evaluation counts and optimizer
+                              trace, shared with the minimization method
+                              (optional)
+        whittle (string) : 'no'        : exact likelihood only
+                           'yes'       : noise parameters from the Whittle
+                                         approximation (screening)
+                           'warmstart' : Whittle optimum is the initial
+                                         guess of the exact estimator
         """
 
         #--- Copy observations and design matrix into class 
@@ -16,20 +41,135 @@ class MLE:
         self.H   = H
         self.F   = F
         self.cov = t
+        self.profiler = Profiler(False) if profiler is None else profiler
+        self.costmodel = CostModel() if costmodel is None else costmodel
 
-        (m,k) = self.F.shape
+        #--- Without F the gaps are the NaN's of x
+        if self.F is None:
+            (m,k) = (len(x),int(np.sum(np.isnan(x))))
+        else:
+            (m,k) = self.F.shape
         self.m = m 
         self.N = self.m - k
 
-        #--- FullCov or AmmarGrag
+        #--- Memory guard, before anything large is allocated
+        self.budget = budget
+        self.chunk = None
+        self.logdet = 'exact'
+        if budget is not None and min_method in ['Fullcov','AmmarGrag','Matfree']:
+            min_method = self.fit_budget(min_method)
+
+        #--- Dense m*k missing data matrix, Matfree works on the NaN's of x
+        if self.F is None and min_method != 'Matfree':
+            gaps = np.flatnonzero(np.isnan(x))
+            self.F = np.zeros((m,k))
+            self.F[gaps,np.arange(k)] = 1.0
+
+        #--- FullCov, AmmarGrag, Matfree or KalmanFilter, only the chosen
+        #    method is imported
+        self.statespace = False
+        self.cache = None
         if min_method == 'Fullcov':
-            self.method = Fullcov()
+            from Fullcov import Fullcov
+            self.method = Fullcov(self.profiler)
         elif min_method == 'AmmarGrag':
-            self.method = AmmarGrag()
+            from AmmarGrag import AmmarGrag
+            self.method = AmmarGrag(cache, self.profiler)
+            self.cache = cache
+        elif min_method == 'Matfree':
+            from Matfree import Matfree
+            self.method = Matfree(chunk=self.chunk, profiler=self.profiler, logdet=self.logdet)
+        elif min_method == 'KalmanFilter':
+            if not self.cov.has_ss():
+                print('KalmanFilter needs noise models with a state-space form.')
+                sys.exit(0)
+            from KalmanFilter import KalmanFilter
+            self.method = KalmanFilter(self.profiler)
+            self.statespace = True
         else:
             print('Unrecognizable minimization method.')
             sys.exit(0)
 
+        #--- Whittle approximation, periodogram is computed only once
+        if whittle not in ['no','yes','warmstart']:
+            print('Unrecognizable Whittle option.')
+            sys.exit(0)
+        self.whittle = whittle
+        if self.whittle != 'no':
+            from Whittle import Whittle
+            self.periodogram = Whittle(self.x, self.H)
+
+
+
+    def predict_memory(self, min_method):
+        """ Predicted peak memory in bytes of a likelihood evaluation
+        """
+
+        (m,n) = self.H.shape
+        costs = self.costmodel.predict(m,m-self.N,n,self.cov.Nmodels,chunk=self.chunk,logdet=self.logdet)
+
+        return costs[min_method][1]
+
+
+
+    def fit_budget(self, min_method):
+        """ Method that fits in the memory budget, min_method if it does
+
+        Arguments
+        ---------
+        min_method (string) : requested minimization method
+
+        Returns
+        -------
+        min_method (string) : minimization method to use, self.chunk and
+                              self.logdet are set when Matfree must work on
+                              chunks of columns without the dense block of
+                              its log-determinant
+        """
+
+        peak = self.predict_memory(min_method)
+        if peak<=self.budget:
+            return min_method
+
+        (m,n) = self.H.shape
+        k = m - self.N
+        costmodel = self.costmodel
+        [method,cost] = costmodel.choose_default(m,k,n,self.cov.Nmodels,self.budget)
+        if cost[1]>self.budget:
+            method = 'Matfree'
+            self.logdet = costmodel.matfree_logdet(m,k,n,self.budget)
+            self.chunk = costmodel.matfree_chunk(m,k,n,self.budget,self.logdet)
+            if self.chunk<1:
+                raise MemoryBudgetError('Series of {0:d} epochs does not fit in {1:.1f} MB'.format(m,self.budget/1.0e6))
+
+        print('{0:s} needs {1:.1f} MB, more than the budget of {2:.1f} MB, using {3:s}'.format( \
+		  min_method,peak/1.0e6,self.budget/1.0e6,method))
+
+        return method
+
+
+
+    def create_covariance(self,param):
+        """ Covariance in the form required by the minimization method
+        """
+
+        with self.profiler.timer('create_t'):
+            if self.statespace:
+                return self.cov.create_ss(param)
+            return self.cov.create_t(self.m,param)
+
+
+
+    def compute_leastsquares(self,t,param):
+        """ Least-squares of the minimization method. Factorizations shared
+            through the cache are keyed by the noise parameters.
+        """
+
+        if self.cache is not None:
+            return self.method.compute_leastsquares(t,self.H,self.x,self.F, \
+                                        self.cov.cache_key(self.m,param))
+        return self.method.compute_leastsquares(t,self.H,self.x,self.F)
+
 
 
     def log_likelihood(self,param):
@@ -40,35 +180,109 @@ class MLE:
         penalty = self.cov.compute_penalty(param)
 
         #--- Compute new covariance matrix
-        t = self.cov.create_t(self.m,param)
+        t = self.create_covariance(param)
 
         #--- least-squares
         [theta,C_theta,ln_det_C,sigma_eta] = \
-		     self.method.compute_leastsquares(t,self.H,self.x,self.F)
+		     self.compute_leastsquares(t,param)
 
         #--- Compute log-likelihood
         logL = -0.5 * (self.N*math.log(2*math.pi) + ln_det_C + \
 				   2.0*(self.N)*math.log(sigma_eta) + self.N)
 
+        self.profiler.count('evaluations')
+        self.profiler.record(param,-logL + penalty)
+
+        return -logL + penalty
+
+
+
+    def log_likelihood_whittle(self,param):
+        """ Compute Whittle approximation of log likelihood value
+        """
+
+        #--- First, make sure noise parameters are inside range
+        penalty = self.cov.compute_penalty(param)
+
+        #--- PSD of noise models at the Fourier frequencies
+        G = self.cov.create_psd(self.periodogram.f,param)
+
+        #--- Compute log-likelihood
+        [logL,sigma_eta] = self.periodogram.compute_loglikelihood(G)
+
+        self.profiler.count('whittle_evaluations')
+
         return -logL + penalty
 
 
 
-    def estimate_parameters(self):
+    def estimate_parameters(self, param0=None):
         """ Using Nelder-Mead, estimate least-squares + noise parameters
+
+        Arguments
+        ---------
+        param0 (array float) : initial guess of noise parameters (optional)
         """
 
+        from scipy.optimize import minimize
 
         #--- Create intial guess
-        param0 = [0.1]*self.cov.Nparam
+        if param0 is None:
+            param0 = [0.1]*self.cov.Nparam
+
+        #--- Whittle approximation, O(m log m) per evaluation
+        if self.whittle != 'no' and self.cov.Nparam>0:
+            param = minimize(self.log_likelihood_whittle, param0, method='nelder-mead', options={'xatol':1.0e-4})
+            param0 = param.x
 
         #--- search for maximum (-minimum) log-likelihood value
-        param = minimize(self.log_likelihood, param0, method='nelder-mead', options={'xatol':1.0e-4})
+        if self.whittle != 'yes':
+            param = minimize(self.log_likelihood, param0, method='nelder-mead', options={'xatol':1.0e-4})
+            param_x = param.x
+        else:
+            param_x = np.array(param0, dtype=float)
 
         #--- Now that noise parameters have been established, compute final
         #    values for the trajectory model
-        t = self.cov.create_t(self.m, param.x)
+        t = self.create_covariance(param_x)
         [theta, C_theta, ln_det_C, sigma_eta] = \
-		      self.method.compute_leastsquares(t, self.H, self.x, self.F)
+		      self.compute_leastsquares(t,param_x)
+
+        self.profiler.emit()
+
+        return [theta, pow(sigma_eta,2.0)*C_theta, ln_det_C, sigma_eta, param_x]
+
+
+
+    def interpolate_gaps(self, theta, param, tol=1.0e-10):
+        """ Best linear unbiased prediction of the missing observations,
+            the fitted model plus the conditional expectation of the noise
+            given the observed residuals, H theta + C_go C_oo^-1 r_o.
+            C_oo is solved by preconditioned conjugate gradients with FFT
+            products, no m*m matrix is formed.
+
+        Arguments
+        ---------
+        theta (n*1 matrix)   : estimated parameters
+        param (array float)  : estimated noise parameters
+        tol (float)          : relative residual norm of the iterative solve
+
+        Returns
+        -------
+        x (m*1 matrix) : observations with the gaps filled in
+        """
+
+        gaps = np.isnan(self.x)
+        model = self.H @ theta
+        if not np.any(gaps):
+            return np.array(self.x, dtype=float)
+
+        from Toeplitz import Toeplitz
+
+        #--- sigma_eta cancels, the noise covariance is only needed up to scale
+        toeplitz = Toeplitz(self.cov.create_t(self.m,param), ~gaps)
+        r = np.where(gaps,0.0,self.x - model)
+        [w,iterations] = toeplitz.pcg(r[:,None],tol)
+        noise = toeplitz.multiply(w)[:,0]
 
-        return [theta, pow(sigma_eta,2.0)*C_theta, ln_det_C, sigma_eta, param.x]
\ No newline at end of file
+        return np.where(gaps,model + noise,self.x)
@@ -0,0 +1,258 @@
+import sys, math
+import numpy as np
+from Profiler import Profiler
+
+class Matfree:
+
+    #--- Columns of C^-1 at the gaps transformed at once by default
+    GAP_CHUNK = 256
+
+    #--- Stochastic Lanczos quadrature of the gap correction : Rademacher
+    #    probes, drawn with a fixed seed so that the likelihood is a smooth
+    #    function of the noise parameters, and Lanczos steps per probe
+    SLQ_PROBES = 50
+    SLQ_STEPS = 30
+    SLQ_SEED = 0
+
+    def __init__(self, tol=1.0e-10, chunk=None, profiler=None, logdet='exact'):
+        """ initialise class, least-squares with the covariance matrix of the
+            observed epochs only applied as FFT products, no m*m or m*k
+            matrix is formed. Each evaluation costs an O(m^2) Durbin-Levinson
+            recursion for the preconditioner and log(det(C)), PCG iterations
+            of O(m log m) per column and O(k m log m) for the gap correction
+            of the log-determinant. With logdet='exact' the correction needs
+            the k*k (or N*N when smaller) block, with logdet='slq' it is
+            estimated by stochastic Lanczos quadrature in O(m) memory per
+            column transformed at once.
+
+        Arguments
+        ---------
+        tol (float)   : relative residual norm of conjugate gradients
+        chunk (int)   : maximum number of columns transformed at once, bounds
+                        the memory of the FFT products (optional)
+        profiler (Profiler) : times 'levinson', 'pcg', 'solve' and 'logdet'
+                              (optional)
+        logdet (string) : 'exact' or 'slq', see observed_logdet
+        """
+
+        if logdet not in ['exact','slq']:
+            print('Unrecognizable log-determinant option.')
+            sys.exit(0)
+        self.tol = tol
+        self.chunk = chunk
+        self.profiler = Profiler(False) if profiler is None else profiler
+        self.logdet = logdet
+
+
+
+    def compute_leastsquares(self, t, H, x, F=None):
+        """
+        Matfree :
+            Matrix-free minimization method
+
+        Arguments
+        ---------
+        t (m*1 matrix) : first column of Toeplitz covariance matrix C
+        H (m*n matrix) : design matrix
+        y (m*1 matrix) : observations, NaN at the gaps
+        F (m*k matrix) : Missing data matrix, not used, the gaps are the
+                         NaN's of y (optional)
+
+        Returns
+        -------
+        theta (n*1 matrix)    : estimated parameters
+        C_theta  (n*n matrix) : covariance matrix of estimated parameters
+        ln_det_C (float)      : log(det(C)) of the observed epochs
+        sigma_eta (float)     : driving noise
+        """
+
+        #--- Imported here, the cost model reads GAP_CHUNK without scipy
+        from Toeplitz import Toeplitz
+
+        #--- Get size of matrix H
+        (m,n) = H.shape
+
+        #--- Rows of gaps are zero and ignored by the observed block of C
+        gaps = np.isnan(x)
+        k = int(np.sum(gaps))
+        xm = np.where(gaps,0.0,x)
+        Hm = np.where(gaps[:,None],0.0,H)
+        with self.profiler.timer('levinson'):
+            toeplitz = Toeplitz(t,~gaps)
+
+        #--- C_oo^-1 x and C_oo^-1 H in one batch, or in chunks of columns
+        with self.profiler.timer('pcg'):
+            B = np.column_stack((xm,Hm))
+            W = np.zeros(B.shape)
+            chunk = n+1 if self.chunk is None else self.chunk
+            for j in range(0,n+1,chunk):
+                [W[:,j:j+chunk],iterations] = toeplitz.pcg(B[:,j:j+chunk],self.tol)
+                self.profiler.count('pcg_iterations',iterations)
+
+        with self.profiler.timer('solve'):
+            #--- Least-squares
+            C_theta = np.linalg.inv(Hm.T @ W[:,1:])
+            b = Hm.T @ W[:,0]
+            theta = C_theta @ b
+
+            #--- Compute sigma_eta
+            sigma_eta = math.sqrt((np.dot(xm,W[:,0]) - np.dot(b,theta))/(m-k))
+
+        with self.profiler.timer('logdet'):
+            ln_det_C = self.observed_logdet(toeplitz)
+
+        return [theta,C_theta,ln_det_C,sigma_eta]
+
+
+
+    def observed_logdet(self, toeplitz):
+        """
+        observed_logdet :
+            log(det(C_oo)) of the observed block of C. By Jacobi's identity
+            det(C_oo) = det(C) det((C^-1)_gg), with log(det(C)) from
+            Durbin-Levinson and (C^-1)_gg the k*k block of C^-1 at the gaps,
+            whose columns are Gohberg-Semencul products. The correction is
+            exact (see exact_correction) or estimated (see slq_correction).
+
+        Arguments
+        ---------
+        toeplitz (Toeplitz) : covariance matrix and observed epochs
+
+        Returns
+        -------
+        ln_det_C (float) : log(det(C_oo))
+        """
+
+        gaps = np.flatnonzero(~toeplitz.observed)
+        if len(gaps)==0:
+            return toeplitz.ln_det_C
+
+        chunk = Matfree.GAP_CHUNK if self.chunk is None else self.chunk
+        if self.logdet=='slq':
+            return toeplitz.ln_det_C + self.slq_correction(toeplitz,gaps,chunk)
+
+        return self.exact_correction(toeplitz,gaps,chunk)
+
+
+
+    def exact_correction(self, toeplitz, gaps, chunk):
+        """
+        exact_correction :
+            log(det(C_oo)) from the Cholesky factor of the smaller of the
+            k*k block (C^-1)_gg and the N*N block C_oo, filled in chunks of
+            columns and factorized in place
+
+        Arguments
+        ---------
+        toeplitz (Toeplitz) : covariance matrix and observed epochs
+        gaps (k*1 matrix)   : indexes of the missing epochs
+        chunk (int)         : columns filled at once
+
+        Returns
+        -------
+        ln_det_C (float) : log(det(C_oo))
+        """
+
+        from scipy.linalg import cholesky
+
+        k = len(gaps)
+
+        #--- Smaller N*N observed block
+        if k > toeplitz.m - k:
+            kept = np.flatnonzero(toeplitz.observed)
+            M = np.zeros((len(kept),len(kept)), order='F')
+            for j in range(0,len(kept),chunk):
+                M[:,j:j+chunk] = toeplitz.t[np.abs(kept[:,None] - kept[None,j:j+chunk])]
+            U = cholesky(M,lower=True,overwrite_a=True,check_finite=False)
+            return 2.0*np.sum(np.log(np.diag(U)))
+
+        #--- k*k block of C^-1, in chunks of columns, lower triangle
+        #    symmetrized before the factorization
+        M = np.zeros((k,k), order='F')
+        for j in range(0,k,chunk):
+            W = toeplitz.method.inverse_columns(toeplitz.l1,toeplitz.l2,toeplitz.Fl1,toeplitz.Fl2,gaps[j:j+chunk])
+            M[:,j:j+chunk] = W[gaps,:]
+        for j in range(0,k,chunk):
+            M[j:,j:j+chunk] = 0.5*(M[j:,j:j+chunk] + M[j:j+chunk,j:].T)
+
+        U = cholesky(M,lower=True,overwrite_a=True,check_finite=False)
+
+        return toeplitz.ln_det_C + 2.0*np.sum(np.log(np.diag(U)))
+
+
+
+    def slq_correction(self, toeplitz, gaps, chunk):
+        """
+        slq_correction :
+            log(det((C^-1)_gg)) without the k*k block. The diagonal blocks D
+            of 'chunk' gaps are factorized exactly, D = L L', and serve as
+            control variate: only log(det(B)) of B = L^-1 (C^-1)_gg L^-T,
+            whose eigenvalues cluster around 1, is estimated by stochastic
+            Lanczos quadrature with SLQ_PROBES probes of SLQ_STEPS steps
+
+        Arguments
+        ---------
+        toeplitz (Toeplitz) : covariance matrix and observed epochs
+        gaps (k*1 matrix)   : indexes of the missing epochs
+        chunk (int)         : size of the diagonal blocks and number of
+                              probes run at once
+
+        Returns
+        -------
+        ln_det_M (float) : estimate of log(det((C^-1)_gg))
+        """
+
+        m = toeplitz.m
+        k = len(gaps)
+        b = min(chunk,k)
+        nb = -(-k//b)
+
+        #--- Inverse factors of the diagonal blocks, identity as padding
+        Linv = np.tile(np.eye(b),(nb,1,1))
+        ln_det_D = 0.0
+        for i in range(nb):
+            g = gaps[i*b:(i+1)*b]
+            W = toeplitz.method.inverse_columns(toeplitz.l1,toeplitz.l2,toeplitz.Fl1,toeplitz.Fl2,g)
+            L = np.linalg.cholesky(0.5*(W[g,:] + W[g,:].T))
+            ln_det_D += 2.0*np.sum(np.log(np.diag(L)))
+            Linv[i,0:len(g),0:len(g)] = np.linalg.inv(L)
+
+        def apply(V):
+            Y = np.zeros((nb*b,V.shape[1]))
+            Y[0:k,:] = V
+            Y = (Linv.transpose(0,2,1) @ Y.reshape(nb,b,-1)).reshape(nb*b,-1)
+            X = np.zeros((m,V.shape[1]))
+            X[gaps,:] = Y[0:k,:]
+            Y[0:k,:] = toeplitz.method.apply_inverse(toeplitz.Fl1,toeplitz.Fl2,X)[gaps,:]
+            return (Linv @ Y.reshape(nb,b,-1)).reshape(nb*b,-1)[0:k,:]
+
+        #--- Lanczos on all probes of a chunk at once, z'log(B)z by Gauss
+        #    quadrature on the eigenvalues of the tridiagonal matrices
+        rng = np.random.default_rng(Matfree.SLQ_SEED)
+        Z = rng.choice([-1.0,1.0],size=(k,Matfree.SLQ_PROBES))
+        steps = min(Matfree.SLQ_STEPS,k)
+        total = 0.0
+        for j in range(0,Matfree.SLQ_PROBES,chunk):
+            Q = Z[:,j:j+chunk]/math.sqrt(k)
+            Q_previous = np.zeros(Q.shape)
+            beta = np.zeros(Q.shape[1])
+            alphas = np.zeros((steps,Q.shape[1]))
+            betas = np.zeros((steps,Q.shape[1]))
+            for i in range(steps):
+                R = apply(Q) - beta*Q_previous
+                alphas[i] = np.sum(Q*R,axis=0)
+                R -= alphas[i]*Q
+                beta = np.linalg.norm(R,axis=0)
+                betas[i] = beta
+                Q_previous = Q
+                Q = R/np.where(beta>0.0,beta,1.0)
+
+            for p in range(Q.shape[1]):
+                #--- Krylov space exhausted at the first vanishing beta
+                small = np.flatnonzero(betas[:,p] <= 1.0e-12*np.abs(alphas[0,p]))
+                s = steps if len(small)==0 else small[0]+1
+                T = np.diag(alphas[0:s,p]) + np.diag(betas[0:s-1,p],1) + np.diag(betas[0:s-1,p],-1)
+                [theta,V] = np.linalg.eigh(T)
+                total += k*np.sum(V[0,:]**2*np.log(theta))
+
+        return ln_det_D + total/Matfree.SLQ_PROBES
@@ -0,0 +1,187 @@
+import sys
+import numpy as np
+from AmmarGrag import AmmarGrag
+from Covariance import Covariance
+from DesignMatrix import DesignMatrix
+from FactorCache import FactorCache
+from MLE import MLE
+
+class MultiComponent:
+
+    def __init__(self, mjd, X, sp, offsets, periods, cov, min_method='AmmarGrag', \
+                 offsets_3D='yes'):
+        """ initialise class, components (e.g. North, East and Up) observed at
+            the same epochs. The design matrix is built once and every
+            component keeps its own noise parameters.
+
+        Arguments
+        ---------
+        mjd (array float)   : epochs of observations
+        X (m*p matrix)      : observations, one column per component (may contain NaN's)
+        sp (float)          : sampling period
+        offsets (list)      : per component, list of epochs of offsets
+        periods (list)      : periodic signals in unit days
+        cov (Covariance)    : noise models
+        min_method (string) : minimization method
+        offsets_3D (string) : 'yes' to estimate every offset in all components
+        """
+
+        #--- Constant
+        EPS = 1.0e-4
+
+        #--- Copy observations into class
+        self.mjd = np.array(mjd, dtype=float)
+        self.X = np.array(X, dtype=float)
+        if self.X.ndim==1:
+            self.X = self.X[:,None]
+        (m,p) = self.X.shape
+        if len(offsets)!=p:
+            print('Need one list of offsets per component, got {0:d} for {1:d}'.format(len(offsets),p))
+            sys.exit(0)
+        self.sp = sp
+        self.cov = cov
+        self.min_method = min_method
+        self.cache = FactorCache()
+        self.method = AmmarGrag(self.cache)
+
+        #--- Offsets of all components, each one column of H
+        union = sorted(set([epoch for component in offsets for epoch in component]))
+        self.offsets = union
+        n0 = 2 + 2*len(periods)
+        if offsets_3D=='yes':
+            self.columns = [np.arange(0,n0+len(union)) for c in range(0,p)]
+        else:
+            self.columns = [np.concatenate((np.arange(0,n0), \
+                 n0 + np.searchsorted(union,component))).astype(int) for component in offsets]
+
+        #--- Design matrix of all offsets, built once
+        H = DesignMatrix.create_DesignMatrix(sp, [], self.mjd, periods)
+        steps = (np.array(union)[None,:] < self.mjd[:,None] + EPS).astype(float)
+        self.H = np.column_stack((H,steps))
+
+        #--- Missing data matrices, shared by equal gap patterns
+        self.gaps = np.isnan(self.X)
+        self.F = []
+        for c in range(0,p):
+            missing = np.flatnonzero(self.gaps[:,c])
+            F = np.zeros((m,len(missing)))
+            F[missing,np.arange(len(missing))] = 1.0
+            for d in range(0,c):
+                if np.array_equal(self.gaps[:,c],self.gaps[:,d]):
+                    F = self.F[d]
+                    break
+            self.F.append(F)
+
+
+
+    @classmethod
+    def from_observations(cls, observations, periods):
+        """ Components from Observations objects with loaded control and
+            observations files. Options are read from the first control file.
+
+        Arguments
+        ---------
+        observations (list) : Observations object of each component
+        periods (list)      : periodic signals in unit days
+
+        Returns
+        -------
+        mc (MultiComponent) : multi-component estimator
+        """
+
+        first = observations[0]
+        mjd = first.get_indexes()
+        for o in observations[1:]:
+            if not np.array_equal(o.get_indexes(),mjd):
+                print('Components are not observed at the same epochs')
+                sys.exit(0)
+
+        X = np.column_stack([o.get_values() for o in observations])
+        offsets = [list(o.get_offsets()) for o in observations]
+        control = first.get_control_dict()
+        offsets_3D = control['offsets_3D'] if 'offsets_3D' in control else 'yes'
+        cov = Covariance(first.get_noisemodels(), **first.get_noiseoptions())
+
+        return cls(mjd, X, first.get_sp(), offsets, periods, cov, \
+                   first.get_min_method(), offsets_3D)
+
+
+
+    def estimate(self, param0=None):
+        """ Estimates noise parameters of each component with MLE. The
+            components use the same design matrix, but this is not a joint
+            estimation: every component runs its own Nelder-Mead search, one
+            after the other. The cached factorizations are only reused when
+            two searches evaluate exactly the same noise parameters and gap
+            pattern, which is rare, so the cache and the batched whitening
+            mainly speed up solve, once the parameters are known.
+
+        Arguments
+        ---------
+        param0 (list) : initial noise parameters of each component (optional)
+
+        Returns
+        -------
+        results (list) : per component [theta, C_theta, ln_det_C, sigma_eta, param]
+                         as MLE.estimate_parameters
+        """
+
+        p = self.X.shape[1]
+        results = []
+        for c in range(0,p):
+            H = self.H[:,self.columns[c]]
+            mle = MLE(self.X[:,c], self.F[c], self.min_method, H, self.cov, cache=self.cache)
+            results.append(mle.estimate_parameters(None if param0 is None else param0[c]))
+        self.param = [r[4] for r in results]
+
+        return results
+
+
+
+    def solve(self, param):
+        """ Least-squares for fixed noise parameters. Components with the same
+            noise parameters and gap pattern are whitened in one batched
+            transform, together with the design matrix.
+
+        Arguments
+        ---------
+        param (list) : noise parameters of each component
+
+        Returns
+        -------
+        results (list) : per component [theta, C_theta, ln_det_C, sigma_eta, param]
+                         as MLE.estimate_parameters
+        """
+
+        (m,p) = self.X.shape
+        n = self.H.shape[1]
+        results = [None]*p
+
+        #--- Group components with equal noise parameters and gaps
+        groups = {}
+        for c in range(0,p):
+            key = (tuple(np.asarray(param[c],dtype=float)), self.gaps[:,c].tobytes())
+            groups.setdefault(key,[]).append(c)
+
+        for key,group in groups.items():
+            c = group[0]
+            gaps = self.gaps[:,c]
+            t = self.cov.create_t(m, np.array(param[c],dtype=float))
+
+            #--- One factorization and one transform for the whole group
+            [Fl1,Fl2,ln_det_C,G1,G2,gap] = self.method.compute_cached(t,self.F[c],gaps, \
+                                                self.cov.cache_key(m,param[c]))
+            Xm = np.where(gaps[:,None],0.0,self.X[:,group])
+            Hm = np.where(gaps[:,None],0.0,self.H)
+            [Y1,Y2] = self.method.whiten(Fl1,Fl2,np.column_stack((Xm,Hm)))
+            A1 = Y1[:,len(group):].T
+            A2 = Y2[:,len(group):].T
+
+            for j,c in enumerate(group):
+                columns = self.columns[c]
+                [theta,C_theta,ln_det,sigma_eta] = self.method.solve(Y1[:,j], Y2[:,j], \
+                                  A1[columns,:], A2[columns,:], G1, G2, ln_det_C, gap)
+                results[c] = [theta, pow(sigma_eta,2.0)*C_theta, ln_det, sigma_eta, \
+                              np.array(param[c],dtype=float)]
+
+        return results
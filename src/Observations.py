@@ -1,9 +1,8 @@
-import math, copy
-import pandas as pd
+import copy
 import numpy as np
-from matplotlib import pyplot as plt
-from support_readwrite import readControl, readObservations, writeToFile
-from support_time import mjd_to_datetime
+from support_readwrite import readControl, readColumns, writeToFile, writeColumns
+from support_time import mjd_to_datetime64, mjd_to_isostrings
+from CostModel import CostModel
 
 class Observations:
     """ 
@@ -17,7 +16,8 @@ class Observations:
     ----------
     public :    
         timeseries : pandas DataFrame
-            Pandas DataFrame with tabled information regarding obs_data attribute.\n
+            Pandas DataFrame with tabled information regarding the stored arrays, a new copy on every access.\n
+            Changes made to it are stored by assigning it back, e.g. obs.timeseries = frame.\n
 
     private :
         ctl_file : str
@@ -28,12 +28,36 @@ class Observations:
             Contains the sampling period for the observation.\n
         offsets : list
             List that has the index of what is to be considered an offset value within the observations.\n
+        log : list
+            List of [epoch, relaxation time] pairs of logarithmic postseismic relaxations.\n
+        exp : list
+            List of [epoch, relaxation time] pairs of exponential postseismic relaxations.\n
         ctl_info : dict
             Dictionary filled with info related to control file.\n
         nan_share : float
-            Share (%) of NaN's in timeseries['Value'].\n
+            Share (%) of NaN's in the values.\n
+        mjd : numpy array
+            Contiguous float64 array with the epochs (mjd), the timeseries indexes.\n
+        values : numpy array
+            Contiguous float64 array with the observations, the timeseries column 'Value'.\n
+        gaps : numpy array
+            Boolean mask, True where values is NaN.\n
+        columns : dict
+            Pairs 'column name' : array of the other timeseries columns, such as estimates.\n
+        shared : bool
+            True while values is shared with a clone, it is copied before being written.\n
+        length : int
+            Number of epochs given by a catalog entry, before the values are loaded.\n
+        loaded : bool
+            False while only the header is known, the arrays are loaded on first use.\n
     """
 
+    __slots__ = ('__ctl_file', '__obs_file', '__ctl_info', '__sp', '__offsets', '__log', '__exp', '__nan_share', \
+                 '__mjd', '__values', '__gaps', '__columns', '__shared', '__length', '__loaded')
+
+    #   Arrays that are only read from the observations file on first use
+    __DEFERRED = ('_Observations__mjd', '_Observations__values', '_Observations__gaps', '_Observations__columns')
+
 
     #   Constructor for Observations object
     def __init__(self, ctl_file, obs_file):
@@ -46,10 +70,65 @@ class Observations:
         self.__ctl_info = {}
         self.__sp = 0.0
         self.__offsets = []
+        self.__log = []
+        self.__exp = []
         self.__nan_share = 0.0
 
-        #   Public
-        self.timeseries = pd.DataFrame()
+        #   Arrays behind timeseries, pandas is only imported when the DataFrame is requested
+        self.__set_arrays(np.zeros(0), np.zeros(0), {})
+        self.__length = 0
+
+
+    #   Called only for unset attributes, loads the values of an object opened with load_header
+    def __getattr__(self, name):
+        if name in Observations.__DEFERRED and not self.__loaded:
+            self.load_observations(header=False)
+            return getattr(self, name)
+        raise AttributeError(name)
+
+
+    #   The timeseries DataFrame, built from the arrays on demand
+    @property
+    def timeseries(self):
+        """
+        Pandas DataFrame with the values under column 'Value' and the other columns, indexed by mjd.\n
+        The DataFrame is a copy, the arrays stay the data of this object. Assign a modified DataFrame to store it.\n
+        """
+        import pandas as pd
+        return pd.DataFrame({'Value' : self.__values, **self.__columns}, index=self.__mjd, copy=True)
+
+
+    #   Replace the arrays by the contents of a DataFrame, read once
+    @timeseries.setter
+    def timeseries(self, frame):
+        columns = {c : np.array(frame[c].values) for c in frame.columns.to_list() if c != 'Value'}
+        self.__set_arrays(np.array(frame.index.values), np.array(frame['Value'].values), columns)
+
+
+    #   Read-only view of an array, arrays are shared with clones and only written by the ts_ methods
+    @staticmethod
+    def __readonly(array):
+        view = array.view()
+        view.setflags(write=False)
+        return view
+
+
+    #   Store contiguous float64 arrays and refresh the gap mask
+    def __set_arrays(self, mjd, values, columns):
+        self.__mjd = np.ascontiguousarray(mjd, dtype=np.float64)
+        self.__values = np.ascontiguousarray(values, dtype=np.float64)
+        self.__gaps = np.isnan(self.__values)
+        self.__columns = {c : np.ascontiguousarray(v, dtype=np.float64) for c, v in columns.items()}
+        self.__nan_share = float(np.mean(self.__gaps)) if len(self.__gaps) > 0 else 0.0
+        self.__shared = False
+        self.__loaded = True
+
+
+    #   Copy the values before writing them when a clone still uses them
+    def __own_values(self):
+        if self.__shared:
+            self.__values = self.__values.copy()
+            self.__shared = False
         
 
 
@@ -109,6 +188,31 @@ class Observations:
         """
         return self.__offsets
 
+
+    #   Setter for offsets list
+    def set_offsets(self, offsets):
+        """
+        Setter for 'offsets' attribute.\n
+        """
+        self.__offsets = offsets
+
+
+
+    #   Getter for log list
+    def get_log(self):
+        """
+        Getter for 'log' attribute.\n
+        """
+        return self.__log
+
+
+    #   Getter for exp list
+    def get_exp(self):
+        """
+        Getter for 'exp' attribute.\n
+        """
+        return self.__exp
+
     
     #   Getter for nan_share attribute
     def get_nan_share(self):
@@ -118,47 +222,181 @@ class Observations:
         return self.__nan_share
 
     
+    #   Getter for number of epochs
+    def get_length(self):
+        """
+        Returns the number of epochs, without loading the values of an object opened with load_header.\n
+        """
+        if self.__loaded:
+            return len(self.__mjd)
+        return self.__length
+
+
     #   Generic getter for column in timeseries attribute
     def __get_column(self, column):
-        if column in self.timeseries.columns.to_list():
-            return self.timeseries[column].values
+        if column == 'Value':
+            return self.__readonly(self.__values)
+        if column in self.__columns:
+            return self.__readonly(self.__columns[column])
         return []
     
     
     #   Get timeseries estimates
     def get_column(self, column):
         """
-        Returns a column from timeseries' DataFrame attribute\n
+        Returns a column from timeseries' DataFrame attribute as a read-only array\n
         """
         return self.__get_column(column)
 
 
+    #   Get the names of the timeseries columns
+    def get_column_names(self):
+        """
+        Returns the names of the timeseries columns, 'Value' first\n
+        """
+        return ['Value'] + list(self.__columns.keys())
+
+
     #   Get timeseries estimates
     def get_values(self):
         """
-        Returns this objects' timeseries column 'Value' as a list\n
+        Returns this objects' timeseries column 'Value' as a read-only array\n
         """
-        return self.__get_column('Value')
+        return self.__readonly(self.__values)
     
 
     #   Get timeseries indexes
     def get_indexes(self):
         """
-        Returns this objects' timeseries indexes as a list\n
+        Returns this objects' timeseries indexes as a read-only array\n
         """
-        return self.timeseries.index.values
+        return self.__readonly(self.__mjd)
+
+
+    #   Get gap mask
+    def get_gaps(self):
+        """
+        Returns a read-only boolean array, True where the timeseries has NaNs\n
+        """
+        return self.__readonly(self.__gaps)
+
+
+    #   Get the indexes of the observed epochs
+    def get_observed(self):
+        """
+        Returns the positions of the epochs that are not NaN, to be used instead of a copy without NaNs\n
+        """
+        return np.flatnonzero(~self.__gaps)
 
     
     #   Get MinimizationMethod attribute from control file if specified
-    def get_min_method(self):
+    def get_min_method(self, n=None):
         """
-        Returns a minimization method if specified in the 'ctl_info' dictionary or depending on nan_share value.\n
+        Returns a minimization method if specified in the 'ctl_info' dictionary.\n
+        With 'Default' (or 'Auto') the method predicted to be fastest by the cost model, within the memory budget, is returned.\n
+        Matfree is only returned when neither Fullcov nor AmmarGrag fits the budget.\n
+        'n' is the number of columns of the design matrix, by default derived from 'ctl_info' dictionary.\n
         """
-        if 'MinimizationMethod' in self.__ctl_info and self.__ctl_info['MinimizationMethod'] != 'Default':
+        if 'MinimizationMethod' in self.__ctl_info and self.__ctl_info['MinimizationMethod'] not in ['Default', 'Auto']:
             return self.__ctl_info['MinimizationMethod']
-        if self.__nan_share > 0.5:
-            return 'Fullcov'
-        return 'AmmarGrag'
+
+        #   Trend, periodic signals, offsets and postseismic relaxations
+        if n is None:
+            log, exp = self.get_postseismic()
+            n = 2 + 2*len(self.get_periods()) + len(self.get_estimated_offsets()) + len(log) + len(exp)
+
+        m = self.get_length()
+        k = int(round(self.__nan_share*m))
+        noisemodels = self.get_noisemodels()
+        costmodel = self.get_costmodel()
+        method, cost = costmodel.choose_default(m, k, n, len(noisemodels) if noisemodels else 1, self.get_memory_budget())
+        print('MinimizationMethod {0:s} : predicted {1:.3g} s per evaluation, {2:.1f} MB'.format(method, cost[0], cost[1]/1.0e6))
+        return method
+
+
+    #   Get the cost model of the minimization methods
+    def get_costmodel(self):
+        """
+        Returns a CostModel with the coefficients of 'CostModelFile' in 'ctl_info' dictionary, the built-in coefficients by default.\n
+        """
+        return CostModel(self.__ctl_info.get('CostModelFile'))
+
+
+    #   Get MemoryBudget attribute from control file if specified
+    def get_memory_budget(self):
+        """
+        Returns the bytes a process may use, 'MemoryBudget' (MB) in 'ctl_info' dictionary or by default half of the physical memory.\n
+        """
+        return CostModel.memory_budget(self.__ctl_info)
+
+
+    #   Get Whittle attribute from control file if specified
+    def get_whittle(self):
+        """
+        Returns the Whittle approximation option ('no', 'yes' or 'warmstart') specified in 'ctl_info' dictionary, 'no' by default.\n
+        """
+        if 'Whittle' in self.__ctl_info:
+            return self.__ctl_info['Whittle']
+        return 'no'
+
+
+    #   Get ExportFormat attribute from control file if specified
+    def get_export_format(self):
+        """
+        Returns the layout of exported files specified in 'ctl_info' dictionary, 'rows' ('Date' : Value pairs) by default or 'columns' (one array per column).\n
+        """
+        return self.__get_flag(['exportformat'], 'rows')
+
+
+    #   Get Interpolate attribute from control file if specified
+    def get_interpolate(self):
+        """
+        Returns 'yes' when the gaps must be filled in according to 'ctl_info' dictionary, 'no' by default.\n
+        Accepts both 'Interpolate' and 'interpolate' spellings of the key.\n
+        """
+        return self.__get_flag(['interpolate'])
+
+
+    #   Get a yes/no option from control file, accepting the spellings used by different control files
+    def __get_flag(self, names, default='no'):
+        for k,v in self.__ctl_info.items():
+            if k.lower() in names:
+                return v
+        return default
+
+
+    #   Get periodic signals from control file
+    def get_periods(self):
+        """
+        Returns the periods (days) of the seasonal and half-seasonal signals switched on in 'ctl_info' dictionary.\n
+        Accepts both 'seasonalsignal' and 'SeasonSignal' spellings of the keys.\n
+        """
+        periods = []
+        if self.__get_flag(['seasonalsignal', 'seasonsignal', 'seasonsignals']) == 'yes':
+            periods.append(365.25)
+        if self.__get_flag(['halfseasonalsignal', 'halfseasonsignal', 'halfseasonsignals']) == 'yes':
+            periods.append(182.625)
+        return periods
+
+
+    #   Get offsets that must be estimated according to control file
+    def get_estimated_offsets(self):
+        """
+        Returns the offsets, or an empty list when 'estimateoffsets' is switched off in 'ctl_info' dictionary.\n
+        """
+        if self.__get_flag(['estimateoffsets'], 'yes') == 'yes':
+            return self.__offsets
+        return []
+
+
+    #   Get postseismic relaxations that must be estimated according to control file
+    def get_postseismic(self):
+        """
+        Returns the 'log' and 'exp' lists, or empty lists when 'estimatepostseismic' is switched off in 'ctl_info' dictionary.\n
+        """
+        if self.__get_flag(['estimatepostseismic']) == 'yes':
+            return self.__log, self.__exp
+        return [], []
 
 
     #   Get NoiseModels attribute from control file
@@ -167,7 +405,25 @@ class Observations:
         Returns the 'NoiseModels' specified in 'ctl_info' dictionary\n
         """
         if 'NoiseModels' in self.__ctl_info:
-            return self.__ctl_info['NoiseModels']
+            noisemodels = self.__ctl_info['NoiseModels']
+            #   A single noise model may be stored as a string
+            if isinstance(noisemodels, str):
+                return [noisemodels]
+            return noisemodels
+
+
+    #   Get the noise model options from control file
+    def get_noiseoptions(self):
+        """
+        Returns the noise model options ('AR_p', 'MA_q', 'GGM_1mphi', 'PowerlawApprox_L') specified in 'ctl_info' dictionary.\n
+        The result can be passed as keyword arguments to Covariance.\n
+        """
+        casts = {'AR_p' : int, 'MA_q' : int, 'GGM_1mphi' : float, 'PowerlawApprox_L' : int}
+        options = {}
+        for key, cast in casts.items():
+            if key in self.__ctl_info:
+                options[key] = cast(self.__ctl_info[key])
+        return options
 
 
     #   Method to load control file into ctl_info attribute
@@ -180,54 +436,58 @@ class Observations:
     
 
     #   Method to load observations file into obs_info and obs_data
-    def load_observations(self):
+    def load_observations(self, header=True):
         """
-        Using this objects' obs_file attribute, fill both obs_info and obs_data dictionaries.\n
-        Fills 'timeseries', 'sp', 'offsets' and 'nan_share' attribute according to these 2 dictionaries.\n
+        Using this objects' obs_file attribute, read the header and columns of an observations file of any format.\n
+        Fills 'timeseries', 'sp', 'offsets' and 'nan_share' attribute according to them.\n
+        With 'header' False only the timeseries is filled, keeping the header attributes.\n
         """
-        obs_info, obs_data = readObservations(self.__obs_file)
+        try:
+            obs_info, columns = readColumns(self.__obs_file)
+        except (TypeError, ValueError) as err:
+            print('Type casting failed : {0}\n\
+                Please check your observations file integrity.'.format(err))
+            return
         
         try:
-            self.__sp = obs_info['Sampling period']
-            self.__offsets = obs_info['Offsets']
+            if header:
+                self.__sp = obs_info['Sampling period']
+                self.__offsets = obs_info['Offsets']
+                self.__log = obs_info.get('Log', [])
+                self.__exp = obs_info.get('Exp', [])
         except KeyError as e:
             print('Missing key values from observations, please verify file integrity.\n' + e)
 
-        values = []
-        indexes = []
-        est_values = []
+        #   Numeric columns other than 'mjd' and 'Value', such as estimates, are kept as well
+        indexes = columns.pop('mjd')
+        values = columns.pop('Value')
+        columns = {c : v for c, v in columns.items() if v.dtype.kind in 'fiu'}
+
+        #   NaN share in values is set along with the gap mask
+        self.__set_arrays(indexes, values, columns)
 
-        for k,v in obs_data.items():
-            
-            try:
-                indexes.append(float(k))
-                if isinstance(v, list):
-                    if len(v) == 1:
-                        values.append(float(v[0]))
-                    elif len(v) == 2:
-                        values.append(float(v[0]))
-                        est_values.append(float(v[1]))
-                    else:
-                        raise IndexError('Number of invalid columns')
-                else:
-                    values.append(float(v))
-            
-            except IndexError as e:
-                print(e)
-            except (TypeError, ValueError) as err:
-                print('Type casting failed : {0}\n\
-                    Please check your observations file integrity.'.format(err))
-        
-        #   Create a timeseries object using lists above
-        self.timeseries = pd.DataFrame(values, indexes, columns=['Value'])
-        
-        #   If there are already estimated values, add them as column
-        if est_values != []:
-            self.timeseries['Estimate c++'] = est_values
 
-        #   Calculate NaN share in ['Value']
-        if len(self.timeseries['Value']) is not 0:
-            self.__nan_share = self.timeseries['Value'].isnull().sum() / len(self.timeseries['Value'])
+    #   Method to fill the header attributes from a catalog entry, values are loaded on first use
+    def load_header(self, entry):
+        """
+        Fills 'sp', 'offsets', 'log', 'exp' and 'nan_share' attributes from a catalog 'entry' (see catalog.py) without reading the observations file.\n
+        The timeseries is read from obs_file the first time it is used.\n
+        """
+        self.__sp = entry['Sampling period']
+        self.__offsets = list(entry['Offsets'])
+        self.__log = list(entry.get('Log', []))
+        self.__exp = list(entry.get('Exp', []))
+        self.__nan_share = entry['Nan share']
+        self.__length = entry['Epochs']
+
+        #   Unset arrays are loaded by __getattr__
+        for name in Observations.__DEFERRED:
+            try:
+                delattr(self, name)
+            except AttributeError:
+                pass
+        self.__shared = False
+        self.__loaded = False
 
 
     #   From timeseries mjd indexes generate a new list that has datetime values in iso format
@@ -236,17 +496,36 @@ class Observations:
         Generates a list whose values are datetime objects converted from their mjd values in timeseries indexes\n
         If isoformat is True, values are displayed in ISO-8601 format.\n
         """
-        timemagic = lambda mjd : mjd_to_datetime(mjd, isoformat)
-        return list(map(timemagic, self.timeseries.index.values))
+        return mjd_to_isostrings(self.__mjd, isoformat).tolist()
 
 
-    #   Generates an identical deep copy of this instance
+    #   Generates an identical copy of this instance, sharing its arrays until one of them is written
     #   Removes NaNs if opted to do so
     def gen_deepclone(self, removeNans=False):
         """
-        Returns a deep copy of the current object, if its parameter is set to 'True' then removes NaN data in the process\n
-        """
-        new_observation = copy.deepcopy(self)
+        Returns a copy of the current object, if its parameter is set to 'True' then removes NaN data in the process\n
+        Arrays are shared with the copy and only copied by the first method that modifies them.\n
+        """
+        new_observation = Observations.__new__(Observations)
+        new_observation.__ctl_file = self.__ctl_file
+        new_observation.__obs_file = self.__obs_file
+        new_observation.__ctl_info = copy.deepcopy(self.__ctl_info)
+        new_observation.__sp = self.__sp
+        new_observation.__offsets = copy.copy(self.__offsets)
+        new_observation.__log = copy.copy(self.__log)
+        new_observation.__exp = copy.copy(self.__exp)
+        new_observation.__nan_share = self.__nan_share
+        new_observation.__mjd = self.__mjd
+        new_observation.__values = self.__values
+        new_observation.__gaps = self.__gaps
+        new_observation.__columns = dict(self.__columns)
+        new_observation.__length = self.__length
+        new_observation.__loaded = True
+
+        #   Both objects copy the values before writing them
+        new_observation.__shared = True
+        self.__shared = True
+
         if removeNans:
             new_observation.ts_dropnans()    
         return new_observation
@@ -257,28 +536,61 @@ class Observations:
         """
         Generates the F matrix, made by the timeseries attribute rows that contain NaNs.\n
         """
-        m = len(self.timeseries.index)      
-        n = self.timeseries['Value'].isnull().sum()
-        F = np.zeros((m,n))
+        gaps = np.flatnonzero(self.__gaps)
+        F = np.zeros((len(self.__mjd),len(gaps)))
 
-        j = 0
-            
-        #   Loop through time-series looking for NaNs,
-        for i in range(m):
-            if math.isnan(self.timeseries.iloc[i,0]):
-                #   On indexes that have NaN's replace the 0 with 1
-                F[i,j] = 1.0                             
-                j += 1                 
+        #   On indexes that have NaN's replace the 0 with 1
+        F[gaps, np.arange(len(gaps))] = 1.0
 
         return F
 
     
+    #   Replace values by NaNs
+    def ts_set_nans(self, mask):
+        """
+        Modifies timeseries attribute by replacing the values where 'mask' is True with NaNs.\n
+        """
+        mask = np.asarray(mask, dtype=bool)
+        self.__own_values()
+        self.__values[mask] = np.nan
+        self.__gaps = self.__gaps | mask
+        self.__nan_share = float(np.mean(self.__gaps))
+
+
+    #   Replace NaNs by values
+    def ts_fill_gaps(self, values):
+        """
+        Modifies timeseries attribute by replacing the NaNs with the corresponding entries of 'values'.\n
+        Returns the number of filled epochs.\n
+        """
+        gaps = self.__gaps
+        self.__own_values()
+        self.__values[gaps] = np.asarray(values, dtype=np.float64)[gaps]
+        self.__gaps = np.zeros(len(gaps), dtype=bool)
+        self.__nan_share = 0.0
+        return int(np.sum(gaps))
+
+
     #   Drop all lines in timeseries that have NaNs
     def ts_dropnans(self):
         """
         Modifies timeseries attribute by deleting all rows that have NaNs.\n
+        Without NaNs inside the series the arrays become views, otherwise only the kept rows are gathered.\n
         """
-        self.timeseries = self.timeseries.dropna()
+        keep = self.get_observed()
+        if len(keep) == len(self.__mjd):
+            return
+
+        #   NaNs only at the start or the end, a slice keeps the buffers shared
+        if len(keep) > 0 and keep[-1] - keep[0] + 1 == len(keep):
+            keep = slice(keep[0], keep[-1] + 1)
+        else:
+            self.__shared = False
+
+        self.__mjd = self.__mjd[keep]
+        self.__values = self.__values[keep]
+        self.__gaps = self.__gaps[keep]
+        self.__columns = {c : v[keep] for c, v in self.__columns.items()}
         self.__nan_share = 0.0
     
 
@@ -296,8 +608,8 @@ class Observations:
         """
         Switch current indexes in timeseries attribute to the ones in 'indexes'\n
         """
-        if len(self.timeseries.index) == len(indexes):
-            self.timeseries.index = indexes
+        if len(self.__mjd) == len(indexes):
+            self.__mjd = np.array(indexes, dtype=np.float64)
 
 
     #   Append values to column_name in timeseries
@@ -305,23 +617,28 @@ class Observations:
         """
         Appends parameter 'values' into timeseries attribute under column 'Estimate'.\n
         """
-        if len(values) == len(self.timeseries.index):
-            self.timeseries[column_name] = values
+        if len(values) == len(self.__mjd):
+            self.__columns[column_name] = np.array(values, dtype=np.float64).ravel()
     
 
     #   Plot the columns present in timeseries
-    def ts_plot(self, save=False, path='timeseries_plot.png'):
+    def ts_plot(self, save=False, path='timeseries_plot.png', dates=False):
         """
         Plots a representation of timeseries attribute.\n
         The plot may be saved in 'path'.\n
+        If dates is True, the horizontal axis shows calendar dates instead of mjd.\n
         """
-        for column in self.timeseries.columns.to_list():
+        from matplotlib import pyplot as plt
+        indexes = mjd_to_datetime64(self.__mjd) if dates else self.__mjd
+        for column in self.get_column_names():
             if column == 'Value':
-                plt.plot(self.get_indexes(), self.get_values(), 'o', label='Original Data', markersize=1)
+                plt.plot(indexes, self.get_values(), 'o', label='Original Data', markersize=1)
             else:
-                plt.plot(self.get_indexes(), self.get_column(column), label=column)
+                plt.plot(indexes, self.get_column(column), label=column)
 
-        plt.xlabel('Day', fontsize=12)
+        plt.xlabel('Date' if dates else 'Day', fontsize=12)
+        if dates:
+            plt.gcf().autofmt_xdate()
         plt.ylabel('Value', fontsize=12)
         plt.legend()
         
@@ -333,19 +650,33 @@ class Observations:
         
 
     #   Bundles and exports informatin regarding timeseries attribute
-    def export_series(self, path='observations.json'):
+    def export_series(self, path='observations.json', columnar=None):
         """
         Export this object's timeseries attribute into an observations file in .json format file located in 'path'.\n
+        Every column is written, as pairs 'Date' : {'Column' : Value}.\n
+        A 'path' ending in .npz is written in binary format instead, with one array per column (see writeColumns).\n
+        If columnar is True, mjd and every timeseries column are stored as arrays and streamed to the file (see writeColumns),\n
+        by default the 'ExportFormat' in 'ctl_info' dictionary decides.\n
+        Returns the bundled information, the observations only included when written as .json rows.\n
         """
+        if columnar is None:
+            columnar = self.get_export_format() == 'columns'
+
         #   The bundled information to be stored
         exportdict = {
             'Sampling period' : self.__sp,
             'Offsets'         : self.__offsets,
-            'Observations'    : self.timeseries.to_dict(orient='index')
+            'Log'             : self.__log,
+            'Exp'             : self.__exp
         }
-        
-        #   Use export function with path
-        if writeToFile(exportdict, path):
+
+        if columnar or path.endswith('.npz'):
+            success = writeColumns(exportdict, self.__gen_columns(), path)
+        else:
+            exportdict['Observations'] = self.__gen_rows()
+            success = writeToFile(exportdict, path)
+
+        if success:
             print('Successfully dumped series in file path:\n{0}'.format(path))
         else:
             print('Something went wrong when dumping series in file path in:\n{0}'.format(path))
@@ -355,10 +686,17 @@ class Observations:
 
     #   Bundle current Observations object into a json file
     #   TODO : Maybe always store it in the same folder and parameter is just a name?
-    def export_object(self, path='object.json'):
+    def export_object(self, path='object.json', dates=False, columnar=None):
         """
         Export this object's state into a .json format file located in 'path'.\n
+        If dates is True, the ISO-8601 dates of the indexes are stored under 'Dates'.\n
+        If columnar is True, the timeseries is stored as arrays and streamed to the file, which may then end in .npz (see writeColumns),\n
+        by default the 'ExportFormat' in 'ctl_info' dictionary decides.\n
+        Returns the bundled information, the observations only included when written as .json rows.\n
         """
+        if columnar is None:
+            columnar = self.get_export_format() == 'columns'
+
         #   The bundled information to be stored
         exportdict = {
             'Control file path'      : self.__ctl_file,
@@ -366,15 +704,38 @@ class Observations:
             'Observations file path' : self.__obs_file,
             'Offsets'                : self.__offsets,
             'Nan share'              : self.__nan_share,
-            'Sampling period'        : self.__sp,
-            'Observations'           : self.timeseries.to_dict(orient='index')
+            'Sampling period'        : self.__sp
         }
+
+        if columnar:
+            columns = self.__gen_columns()
+            if dates:
+                columns['Dates'] = mjd_to_isostrings(self.__mjd)
+            success = writeColumns(exportdict, columns, path)
+        else:
+            exportdict['Observations'] = self.__gen_rows()
+            if dates:
+                exportdict['Dates'] = self.gen_tsindexes_iso()
+            success = writeToFile(exportdict, path)
         
-        #   Use export function with path
-        if writeToFile(exportdict, path):
+        if success:
             print('Successfully dumped object in file path:\n{0}'.format(path))
         else:
             print('Something went wrong when dumping object in file path in:\n{0}'.format(path))
 
         return exportdict
-    
\ No newline at end of file
+
+
+    #   Pairs 'Date' : {'Column' : Value} of every timeseries column, the layout of DataFrame.to_dict(orient='index')
+    def __gen_rows(self):
+        names = self.get_column_names()
+        table = np.column_stack([self.__get_column(c) for c in names]).tolist()
+        return {mjd : dict(zip(names, row)) for mjd, row in zip(self.__mjd.tolist(), table)}
+
+
+    #   Pairs 'column name' : array of the epochs and every timeseries column
+    def __gen_columns(self):
+        columns = {'mjd' : self.__mjd}
+        for column in self.get_column_names():
+            columns[column] = self.get_column(column)
+        return columns
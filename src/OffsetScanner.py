@@ -0,0 +1,161 @@
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve, solve_triangular
+from AmmarGrag import AmmarGrag
+
+class OffsetScanner:
+
+    def __init__(self, t, H, x):
+        """ initialise class, for fixed noise parameters scores a step at
+            every epoch by its reduction of the weighted sum of squared
+            residuals, without refitting the series for each candidate.
+            Missing data are absorbed by extra parameters, as in AmmarGrag.
+
+        Arguments
+        ---------
+        t (m*1 matrix) : first column of Toeplitz covariance matrix C
+        H (m*n matrix) : design matrix
+        x (m*1 matrix) : observations (may contain NaN's)
+        """
+
+        self.method = AmmarGrag()
+        [l1,l2,self.Fl1,self.Fl2,self.ln_det_C] = self.method.compute_filters(t)
+        m = len(t)
+        self.m = m
+
+        #--- Missing data
+        gaps = np.isnan(x)
+        self.missing = np.flatnonzero(gaps)
+        self.observed = ~gaps
+        k = len(self.missing)
+        self.N = m - k
+        self.y = np.where(gaps,0.0,x)
+
+        #--- C^-1 F and Cholesky factor of F'C^-1F, computed once
+        if k>0:
+            F = np.zeros((m,k))
+            F[self.missing,np.arange(k)] = 1.0
+            self.CF = self.apply_Cinv(F)
+            self.G = cho_factor(self.CF[self.missing,:], lower=True)
+        else:
+            self.CF = np.zeros((m,0))
+
+        #--- s_j'C^-1 s_j of step s_j starting at epoch j: L1 s_j is cumsum(l1)
+        #    shifted down to j, so its norm is a cumulative sum
+        c1 = np.cumsum(l1[0:m])
+        c2 = np.cumsum(l2[0:m])
+        d0 = np.cumsum(c1*c1) - np.cumsum(c2*c2)
+        self.d0 = d0[::-1]
+
+        #--- Minus s_j'C^-1F (F'C^-1F)^-1 F'C^-1 s_j, the part absorbed by gaps
+        if k>0:
+            S = self.reverse_cumsum(self.CF)
+            A = solve_triangular(self.G[0], S.T, lower=True)
+            self.d0 -= np.sum(A*A,axis=0)
+
+        #--- K applied to y and to the columns of H, K = C^-1 restricted to
+        #    the observations
+        self.Ky = self.apply_K(self.y[:,None])[:,0]
+        self.KD = self.apply_K(np.where(gaps[:,None],0.0,H))
+        self.D = np.where(gaps[:,None],0.0,H)
+
+
+
+    def reverse_cumsum(self, V):
+        """ Sums from each row to the end, s_j'V for all steps s_j
+        """
+
+        return np.cumsum(V[::-1],axis=0)[::-1]
+
+
+
+    def apply_Cinv(self, V):
+        """ C^-1 V, see AmmarGrag.apply_inverse
+        """
+
+        return self.method.apply_inverse(self.Fl1,self.Fl2,V)
+
+
+
+    def apply_K(self, V):
+        """ C^-1 V with the missing data projected out
+
+        Arguments
+        ---------
+        V (m*p matrix) : columns
+
+        Returns
+        -------
+        W (m*p matrix) : (C^-1 - C^-1F (F'C^-1F)^-1 F'C^-1) V
+        """
+
+        W = self.apply_Cinv(V)
+        if len(self.missing)>0:
+            W -= self.CF @ cho_solve(self.G, W[self.missing,:])
+        return W
+
+
+
+    def fit(self):
+        """ Weighted least-squares with the current design matrix
+
+        Returns
+        -------
+        theta (n*1 matrix)    : estimated parameters
+        ss (float)            : weighted sum of squared residuals
+        """
+
+        self.normal = cho_factor(self.D.T @ self.KD, lower=True)
+        b = self.KD.T @ self.y
+        theta = cho_solve(self.normal,b)
+        ss = np.dot(self.y,self.Ky) - np.dot(b,theta)
+
+        return [theta,ss]
+
+
+
+    def scan(self):
+        """ Reduction of the weighted sum of squared residuals when a step at
+            epoch j is added to the design matrix, for every j at once
+
+        Returns
+        -------
+        delta (m*1 matrix) : reduction for each epoch, NaN for epochs that are
+                             not candidates
+        ss (float)         : current weighted sum of squared residuals
+        """
+
+        [theta,ss] = self.fit()
+
+        #--- s_j'K(y - D theta) and s_j'K D for all j
+        u = self.reverse_cumsum(self.Ky - self.KD @ theta)
+        U = self.reverse_cumsum(self.KD)
+
+        #--- s_j'Q s_j, with D projected out
+        B = solve_triangular(self.normal[0], U.T, lower=True)
+        d = self.d0 - np.sum(B*B,axis=0)
+
+        #--- Candidates are observed epochs after the first one whose step is
+        #    not (nearly) a combination of existing columns
+        valid = self.observed.copy()
+        valid[0] = False
+        valid &= d > 1.0e-10*np.max(np.abs(self.d0))
+        delta = np.full(self.m, np.nan)
+        delta[valid] = u[valid]*u[valid]/d[valid]
+
+        return [delta,ss]
+
+
+
+    def add_offset(self, j):
+        """ Adds a step at epoch j to the design matrix
+
+        Arguments
+        ---------
+        j (int) : index of first epoch after the offset
+        """
+
+        s = np.zeros(self.m)
+        s[j:] = 1.0
+        s[~self.observed] = 0.0
+        self.D = np.column_stack((self.D,s))
+        self.KD = np.column_stack((self.KD,self.apply_K(s[:,None])))
@@ -0,0 +1,140 @@
+import time
+
+class Profiler:
+
+    def __init__(self, enabled=True, label=None, callback=None):
+        """ initialise class, accumulates the time spent in named stages,
+            counters and the optimizer trace of one estimation. A disabled
+            profiler only costs a method call per stage.
+
+        Arguments
+        ---------
+        enabled (bool)      : False to switch all measurements off
+        label (string)      : name of the station or series in the report
+        callback (function) : called with the report by emit, e.g. to export
+                              it to a metrics system (optional)
+        """
+
+        self.enabled = enabled
+        self.label = label
+        self.callback = callback
+        self.clear()
+
+
+
+    def clear(self):
+        """ Forgets all measurements
+        """
+
+        self.seconds = {}
+        self.calls = {}
+        self.counters = {}
+        self.trace = []
+
+
+
+    def timer(self, stage):
+        """ Context manager adding the time of its block to 'stage'
+
+        Arguments
+        ---------
+        stage (string) : e.g. 'create_t', 'levinson', 'whiten', 'gaps', 'solve'
+        """
+
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self,stage)
+
+
+
+    def count(self, name, n=1):
+        """ Adds n to counter 'name'
+        """
+
+        if self.enabled:
+            self.counters[name] = self.counters.get(name,0) + n
+
+
+
+    def record(self, param, value):
+        """ Appends a point of the optimizer trace
+
+        Arguments
+        ---------
+        param (array float) : noise parameters
+        value (float)       : minimized function at param
+        """
+
+        if self.enabled:
+            self.trace.append([[float(p) for p in param],float(value)])
+
+
+
+    def report(self):
+        """ Structured report of the measurements
+
+        Returns
+        -------
+        report (dict) : 'label', 'stages' (calls and seconds per stage),
+                        'counters' and 'trace'
+        """
+
+        stages = {}
+        for stage in self.seconds:
+            stages[stage] = {'calls' : self.calls[stage], 'seconds' : self.seconds[stage]}
+
+        return {'label' : self.label, 'stages' : stages, 'counters' : dict(self.counters), \
+                'trace' : list(self.trace)}
+
+
+
+    def emit(self):
+        """ Passes the report to the callback, if any
+
+        Returns
+        -------
+        report (dict) : see report, None when disabled
+        """
+
+        if not self.enabled:
+            return None
+        report = self.report()
+        if self.callback is not None:
+            self.callback(report)
+        return report
+
+
+
+class _Timer:
+
+    __slots__ = ('profiler','stage','start')
+
+    def __init__(self, profiler, stage):
+        self.profiler = profiler
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        p = self.profiler
+        p.seconds[self.stage] = p.seconds.get(self.stage,0.0) + time.perf_counter() - self.start
+        p.calls[self.stage] = p.calls.get(self.stage,0) + 1
+        return False
+
+
+
+class _NullTimer:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+
+_NULL_TIMER = _NullTimer()
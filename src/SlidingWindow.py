@@ -0,0 +1,164 @@
+import math
+import numpy as np
+from multiprocessing import Pool
+from numpy.lib.stride_tricks import sliding_window_view
+from AmmarGrag import AmmarGrag
+from DesignMatrix import DesignMatrix
+
+class SlidingWindow:
+
+    def __init__(self, mjd, x, sp, offsets, periods, cov, param, window):
+        """ initialise class, factorizes the covariance matrix of one window.
+            For fixed noise parameters and window length the filters l1 and
+            l2 and the whitened trend and seasonal columns are the same for
+            every window.
+
+        Arguments
+        ---------
+        mjd (array float)   : epochs of observations
+        x (array float)     : observations (may contain NaN's)
+        sp (float)          : sampling period
+        offsets (list)      : epochs of offsets
+        periods (list)      : periodic signals in unit days
+        cov (Covariance)    : noise models
+        param (array float) : noise parameters, e.g. from MLE on whole series
+        window (int)        : number of epochs in each window
+        """
+
+        #--- Copy observations into class
+        self.mjd = np.array(mjd, dtype=float)
+        self.x = np.array(x, dtype=float)
+        self.sp = sp
+        self.offsets = np.array(offsets, dtype=float)
+        self.w = window
+        self.method = AmmarGrag()
+
+        #--- One factorization for all windows
+        t = cov.create_t(self.w, param)
+        [l1,l2,self.Fl1,self.Fl2,self.ln_det_C] = self.method.compute_filters(t)
+        self.l1 = l1[0:self.w]
+        self.l2 = l2[0:self.w]
+        self.c1 = np.cumsum(self.l1)    # L1 @ step function
+        self.c2 = np.cumsum(self.l2)
+
+        #--- Trend and seasonal signal in local time of a window. Values
+        #    in gaps do not matter since F absorbs them.
+        H = DesignMatrix.create_DesignMatrix(sp, [], self.mjd[0:self.w], periods)
+        [B1,B2] = self.method.whiten(self.Fl1, self.Fl2, H)
+        self.B1 = B1.T
+        self.B2 = B2.T
+        self.n = H.shape[1]
+
+
+
+    def __shifted(self, c, positions):
+        """ Columns c shifted down to each position, zero above
+
+        Arguments
+        ---------
+        c (w*1 matrix)    : column to shift
+        positions (array) : start of each column
+
+        Returns
+        -------
+        S (p*w matrix) : shifted columns as rows
+        """
+
+        S = np.zeros((len(positions),self.w))
+        for i,j in enumerate(positions):
+            S[i,j:] = c[0:self.w-j]
+        return S
+
+
+
+    def solve_windows(self, starts):
+        """ Trend of each window starting at the given indexes
+
+        Arguments
+        ---------
+        starts (array int) : index of first epoch of each window
+
+        Returns
+        -------
+        results (p*3 matrix) : trend, its standard deviation and sigma_eta
+        """
+
+        #--- Constant
+        EPS = 1.0e-4
+
+        results = np.full((len(starts),3), np.nan)
+
+        #--- Whiten observations of all windows in one batch
+        gaps = np.isnan(self.x)
+        xm = np.where(gaps,0.0,self.x)
+        X = sliding_window_view(xm,self.w)[starts,:].T
+        [Y1,Y2] = self.method.whiten(self.Fl1, self.Fl2, X)
+
+        for i,start in enumerate(starts):
+            end = start + self.w
+
+            #--- Offsets inside window become step functions
+            mjd = self.mjd[start:end]
+            steps = [np.searchsorted(mjd, offset - EPS) for offset in self.offsets]
+            steps = sorted(set([j for j in steps if 0<j<self.w]))
+
+            #--- Missing data
+            missing = np.flatnonzero(gaps[start:end])
+            k = len(missing)
+            if self.w - k <= self.n + len(steps):
+                continue
+
+            #--- Whitened columns of offsets and gaps are shifted copies of
+            #    cumsum(l1) and l1, no FFT needed
+            A1 = np.vstack((self.B1, self.__shifted(self.c1,steps)))
+            A2 = np.vstack((self.B2, self.__shifted(self.c2,steps)))
+            G1 = self.__shifted(self.l1,missing)
+            G2 = self.__shifted(self.l2,missing)
+
+            try:
+                [theta,C_theta,ln_det_C,sigma_eta] = self.method.solve(Y1[:,i], \
+                                     Y2[:,i], A1, A2, G1, G2, self.ln_det_C)
+            except np.linalg.LinAlgError:
+                continue
+
+            #--- Trend in unit per year
+            results[i,0] = theta[1]*365.25/self.sp
+            results[i,1] = sigma_eta*math.sqrt(C_theta[1,1])*365.25/self.sp
+            results[i,2] = sigma_eta
+
+        return results
+
+
+
+    def run(self, step=1, processes=1, chunk=256):
+        """ Slide window over the series
+
+        Arguments
+        ---------
+        step (int)      : number of epochs between windows
+        processes (int) : number of worker processes
+        chunk (int)     : number of windows whitened in one batch
+
+        Returns
+        -------
+        windows (dict) : arrays 'MJD' (centre of window), 'Trend',
+                         'Trend sigma' and 'sigma_eta'
+        """
+
+        m = len(self.x)
+        starts = np.arange(0, m-self.w+1, step)
+        batches = [starts[i:i+chunk] for i in range(0,len(starts),chunk)]
+
+        if processes>1:
+            with Pool(processes) as pool:
+                results = pool.map(self.solve_windows, batches)
+        else:
+            results = [self.solve_windows(batch) for batch in batches]
+        results = np.vstack(results) if len(results)>0 else np.zeros((0,3))
+
+        return {
+            'MJD'         : self.mjd[starts + self.w//2],
+            'Trend'       : results[:,0],
+            'Trend sigma' : results[:,1],
+            'sigma_eta'   : results[:,2]
+        }
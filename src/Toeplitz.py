@@ -0,0 +1,138 @@
+import numpy as np
+from numpy import fft
+from scipy.fft import next_fast_len
+from AmmarGrag import AmmarGrag
+
+class Toeplitz:
+
+    def __init__(self, t, observed=None, precondition='yes'):
+        """ initialise class, the covariance matrix C and its block of
+            observed epochs are only applied as FFT products, C is never
+            stored. Memory is O(m) per column. The Gohberg-Semencul factors of
+            the preconditioner cost an O(m^2) Durbin-Levinson recursion.
+
+        Arguments
+        ---------
+        t (m*1 matrix)        : first column of Toeplitz covariance matrix C
+        observed (m*1 matrix) : boolean mask of observed epochs (optional)
+        precondition (string) : 'yes' to precondition conjugate gradients by
+                                C^-1 restricted to the observed epochs
+        """
+
+        m = len(t)
+        self.m = m
+        self.t = t
+        self.observed = np.ones(m, dtype=bool) if observed is None else observed
+
+        #--- C embedded in circulant matrix of size L >= 2m-1 with fast FFT,
+        #    first column [t_0 ... t_m-1 0 ... 0 t_m-1 ... t_1]
+        L = next_fast_len(2*m-1, real=True)
+        self.L = L
+        c = np.zeros(L)
+        c[0:m] = t
+        c[L-m+1:] = t[m-1:0:-1]
+        self.Fc = fft.rfft(c)
+
+        #--- Gohberg-Semencul factors of C^-1
+        self.method = AmmarGrag()
+        if precondition == 'yes':
+            [self.l1,self.l2,self.Fl1,self.Fl2,self.ln_det_C] = self.method.compute_filters(t)
+        else:
+            self.Fl1 = None
+
+
+
+    def multiply(self, V):
+        """ C V by circulant embedding
+
+        Arguments
+        ---------
+        V (m*p matrix) : columns
+
+        Returns
+        -------
+        W (m*p matrix) : C V
+        """
+
+        FV = fft.rfft(V,self.L,axis=0)
+
+        return fft.irfft(self.Fc[:,None] * FV,self.L,axis=0)[0:self.m,:]
+
+
+
+    def multiply_observed(self, V):
+        """ Observed block of C applied to the observed rows of V, zero at
+            the gaps
+        """
+
+        W = self.multiply(np.where(self.observed[:,None],V,0.0))
+        W[~self.observed,:] = 0.0
+
+        return W
+
+
+
+    def precondition(self, R):
+        """ C^-1 restricted to the observed epochs, identity without filters
+        """
+
+        if self.Fl1 is None:
+            return R.copy()
+        W = self.method.apply_inverse(self.Fl1,self.Fl2,R)
+        W[~self.observed,:] = 0.0
+
+        return W
+
+
+
+    def pcg(self, B, tol=1.0e-10, maxiter=None):
+        """ Preconditioned conjugate gradients on all columns at once, solves
+            the observed block of C, C_oo Z = B
+
+        Arguments
+        ---------
+        B (m*p matrix)  : right-hand sides, rows of gaps are ignored
+        tol (float)     : relative residual norm at convergence
+        maxiter (int)   : maximum number of iterations, m by default
+
+        Returns
+        -------
+        Z (m*p matrix)  : solutions, zero at the gaps
+        iterations (int): number of iterations
+        """
+
+        if maxiter is None:
+            maxiter = self.m
+
+        R = np.where(self.observed[:,None],B,0.0)
+        Z = np.zeros(R.shape)
+        norm_B = np.linalg.norm(R,axis=0)
+        active = norm_B>0.0
+
+        Y = self.precondition(R)
+        P = Y.copy()
+        ry = np.sum(R*Y,axis=0)
+
+        iterations = 0
+        while np.any(active) and iterations<maxiter:
+            iterations += 1
+
+            #--- Step along P, converged columns are frozen
+            AP = self.multiply_observed(P)
+            pAp = np.sum(P*AP,axis=0)
+            alpha = np.zeros(len(ry))
+            alpha[active] = ry[active]/pAp[active]
+            Z += alpha*P
+            R -= alpha*AP
+
+            active &= np.linalg.norm(R,axis=0) > tol*norm_B
+
+            #--- New search direction
+            Y = self.precondition(R)
+            ry_new = np.sum(R*Y,axis=0)
+            beta = np.zeros(len(ry))
+            beta[active] = ry_new[active]/ry[active]
+            P = Y + beta*P
+            ry = ry_new
+
+        return [Z,iterations]
@@ -0,0 +1,58 @@
+import math
+import numpy as np
+from numpy import fft
+
+class Whittle:
+
+    def __init__(self, x, H):
+        """ initialise class, computes the periodogram of the OLS residuals
+
+        Arguments
+        ---------
+        x (m*1 matrix) : observations (may contain NaN's)
+        H (m*n matrix) : design matrix
+        """
+
+        #--- Get size of matrix H
+        (m,n) = H.shape
+        self.m = m
+
+        #--- Ordinary least-squares using only the observed epochs
+        mask = ~np.isnan(x)
+        self.N = int(np.count_nonzero(mask))
+        theta = np.linalg.lstsq(H[mask,:], x[mask], rcond=None)[0]
+
+        #--- Residuals, gaps are set to zero
+        r = np.zeros(m)
+        r[mask] = x[mask] - H[mask,:] @ theta
+
+        #--- Periodogram at the Fourier frequencies, leaving out the zero
+        #    frequency and, for even m, the Nyquist frequency
+        M = (m-1)//2
+        self.f = np.arange(1,M+1)/m
+        self.I = (np.abs(fft.rfft(r)[1:M+1])**2)/self.N
+
+
+
+    def compute_loglikelihood(self, g):
+        """ Whittle approximation of the log-likelihood
+
+        Arguments
+        ---------
+        g (M*1 matrix) : PSD of the noise model at the Fourier frequencies,
+                         normalised to a driving noise of unit variance
+
+        Returns
+        -------
+        logL (float)      : approximate log-likelihood, scaled to N epochs
+        sigma_eta (float) : driving noise
+        """
+
+        #--- Driving noise can be computed analytically
+        sigma_eta2 = np.mean(self.I/g)
+
+        #--- mean(ln g) approximates ln_det_C/N (Szego)
+        logL = -0.5 * self.N * (math.log(2*math.pi) + math.log(sigma_eta2) + \
+                                   np.mean(np.log(g)) + 1.0)
+
+        return [logL, math.sqrt(sigma_eta2)]
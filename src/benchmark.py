@@ -0,0 +1,380 @@
+import os, sys, time, math, platform, tempfile, subprocess
+import numpy as np
+from Observations import Observations
+from DesignMatrix import DesignMatrix
+from Covariance import Covariance
+from CostModel import CostModel
+from MLE import MLE
+from Profiler import Profiler
+from workload import generate
+from support_readwrite import readControl, writeToFile, writeObservations
+
+#   Benchmark of loading, design matrix and minimization methods on the test observations
+
+ENGINES = ['AmmarGrag', 'Fullcov', 'Matfree', 'KalmanFilter']
+TEST_FILES = ['synthethic', 'ex1', 'ex2', 'ex4', 'ch6station0_2']
+GENERATED = [(1000, 0.1), (4000, 0.3), (2000, 0.6)]
+
+#   Modules of the loading and estimation path, their import must stay within the budget
+#   (seconds, numpy included) and must not load the heavy modules
+CORE_MODULES = ['Observations', 'MLE', 'Covariance', 'DesignMatrix']
+HEAVY_MODULES = ['pandas', 'matplotlib', 'scipy.optimize', 'scipy.signal']
+IMPORT_BUDGET = 0.25
+
+
+def best_of(f, repeat):
+    """
+    best_of :
+        Shortest wall clock time of 'repeat' calls of f.
+
+    Parameters
+    ----------
+    f : function
+        Function without arguments.
+    repeat : int
+        Number of calls.
+
+    Returns
+    -------
+    seconds : float
+        Shortest time.
+    result :
+        Result of the last call.
+    """
+
+    seconds = math.inf
+    for i in range(0, repeat):
+        t0 = time.perf_counter()
+        result = f()
+        seconds = min(seconds, time.perf_counter() - t0)
+
+    return seconds, result
+
+
+def generate_series(folder, m, gap_fraction, seed=0):
+    """
+    generate_series :
+        Writes a series of m daily epochs with trend, yearly signal and
+        power-law plus white noise, of which a fraction is missing at random.
+
+    Parameters
+    ----------
+    folder : str
+        Folder of the written file.
+    m : int
+        Number of epochs.
+    gap_fraction : float
+        Fraction of missing epochs.
+    seed : int
+        Seed of the random numbers.
+
+    Returns
+    -------
+    filepath : str
+        Path to the binary observations file.
+    """
+
+    rng = np.random.default_rng([seed, m, int(1000*gap_fraction)])
+    header, mjd, x = generate(m, rng, trend=0.01, seasonal={365.25 : 3.0}, gaps={'random' : gap_fraction})
+
+    filepath = os.path.join(folder, 'generated_{0:d}_{1:02d}.npz'.format(m, int(100*gap_fraction)))
+    writeObservations(header, mjd, x, filepath)
+
+    return filepath
+
+
+def import_time(modules=CORE_MODULES, repeat=3):
+    """
+    import_time :
+        Time to import 'modules' in a fresh interpreter, the way a new worker
+        process pays it.
+
+    Parameters
+    ----------
+    modules : list
+        Names of modules.
+    repeat : int
+        Number of interpreters, the fastest one is kept.
+
+    Returns
+    -------
+    seconds : float
+        Shortest import time.
+    loaded : list
+        Heavy modules loaded by the import.
+    """
+
+    code = 'import time, sys\n' \
+           't0 = time.perf_counter()\n' \
+           'import {0:s}\n' \
+           'print(time.perf_counter() - t0)\n' \
+           'print(",".join(m for m in {1} if m in sys.modules))\n'.format(', '.join(modules), HEAVY_MODULES)
+
+    seconds = math.inf
+    for i in range(0, repeat):
+        output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)), \
+                                capture_output=True, text=True, check=True).stdout.split('\n')
+        seconds = min(seconds, float(output[0]))
+        loaded = [m for m in output[1].split(',') if m != '']
+
+    return seconds, loaded
+
+
+def check_imports(budget=IMPORT_BUDGET, repeat=3):
+    """
+    check_imports :
+        Flags an import of the estimation path that exceeds 'budget' seconds
+        or loads plotting, pandas or the optimizer.
+
+    Returns
+    -------
+    flags : list
+        One message per violation.
+    """
+
+    seconds, loaded = import_time(CORE_MODULES, repeat)
+    flags = []
+    if seconds > budget:
+        flags.append('import of {0} takes {1:.3f} s, budget {2:.3f} s'.format(CORE_MODULES, seconds, budget))
+    for module in loaded:
+        flags.append('import of {0} loads {1:s}'.format(CORE_MODULES, module))
+
+    return flags
+
+
+def benchmark_file(ctl_file, obs_file, engines=ENGINES, repeat=3, limit=60.0):
+    """
+    benchmark_file :
+        Times loading, building the design matrix, one likelihood evaluation
+        and the full estimation of every minimization method. Methods whose
+        estimation is predicted to take longer than 'limit' seconds are
+        skipped.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file.
+    obs_file : str
+        Path to observations file.
+    engines : list
+        Minimization methods.
+    repeat : int
+        Number of repetitions of the short stages, the best one is kept.
+    limit : float
+        Maximum predicted seconds of a full estimation.
+
+    Returns
+    -------
+    result : dict
+        Sizes and seconds of each stage, estimates of each method.
+    """
+
+    def load():
+        o = Observations(ctl_file, obs_file)
+        o.load_control()
+        o.load_observations()
+        return o
+
+    def design():
+        H = DesignMatrix.create_DesignMatrix(o.get_sp(), o.get_offsets(), o.get_indexes(), o.get_periods())
+        return H, o.gen_F_matrix(), Covariance(o.get_noisemodels(), **o.get_noiseoptions())
+
+    seconds_load, o = best_of(load, repeat)
+    seconds_design, (H, F, cov) = best_of(design, repeat)
+    x = o.get_values()
+    (m, n) = H.shape
+    k = F.shape[1]
+    result = {'m' : m, 'k' : k, 'n' : n, 'load' : seconds_load, 'design' : seconds_design, 'engines' : {}}
+
+    #   Typical number of evaluations of Nelder-Mead, to predict a full estimation
+    costs = CostModel().predict(m, k, n, cov.Nmodels)
+    param0 = [0.1]*cov.Nparam
+    for engine in engines:
+        if engine == 'KalmanFilter' and not cov.has_ss():
+            result['engines'][engine] = {'skipped' : 'no state-space form'}
+            continue
+        if engine in costs and 100*costs[engine][0] > limit:
+            result['engines'][engine] = {'skipped' : 'predicted {0:.0f} s'.format(100*costs[engine][0])}
+            continue
+
+        profiler = Profiler(False)
+        mle = MLE(x, F, engine, H, cov, profiler=profiler)
+        seconds_evaluation, logL = best_of(lambda : mle.log_likelihood(param0), repeat)
+        [theta, C_theta, ln_det_C, sigma_eta] = \
+            mle.method.compute_leastsquares(mle.create_covariance(param0), H, x, F)
+
+        profiler.enabled = True
+        t0 = time.perf_counter()
+        estimates = mle.estimate_parameters()
+        seconds_estimation = time.perf_counter() - t0
+
+        result['engines'][engine] = {
+            'evaluation' : seconds_evaluation,
+            'estimation' : seconds_estimation,
+            'evaluations' : profiler.counters.get('evaluations', 0),
+            'logL' : float(logL),
+            'theta' : theta.tolist(),
+            'sigma_eta' : float(sigma_eta),
+            'param' : estimates[4].tolist(),
+            'sigma_eta_estimated' : float(estimates[3])
+        }
+
+    return result
+
+
+def run_benchmark(ctl_file, output_file, folder=None, engines=ENGINES, repeat=3, limit=60.0, \
+                  generated=GENERATED, seed=0):
+    """
+    run_benchmark :
+        Benchmarks the bundled test observations and generated series of
+        controlled length and gap fraction, and writes the results.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file used for all series.
+    output_file : str
+        Path to .json file of results.
+    folder : str
+        Folder of the test observations, 'hector_files/test_observations' by default.
+    engines : list
+        Minimization methods.
+    repeat : int
+        Number of repetitions of the short stages.
+    limit : float
+        Maximum predicted seconds of a full estimation.
+    generated : list
+        Pairs (number of epochs, gap fraction) of generated series.
+    seed : int
+        Seed of the generated series.
+
+    Returns
+    -------
+    results : dict
+        Machine description and results of each series.
+    """
+
+    if folder is None:
+        folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'hector_files', 'test_observations')
+
+    results = {
+        'machine' : {'platform' : platform.platform(), 'python' : platform.python_version(), 'numpy' : np.__version__},
+        'control' : readControl(ctl_file),
+        'series'  : {}
+    }
+
+    seconds, loaded = import_time(CORE_MODULES, repeat)
+    results['imports'] = {'modules' : CORE_MODULES, 'seconds' : seconds, 'loaded' : loaded}
+
+    for name in TEST_FILES:
+        print('Benchmarking {0:s}'.format(name))
+        results['series'][name] = benchmark_file(ctl_file, os.path.join(folder, name + '.json'), engines, repeat, limit)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for m, gap_fraction in generated:
+            filepath = generate_series(tmp, m, gap_fraction, seed)
+            name = os.path.splitext(os.path.basename(filepath))[0]
+            print('Benchmarking {0:s}'.format(name))
+            results['series'][name] = benchmark_file(ctl_file, filepath, engines, repeat, limit)
+
+    if writeToFile(results, output_file):
+        print('Successfully dumped benchmark in file path:\n{0}'.format(output_file))
+
+    return results
+
+
+def compare(baseline, current, threshold=0.25, rtol=1.0e-6, atol_param=0.05):
+    """
+    compare :
+        Flags stages of 'current' that are slower than in 'baseline' by more
+        than 'threshold', and methods of 'current' whose results disagree
+        with the first method that ran.
+
+    Parameters
+    ----------
+    baseline : dict
+        Results of run_benchmark.
+    current : dict
+        Results of run_benchmark.
+    threshold : float
+        Allowed relative slowdown.
+    rtol : float
+        Relative tolerance of theta and sigma_eta for the same noise parameters.
+    atol_param : float
+        Absolute tolerance of the estimated noise parameters.
+
+    Returns
+    -------
+    flags : list
+        One message per slowdown or disagreement.
+    """
+
+    flags = []
+    if 'imports' in current and 'imports' in baseline:
+        old_seconds, new_seconds = baseline['imports']['seconds'], current['imports']['seconds']
+        if new_seconds > (1.0 + threshold)*old_seconds:
+            flags.append('imports : slower, {0:.4f} s -> {1:.4f} s'.format(old_seconds, new_seconds))
+        for module in current['imports']['loaded']:
+            if module not in baseline['imports']['loaded']:
+                flags.append('imports : now loads {0:s}'.format(module))
+
+    for name, series in current['series'].items():
+
+        #   Slowdowns
+        if name in baseline['series']:
+            old = baseline['series'][name]
+            pairs = [(stage, series[stage], old[stage]) for stage in ['load', 'design']]
+            for engine, result in series['engines'].items():
+                old_result = old['engines'].get(engine, {})
+                for stage in ['evaluation', 'estimation']:
+                    if stage in result and stage in old_result:
+                        pairs.append(('{0:s} {1:s}'.format(engine, stage), result[stage], old_result[stage]))
+            for stage, new_seconds, old_seconds in pairs:
+                if new_seconds > (1.0 + threshold)*old_seconds:
+                    flags.append('{0:s} : {1:s} slower, {2:.4f} s -> {3:.4f} s'.format(name, stage, old_seconds, new_seconds))
+
+        #   Agreement between methods
+        ran = [(engine, result) for engine, result in series['engines'].items() if 'skipped' not in result]
+        if len(ran) < 2:
+            continue
+        reference, expected = ran[0]
+        for engine, result in ran[1:]:
+            theta_a = np.array(expected['theta'])
+            theta_b = np.array(result['theta'])
+            if not np.allclose(theta_b, theta_a, rtol=rtol, atol=rtol*np.max(np.abs(theta_a))) or \
+               not math.isclose(result['sigma_eta'], expected['sigma_eta'], rel_tol=rtol):
+                flags.append('{0:s} : {1:s} and {2:s} disagree on theta or sigma_eta'.format(name, engine, reference))
+            if np.max(np.abs(np.array(result['param']) - np.array(expected['param'])), initial=0.0) > atol_param:
+                flags.append('{0:s} : {1:s} and {2:s} disagree on noise parameters {3} and {4}'.format( \
+                             name, engine, reference, result['param'], expected['param']))
+
+    return flags
+
+
+if __name__ == '__main__':
+
+    #   benchmark.py run control.json output.json [repeat]
+    #   benchmark.py compare baseline.json current.json [threshold]
+    #   benchmark.py imports [budget]
+    if len(sys.argv) < 2 or sys.argv[1] not in ['run', 'compare', 'imports'] or \
+       (sys.argv[1] != 'imports' and len(sys.argv) < 4):
+        print('Usage : benchmark.py (run control.json output.json [repeat] | compare baseline.json current.json [threshold] | imports [budget])')
+        sys.exit(0)
+
+    if sys.argv[1] == 'imports':
+        budget = float(sys.argv[2]) if len(sys.argv) > 2 else IMPORT_BUDGET
+        seconds, loaded = import_time()
+        print('import of {0} : {1:.3f} s, heavy modules loaded : {2}'.format(CORE_MODULES, seconds, loaded))
+        flags = check_imports(budget)
+        for flag in flags:
+            print(flag)
+        print('{0:d} flags'.format(len(flags)))
+    elif sys.argv[1] == 'run':
+        repeat = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+        run_benchmark(sys.argv[2], sys.argv[3], repeat=repeat)
+    else:
+        threshold = float(sys.argv[4]) if len(sys.argv) > 4 else 0.25
+        flags = compare(readControl(sys.argv[2]), readControl(sys.argv[3]), threshold)
+        for flag in flags:
+            print(flag)
+        print('{0:d} flags'.format(len(flags)))
@@ -0,0 +1,37 @@
+import sys
+from CostModel import CostModel
+
+#   Calibration of the cost model of the minimization methods on this machine
+
+
+def calibratecost(output_file=None, repeat=3):
+    """
+    calibratecost :
+        Times the kernels of the cost model and writes the coefficients,
+        which are used when 'CostModelFile' in the control file points to
+        'output_file'.
+
+    Parameters
+    ----------
+    output_file : str
+        Path to .json file of coefficients, not written when None.
+    repeat : int
+        Number of sizes timed per kernel.
+
+    Returns
+    -------
+    coefficients : dict
+        Seconds per unit of work of each kernel.
+    """
+
+    return CostModel().calibrate(output_file, repeat)
+
+
+if __name__ == '__main__':
+
+    #   calibratecost.py [costmodel.json]
+    output_file = sys.argv[1] if len(sys.argv) > 1 else None
+    for key, value in calibratecost(output_file).items():
+        print('{0:10s} : {1:.3e}'.format(key, value))
+    if output_file is not None:
+        print('Successfully dumped coefficients in file path:\n{0}'.format(output_file))
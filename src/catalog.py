@@ -0,0 +1,210 @@
+import os, sys, json
+from Observations import Observations
+from support_batch import map_tasks
+from support_conv import search_files
+from support_readwrite import writeToFile
+
+#   Index of the observations files of a network, to plan a batch without reading every file
+
+
+def scan_file(abspath):
+    """
+    scan_file :
+        Reads one observations file and returns its catalog entry.
+
+    Parameters
+    ----------
+    abspath : str
+        Path to an observations file (.json or .npz).
+
+    Returns
+    -------
+    entry : dict
+        'File', 'Station', 'Component', 'Epochs', 'Nan share', 'Sampling period',
+        'Offsets', 'Log', 'Exp', 'Span' ([first, last] epoch), 'Modified' and 'Size'.
+    """
+
+    #   Files of components are named 'STATION_0', 'STATION_1', ...
+    name = os.path.splitext(os.path.basename(abspath))[0]
+    station, _, component = name.rpartition('_')
+    if station == '':
+        station, component = name, ''
+
+    o = Observations(None, abspath)
+    o.load_observations()
+    mjd = o.get_indexes()
+    stat = os.stat(abspath)
+
+    return {
+        'File'            : abspath,
+        'Station'         : station,
+        'Component'       : component,
+        'Epochs'          : len(mjd),
+        'Nan share'       : float(o.get_nan_share()),
+        'Sampling period' : o.get_sp(),
+        'Offsets'         : o.get_offsets(),
+        'Log'             : o.get_log(),
+        'Exp'             : o.get_exp(),
+        'Span'            : [float(mjd[0]), float(mjd[-1])] if len(mjd) > 0 else [],
+        'Modified'        : stat.st_mtime,
+        'Size'            : stat.st_size
+    }
+
+
+def read_catalog(catalog_file):
+    """
+    read_catalog :
+        Reads a catalog written by build_catalog.
+
+    Parameters
+    ----------
+    catalog_file : str
+        Path to the catalog (.json).
+
+    Returns
+    -------
+    entries : list
+        Catalog entries, see scan_file. Empty when the file does not exist.
+    """
+
+    if not os.path.exists(catalog_file):
+        return []
+    with open(catalog_file, 'r') as fp:
+        return json.load(fp)['Files']
+
+
+def build_catalog(folders, catalog_file, processes=1):
+    """
+    build_catalog :
+        Scans the observations files of 'folders' and writes their entries
+        in 'catalog_file'. Entries of files that did not change since the
+        previous catalog are kept without reading the files again.
+
+    Parameters
+    ----------
+    folders : list
+        Folders searched recursively for observations files (.json or .npz).
+    catalog_file : str
+        Path to the catalog (.json), updated when it exists.
+    processes : int
+        Number of worker processes.
+
+    Returns
+    -------
+    entries : list
+        Catalog entries sorted by file, see scan_file.
+    """
+
+    previous = {entry['File'] : entry for entry in read_catalog(catalog_file)}
+
+    entries = []
+    tasks = []
+    for folder in folders:
+        for ftype in ['.json', '.npz']:
+            for fname, abspath in search_files(folder, ftype):
+                entry = previous.get(abspath)
+                stat = os.stat(abspath)
+                if entry is not None and entry['Modified'] == stat.st_mtime and entry['Size'] == stat.st_size:
+                    entries.append(entry)
+                else:
+                    tasks.append(abspath)
+
+    entries += map_tasks(scan_file, tasks, processes)
+
+    entries.sort(key=lambda entry : entry['File'])
+    writeToFile({'Files' : entries}, catalog_file)
+    print('{0:d} files in catalog, {1:d} scanned'.format(len(entries), len(tasks)))
+
+    return entries
+
+
+def open_entry(ctl_file, entry):
+    """
+    open_entry :
+        Observations of a catalog entry, with its control file loaded and
+        only the header filled in. Values are read on first use.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file.
+    entry : dict
+        Catalog entry, see scan_file.
+
+    Returns
+    -------
+    o : Observations
+        Observations opened with load_header.
+    """
+
+    o = Observations(ctl_file, entry['File'])
+    o.load_control()
+    o.load_header(entry)
+    return o
+
+
+def schedule(ctl_file, entries, min_method=None):
+    """
+    schedule :
+        Sorts the catalog entries by the predicted cost of a likelihood
+        evaluation, largest first, so that a pool of workers finishes the
+        long series early and balances the remaining ones.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file used for all files.
+    entries : list
+        Catalog entries, see scan_file.
+    min_method : str
+        Minimization method whose cost is predicted, by default the method
+        chosen for 'MinimizationMethod : Default'.
+
+    Returns
+    -------
+    entries : list
+        Pairs [entry, predicted seconds per evaluation] in decreasing order of cost.
+    """
+
+    costmodel = None
+    scheduled = []
+    for entry in entries:
+        o = open_entry(ctl_file, entry)
+        if costmodel is None:
+            costmodel = o.get_costmodel()
+            noisemodels = o.get_noisemodels()
+            Nmodels = len(noisemodels) if noisemodels else 1
+
+        #   Columns of the design matrix, as in Observations.get_min_method
+        log, exp = o.get_postseismic()
+        n = 2 + 2*len(o.get_periods()) + len(o.get_estimated_offsets()) + len(log) + len(exp)
+        m = o.get_length()
+        k = int(round(o.get_nan_share()*m))
+        if min_method is None:
+            seconds = costmodel.choose_default(m, k, n, Nmodels, o.get_memory_budget())[1][0]
+        else:
+            seconds = costmodel.predict(m, k, n, Nmodels)[min_method][0]
+        scheduled.append([entry, seconds])
+
+    scheduled.sort(key=lambda pair : -pair[1])
+    return scheduled
+
+
+if __name__ == '__main__':
+
+    #   catalog.py build catalog.json folder [folder ...] [processes]
+    #   catalog.py schedule catalog.json control.json [min_method]
+    if len(sys.argv) < 4 or sys.argv[1] not in ['build', 'schedule']:
+        print('Usage : catalog.py (build catalog.json folder [folder ...] [processes] | schedule catalog.json control.json [min_method])')
+        sys.exit(0)
+
+    if sys.argv[1] == 'build':
+        folders = sys.argv[3:]
+        processes = 1
+        if len(folders) > 1 and folders[-1].isdigit():
+            processes = int(folders.pop())
+        build_catalog(folders, sys.argv[2], processes)
+    else:
+        min_method = sys.argv[4] if len(sys.argv) > 4 else None
+        for entry, seconds in schedule(sys.argv[3], read_catalog(sys.argv[2]), min_method):
+            print('{0:s} : {1:d} epochs, {2:.3g} s per evaluation'.format(entry['File'], entry['Epochs'], seconds))
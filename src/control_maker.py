@@ -19,7 +19,10 @@ def info():
     print('EstimateOffsets     -> yes | no')
     print('ScaleFactor2        ->  ?')
     print('PhysicalUnit2       ->  ?')
-    print('MinimizationMethod  -> AmmarGrag | Fullcov')
+    print('MinimizationMethod  -> AmmarGrag | Fullcov | Matfree | KalmanFilter | Default (chosen by cost model)')
+    print('MemoryBudget        -> megabytes per process used by the cost model (optional, default half of memory)')
+    print('CostModelFile       -> coefficients written by calibratecost.py (optional)')
+    print('ExportFormat        -> rows | columns (optional, default rows, columns streams one array per column)')
 
 
 
@@ -144,10 +147,10 @@ def q9():
 
 def q10():
     
-    possibleanswers = ["AmmarGrag", "Fullcov", 'Default']
+    possibleanswers = ["AmmarGrag", "Fullcov", "Matfree", "KalmanFilter", 'Default']
 
     while True:
-        p = input('Minimization Method : (Fullcov | AmmarGrag | Default) - ').strip()
+        p = input('Minimization Method : (Fullcov | AmmarGrag | Matfree | KalmanFilter | Default) - ').strip()
         if p in possibleanswers:
             return p
         print('Invalid input')
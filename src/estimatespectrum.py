@@ -0,0 +1,177 @@
+import os, sys
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from support_batch import open_observations, map_folder
+from support_readwrite import writeArrays
+
+#   Welch power spectral density of observations or residuals
+
+
+def welch_psd(x, sp, segments=4, interpolate='yes'):
+    """
+    welch_psd :
+        One-sided power spectral density by averaging the periodograms of
+        overlapping (50%) Hann windowed segments.
+
+    Parameters
+    ----------
+    x : numpy array
+        Observations or residuals, may contain NaN's.
+    sp : float
+        Sampling period in days.
+    segments : int
+        Number of segments.
+    interpolate : str
+        'yes' to fill gaps by linear interpolation, 'no' to mask them and
+        scale each segment by its observed window energy.
+
+    Returns
+    -------
+    f : numpy array
+        Frequencies in Hz, zero frequency excluded.
+    G : numpy array
+        Power spectral density in unit^2/Hz.
+    """
+
+    x = np.asarray(x, dtype=float)
+    m = len(x)
+    observed = ~np.isnan(x)
+    if np.sum(observed) < 2:
+        print('Not enough observations to estimate a spectrum')
+        sys.exit(0)
+
+    #   Remove mean, then deal with the gaps
+    i = np.arange(m)
+    x = x - np.mean(x[observed])
+    if interpolate == 'yes':
+        x = np.interp(i, i[observed], x[observed])
+        observed = np.ones(m, dtype=bool)
+    else:
+        x = np.where(observed, x, 0.0)
+
+    #   Segments of length L that overlap 50%, as strided views of x
+    L = 2*m // (segments+1)
+    L -= L % 2
+    if L < 4:
+        print('Too many segments for series of length {0:d}'.format(m))
+        sys.exit(0)
+    step = L // 2
+    w = np.hanning(L)
+    X = sliding_window_view(x, L)[::step]
+    S2 = sliding_window_view(observed.astype(float), L)[::step] @ (w*w)
+
+    #   All segments in one batched transform, skip nearly empty segments
+    Y = np.fft.rfft(X*w, axis=1)
+    used = S2 > 0.5*np.dot(w,w)
+    if not np.any(used):
+        print('All segments contain too many gaps')
+        sys.exit(0)
+    fs = 1.0/(sp*86400.0)
+    P = (Y[used].real**2 + Y[used].imag**2) / (fs*S2[used,None])
+    G = np.mean(P, axis=0)
+
+    #   One-sided spectrum, zero and Nyquist frequency are not doubled
+    G[1:-1] *= 2.0
+    f = np.arange(0, L//2+1) * fs/L
+
+    return [f[1:], G[1:]]
+
+
+def estimatespectrum(ctl_file, obs_file, segments=4):
+    """
+    estimatespectrum :
+        Power spectral density of the observations in 'obs_file'. When the
+        file has an estimated model column, the spectrum of the residuals is
+        computed.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file, uses 'Interpolate' (see
+        Observations.get_interpolate) and 'ScaleFactor'.
+    obs_file : str
+        Path to observations file.
+    segments : int
+        Number of segments.
+
+    Returns
+    -------
+    f : numpy array
+        Frequencies in Hz.
+    G : numpy array
+        Power spectral density in unit^2/Hz.
+    """
+
+    o = open_observations(ctl_file, obs_file)
+    control = o.get_control_dict()
+
+    #   Residuals if a model was estimated
+    x = np.array(o.get_values(), dtype=float)
+    models = o.get_column_names()[1:]
+    if models != []:
+        x = x - np.array(o.get_column(models[0]), dtype=float)
+
+    if 'ScaleFactor' in control:
+        x *= float(control['ScaleFactor'])
+
+    return welch_psd(x, o.get_sp(), segments, o.get_interpolate())
+
+
+def estimate_file(args):
+    """
+    Pool worker, estimates the spectrum of one file and writes it.\n
+    """
+    ctl_file, obs_file, output_file, segments = args
+    f, G = estimatespectrum(ctl_file, obs_file, segments)
+    return writeArrays({'Frequency' : f, 'PSD' : G}, output_file)
+
+
+def estimate_folder(ctl_file, folder, existing_folder, folder_name='spectra', segments=4, processes=1):
+    """
+    estimate_folder :
+        Estimates the spectrum of every observations file in 'folder' and
+        writes frequencies and PSD in binary .npz files.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file used for all files.
+    folder : str
+        Folder searched for .json observations files.
+    existing_folder : str
+        Folder where the output folder is created.
+    folder_name : str
+        Name of output folder.
+    segments : int
+        Number of segments.
+    processes : int
+        Number of worker processes.
+
+    Returns
+    -------
+    output_files : list
+        Paths to the written files.
+    """
+
+    return list(map_folder(estimate_file, ctl_file, folder, existing_folder, folder_name, (segments,), \
+                           ftypes=('.json',), extension='.npz', processes=processes))
+
+
+if __name__ == '__main__':
+
+    #   estimatespectrum.py control.json observations.json [segments]
+    #   estimatespectrum.py control.json folder output_folder [segments] [processes]
+    if len(sys.argv) < 3:
+        print('Usage : estimatespectrum.py control.json (observations.json | folder output_folder)')
+        sys.exit(0)
+
+    if os.path.isdir(sys.argv[2]):
+        segments = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+        processes = int(sys.argv[5]) if len(sys.argv) > 5 else 1
+        for output_file in estimate_folder(sys.argv[1], sys.argv[2], sys.argv[3], segments=segments, processes=processes):
+            print(output_file)
+    else:
+        segments = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+        f, G = estimatespectrum(sys.argv[1], sys.argv[2], segments)
+        for i in range(0, len(f)):
+            print('{0:e}  {1:e}'.format(f[i], G[i]))
@@ -0,0 +1,194 @@
+import os, sys, math
+import numpy as np
+from Covariance import Covariance
+from MLE import MLE
+from OffsetScanner import OffsetScanner
+from support_batch import open_observations, create_trajectory, map_tasks
+from support_conv import create_folder, search_files
+from support_readwrite import readControl
+
+#   Detection of offsets by BIC, scanning all epochs for fixed noise parameters
+
+
+def create_scanner(o, param=None):
+    """
+    create_scanner :
+        Estimates the noise parameters of Observations 'o' with its current
+        design matrix (unless 'param' is given) and prepares the scan.
+
+    Parameters
+    ----------
+    o : Observations
+        Observations with loaded control and observations file.
+    param : numpy array
+        Noise parameters, estimated with MLE when None.
+
+    Returns
+    -------
+    scanner : OffsetScanner
+        Scanner with the current design matrix.
+    """
+
+    x = o.get_values()
+    H = create_trajectory(o, o.get_offsets())
+    cov = Covariance(o.get_noisemodels(), **o.get_noiseoptions())
+
+    if param is None:
+        mle = MLE(x, None, o.get_min_method(), H, cov, budget=o.get_memory_budget(), \
+                  costmodel=o.get_costmodel())
+        param = mle.estimate_parameters()[4]
+
+    return OffsetScanner(cov.create_t(len(x), param), H, x)
+
+
+def findoffset(observations, params=None, max_offsets=10):
+    """
+    findoffset :
+        Adds offsets one by one at the epoch that lowers the BIC most, until
+        no epoch lowers it. With 'offsets_3D' switched on in the control file
+        all components get the same offsets and their scores are summed.
+        Each added offset costs log(N) for its size in each component, log(N)
+        for its epoch and 'BIC_c_ExtraPenalty'.
+        The noise parameters are kept fixed during the search; the priors
+        'beta_size' and 'beta_spacing' are not used.
+
+    Parameters
+    ----------
+    observations : list
+        Observations of each component of a station, with loaded control
+        and observations files. Their 'Offsets' are updated.
+    params : list
+        Noise parameters of each component, estimated with MLE when None.
+    max_offsets : int
+        Maximum number of new offsets per component.
+
+    Returns
+    -------
+    new_offsets : list
+        Per component, epochs of the detected offsets.
+    """
+
+    control = observations[0].get_control_dict()
+    extra = float(control['BIC_c_ExtraPenalty']) if 'BIC_c_ExtraPenalty' in control else 0.0
+    joint = control['offsets_3D'] == 'yes' if 'offsets_3D' in control else False
+    if params is None:
+        params = [None]*len(observations)
+    scanners = [create_scanner(o, param) for o, param in zip(observations, params)]
+
+    #   Components searched together or one by one
+    groups = [list(range(0, len(observations)))] if joint else [[c] for c in range(0, len(observations))]
+    new_offsets = [[] for o in observations]
+
+    for group in groups:
+        for i in range(0, max_offsets):
+
+            #   Change of BIC of each candidate epoch, summed over components
+            N = scanners[group[0]].N
+            dBIC = np.full(scanners[group[0]].m, math.log(N) + extra)
+            for c in group:
+                delta, ss = scanners[c].scan()
+                dBIC += scanners[c].N*np.log1p(-delta/ss) + math.log(scanners[c].N)
+
+            dBIC = np.where(np.isnan(dBIC), np.inf, dBIC)
+            j = int(np.argmin(dBIC))
+            if not dBIC[j] < 0.0:
+                break
+
+            for c in group:
+                scanners[c].add_offset(j)
+                new_offsets[c].append(float(observations[c].get_indexes()[j]))
+
+    for o, offsets in zip(observations, new_offsets):
+        o.set_offsets(list(o.get_offsets()) + offsets)
+
+    return new_offsets
+
+
+def findoffset_files(args):
+    """
+    Pool worker, finds the offsets of the components of one station and writes them.\n
+    """
+    ctl_file, obs_files, output_files, max_offsets = args
+    observations = [open_observations(ctl_file, obs_file) for obs_file in obs_files]
+
+    new_offsets = findoffset(observations, max_offsets=max_offsets)
+    for o, output_file in zip(observations, output_files):
+        o.export_series(output_file)
+
+    return new_offsets
+
+
+def findoffset_folder(ctl_file, folder, existing_folder, folder_name='offset_files', max_offsets=10, processes=1):
+    """
+    findoffset_folder :
+        Finds the offsets of every station in 'folder'. Components of a
+        station are files named 'STATION_0', 'STATION_1', ... and are
+        searched together when 'offsets_3D' is switched on.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file used for all files.
+    folder : str
+        Folder searched for observations files (.json or .npz).
+    existing_folder : str
+        Folder where the output folder is created.
+    folder_name : str
+        Name of output folder.
+    max_offsets : int
+        Maximum number of new offsets per component.
+    processes : int
+        Number of worker processes.
+
+    Returns
+    -------
+    new_offsets : dict
+        Pairs 'output file' : epochs of detected offsets.
+    """
+
+    output_folder = create_folder(existing_folder, folder_name)
+    control = readControl(ctl_file)
+    joint = control['offsets_3D'] == 'yes' if 'offsets_3D' in control else False
+
+    #   Group components by station name
+    stations = {}
+    for ftype in ['.json', '.npz']:
+        for fname, abspath in search_files(folder, ftype):
+            name = os.path.splitext(fname)[0]
+            station = name.rsplit('_', 1)[0] if joint else name
+            stations.setdefault(station, []).append((fname, abspath))
+
+    tasks = []
+    for station, files in sorted(stations.items()):
+        files.sort()
+        tasks.append((ctl_file, [f[1] for f in files], \
+                      [os.path.join(output_folder, f[0]) for f in files], max_offsets))
+
+    new_offsets = {}
+    for task, offsets in zip(tasks, map_tasks(findoffset_files, tasks, processes)):
+        new_offsets.update(dict(zip(task[2], offsets)))
+
+    return new_offsets
+
+
+if __name__ == '__main__':
+
+    #   findoffset.py control.json observations.json [observations.json ...] output_folder
+    #   findoffset.py control.json folder output_folder [processes]
+    if len(sys.argv) < 4:
+        print('Usage : findoffset.py control.json (observations.json [...] | folder) output_folder')
+        sys.exit(0)
+
+    folder, name = os.path.split(os.path.abspath(sys.argv[-1]))
+    if os.path.isdir(sys.argv[2]):
+        processes = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+        folder, name = os.path.split(os.path.abspath(sys.argv[3]))
+        new_offsets = findoffset_folder(sys.argv[1], sys.argv[2], folder, name, processes=processes)
+    else:
+        output_folder = create_folder(folder, name)
+        obs_files = sys.argv[2:-1]
+        output_files = [os.path.join(output_folder, os.path.basename(f)) for f in obs_files]
+        new_offsets = dict(zip(output_files, findoffset_files((sys.argv[1], obs_files, output_files, 10))))
+
+    for output_file, offsets in new_offsets.items():
+        print('{0:s} : {1}'.format(output_file, offsets))
@@ -0,0 +1,86 @@
+from Covariance import Covariance
+from MLE import MLE
+from support_batch import create_trajectory, update_file, map_folder, run_file_or_folder
+
+#   Filling of gaps with their best linear unbiased prediction
+
+
+def interpolategaps(o, param=None):
+    """
+    interpolategaps :
+        Replaces the NaN's in the timeseries of Observations 'o' by the
+        fitted trajectory model plus the conditional expectation of the
+        noise, when 'Interpolate' is switched on in the control file.
+
+    Parameters
+    ----------
+    o : Observations
+        Observations with loaded control and observations file.
+    param : numpy array
+        Noise parameters, estimated with MLE when None.
+
+    Returns
+    -------
+    n_filled : int
+        Number of filled epochs.
+    """
+
+    if o.get_interpolate() != 'yes':
+        return 0
+
+    x = o.get_values()
+    H = create_trajectory(o)
+    cov = Covariance(o.get_noisemodels(), **o.get_noiseoptions())
+
+    #   Trajectory model for the given or the estimated noise parameters
+    mle = MLE(x, None, o.get_min_method(), H, cov, o.get_whittle(), budget=o.get_memory_budget(), \
+              costmodel=o.get_costmodel())
+    if param is None:
+        [theta, C_theta, ln_det_C, sigma_eta, param] = mle.estimate_parameters()
+    else:
+        t = mle.create_covariance(param)
+        theta = mle.method.compute_leastsquares(t, H, x, mle.F)[0]
+
+    return o.ts_fill_gaps(mle.interpolate_gaps(theta, param))
+
+
+def interpolate_file(args):
+    """
+    Pool worker, fills the gaps of one file and writes it in the same format.\n
+    """
+    return update_file(interpolategaps, *args)
+
+
+def interpolate_folder(ctl_file, folder, existing_folder, folder_name='filled_files', processes=1):
+    """
+    interpolate_folder :
+        Fills the gaps of every observations file (.json or .npz) in
+        'folder' and writes the filled files in a new folder.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file used for all files.
+    folder : str
+        Folder searched for observations files.
+    existing_folder : str
+        Folder where the output folder is created.
+    folder_name : str
+        Name of output folder.
+    processes : int
+        Number of worker processes.
+
+    Returns
+    -------
+    n_filled : dict
+        Pairs 'output file' : number of filled epochs.
+    """
+
+    return map_folder(interpolate_file, ctl_file, folder, existing_folder, folder_name, processes=processes)
+
+
+if __name__ == '__main__':
+
+    #   interpolategaps.py control.json observations.json output.json
+    #   interpolategaps.py control.json folder output_folder [processes]
+    run_file_or_folder('interpolategaps.py', interpolate_file, interpolate_folder, '{0:d} epochs filled')
@@ -0,0 +1,89 @@
+import sys
+import numpy as np
+from Covariance import Covariance
+from Observations import Observations
+from support_readwrite import readArrays, writeArrays
+
+#   Theoretical power spectral density of estimated noise models
+
+
+def model_frequencies(sp, timenoisestart=1000, n=1000):
+    """
+    model_frequencies :
+        Logarithmically spaced frequencies from the period 'timenoisestart'
+        samples up to the Nyquist frequency.
+
+    Parameters
+    ----------
+    sp : float
+        Sampling period in days.
+    timenoisestart : float
+        Number of sampling periods the noise has been running, which sets
+        the lowest frequency.
+    n : int
+        Number of frequencies.
+
+    Returns
+    -------
+    f : numpy array
+        Frequencies in Hz.
+    """
+
+    T = sp*86400.0
+    return np.logspace(np.log10(1.0/(timenoisestart*T)), np.log10(0.5/T), n)
+
+
+def modelspectrum(ctl_file, params, sigma_eta, sp, f=None):
+    """
+    modelspectrum :
+        PSD of the noise models in 'ctl_file' for one or many estimated
+        parameter vectors, e.g. to overlay them on the output of
+        estimatespectrum.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file, uses 'NoiseModels', the noise model options
+        and 'TimeNoiseStart'.
+    params : numpy array
+        Noise parameters as returned by MLE, one row per estimate.
+    sigma_eta : numpy array
+        Driving noise of each estimate.
+    sp : float
+        Sampling period in days.
+    f : numpy array
+        Frequencies in Hz, by default given by model_frequencies.
+
+    Returns
+    -------
+    f : numpy array
+        Frequencies in Hz.
+    G : numpy array
+        PSD in unit^2/Hz, one row per estimate.
+    """
+
+    o = Observations(ctl_file, None)
+    o.load_control()
+    control = o.get_control_dict()
+    cov = Covariance(o.get_noisemodels(), **o.get_noiseoptions())
+
+    if f is None:
+        timenoisestart = float(control['TimeNoiseStart']) if 'TimeNoiseStart' in control else 1000
+        f = model_frequencies(sp, timenoisestart)
+
+    return [f, cov.create_psd_batch(f, params, sigma_eta, sp)]
+
+
+if __name__ == '__main__':
+
+    #   modelspectrum.py control.json estimates.npz output.npz
+    #   estimates.npz holds arrays 'param', 'sigma_eta' and 'Sampling period'
+    if len(sys.argv) < 4:
+        print('Usage : modelspectrum.py control.json estimates.npz output.npz')
+        sys.exit(0)
+
+    estimates = readArrays(sys.argv[2])
+    f, G = modelspectrum(sys.argv[1], estimates['param'], estimates['sigma_eta'], \
+                         float(estimates['Sampling period']))
+    if writeArrays({'Frequency' : f, 'PSD' : G}, sys.argv[3]):
+        print('Successfully dumped spectra in file path:\n{0}'.format(sys.argv[3]))
@@ -0,0 +1,173 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from support_batch import create_trajectory, update_file, map_folder, run_file_or_folder
+
+#   Removal of outliers from the residuals of an ordinary least-squares fit
+
+
+def residual_statistics(R, window=None):
+    """
+    residual_statistics :
+        Median and interquartile range of the residuals, of the whole series
+        or of a centred rolling window.
+
+    Parameters
+    ----------
+    R : numpy array
+        Residuals, one column per series, NaN where not observed.
+    window : int
+        Number of epochs of rolling window, None for the whole series.
+
+    Returns
+    -------
+    median : numpy array
+        Median, broadcastable against R.
+    iqr : numpy array
+        Interquartile range, broadcastable against R.
+    """
+
+    if window is None:
+        q1, median, q3 = np.nanpercentile(R, [25, 50, 75], axis=0)
+    else:
+        #   Pad with NaN's so every epoch is the centre of a window
+        h = window // 2
+        pad = np.full((h, R.shape[1]), np.nan)
+        V = sliding_window_view(np.vstack((pad, R, pad)), 2*h+1, axis=0)
+        q1, median, q3 = np.nanpercentile(V, [25, 50, 75], axis=-1)
+
+    return median, q3 - q1
+
+
+def find_outliers(X, H, IQ_factor=3.0, window=None, max_iterations=50):
+    """
+    find_outliers :
+        Iteratively fits H to every series by ordinary least-squares and
+        flags residuals further than 'IQ_factor' interquartile ranges from
+        the median. The normal equations are formed once and each iteration
+        only subtracts the rows of the new outliers (rank downdate).
+
+    Parameters
+    ----------
+    X : numpy array
+        Observations, one column per series (may contain NaN's).
+    H : numpy array
+        Design matrix.
+    IQ_factor : float
+        Number of interquartile ranges.
+    window : int
+        Number of epochs of rolling window, None for the whole series.
+    max_iterations : int
+        Maximum number of refits.
+
+    Returns
+    -------
+    outliers : numpy array
+        True where an observation is an outlier.
+    """
+
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X[:,None]
+    observed = ~np.isnan(X)
+
+    #   Normal equations of every series, H'WH and H'Wx with W the observed rows
+    W = observed.astype(float)
+    N = np.einsum('mp,mi,mj->pij', W, H, H)
+    b = np.where(observed, X, 0.0).T @ H
+
+    for iteration in range(0, max_iterations):
+        try:
+            theta = np.linalg.solve(N, b[:,:,None])[:,:,0]
+        except np.linalg.LinAlgError:
+            theta = np.einsum('pij,pj->pi', np.linalg.pinv(N), b)
+
+        R = np.where(observed, X - H @ theta.T, np.nan)
+        median, iqr = residual_statistics(R, window)
+        new = observed & (np.abs(R - median) > IQ_factor*iqr)
+        if not np.any(new):
+            break
+
+        #   Remove outliers from the normal equations
+        V = new.astype(float)
+        N -= np.einsum('mp,mi,mj->pij', V, H, H)
+        b -= np.where(new, X, 0.0).T @ H
+        observed &= ~new
+
+    return ~observed & ~np.isnan(X)
+
+
+def removeoutliers(o, IQ_factor=None, window=None):
+    """
+    removeoutliers :
+        Replaces the outliers in the timeseries of Observations 'o' by NaN's.
+        The design matrix has the trend, the periodic signals, offsets and
+        postseismic relaxations switched on in the control file.
+
+    Parameters
+    ----------
+    o : Observations
+        Observations with loaded control and observations file.
+    IQ_factor : float
+        Number of interquartile ranges, by default 'IQ_factor' of control file.
+    window : int
+        Number of epochs of rolling window, None for the whole series.
+
+    Returns
+    -------
+    n_outliers : int
+        Number of removed outliers.
+    """
+
+    control = o.get_control_dict()
+    if IQ_factor is None:
+        IQ_factor = float(control['IQ_factor']) if 'IQ_factor' in control else 3.0
+
+    outliers = find_outliers(o.get_values(), create_trajectory(o), IQ_factor, window)[:,0]
+    o.ts_set_nans(outliers)
+
+    return int(np.sum(outliers))
+
+
+def clean_file(args):
+    """
+    Pool worker, removes the outliers of one file and writes it in the same format.\n
+    """
+    ctl_file, obs_file, output_file, window = args
+    return update_file(removeoutliers, ctl_file, obs_file, output_file, None, window)
+
+
+def clean_folder(ctl_file, folder, existing_folder, folder_name='pre_files', window=None, processes=1):
+    """
+    clean_folder :
+        Removes the outliers of every observations file (.json or .npz) in
+        'folder' and writes the cleaned files in a new folder.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file used for all files.
+    folder : str
+        Folder searched for observations files.
+    existing_folder : str
+        Folder where the output folder is created.
+    folder_name : str
+        Name of output folder.
+    window : int
+        Number of epochs of rolling window, None for the whole series.
+    processes : int
+        Number of worker processes.
+
+    Returns
+    -------
+    n_outliers : dict
+        Pairs 'output file' : number of removed outliers.
+    """
+
+    return map_folder(clean_file, ctl_file, folder, existing_folder, folder_name, (window,), processes=processes)
+
+
+if __name__ == '__main__':
+
+    #   removeoutliers.py control.json observations.json output.json
+    #   removeoutliers.py control.json folder output_folder [processes]
+    run_file_or_folder('removeoutliers.py', clean_file, clean_folder, '{0:d} outliers', (None,))
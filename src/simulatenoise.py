@@ -0,0 +1,228 @@
+import os, sys, math
+import numpy as np
+from Covariance import Covariance
+from Observations import Observations
+from support_batch import map_tasks
+from support_readwrite import writeObservations
+
+#   Simulation of noise models, one independent random stream per simulation
+
+
+def impulse_response(cov, i, k, param, n):
+    """
+    impulse_response :
+        First n coefficients of the impulse response (1-phi B)^(-d) of
+        noise model i, or None when the model is only defined by its
+        autocovariance.
+
+    Parameters
+    ----------
+    cov : Covariance
+        Noise models.
+    i : int
+        Index of noise model.
+    k : int
+        Index of its parameters in 'param'.
+    param : numpy array
+        Noise parameters.
+    n : int
+        Number of coefficients.
+
+    Returns
+    -------
+    h : numpy array
+        Impulse response.
+    """
+
+    noisemodel = cov.noisemodels[i]
+    if noisemodel == 'Powerlaw':
+        d, phi = -0.5*param[k], 1.0
+    elif noisemodel == 'Flicker':
+        d, phi = -0.5*Covariance.FLICKER_KAPPA, 1.0
+    elif noisemodel == 'GGM':
+        d, phi = -0.5*param[k], cov.phi
+    elif noisemodel == 'FlickerGGM':
+        d, phi = 0.5, cov.phi
+    elif noisemodel == 'RandomWalkGGM':
+        d, phi = 1.0, cov.phi
+    elif noisemodel == 'PowerlawApprox':
+        h = np.zeros(n)
+        h_L = cov.create_PowerlawApprox_h(k, param)[0:n]
+        h[0:len(h_L)] = h_L
+        return h
+    else:
+        return None
+
+    #   h[j] = (j - 1 + d)/j * phi * h[j-1]
+    j = np.arange(1, n)
+    h = np.ones(n)
+    h[1:] = (j - 1.0 + d)/j * phi
+
+    return np.cumprod(h)
+
+
+def circulant_embedding(t, rng):
+    """
+    circulant_embedding :
+        Stationary Gaussian noise with autocovariance 't', by embedding the
+        Toeplitz covariance matrix in a circulant matrix of size 2(m-1).
+
+    Parameters
+    ----------
+    t : numpy array
+        First row of covariance matrix.
+    rng : numpy Generator
+        Random number generator.
+
+    Returns
+    -------
+    y : numpy array
+        Noise of length len(t).
+    """
+
+    m = len(t)
+    if m < 3:
+        return rng.standard_normal(m) * math.sqrt(t[0])
+
+    #   Eigenvalues of circulant matrix, tiny negative values are rounding
+    c = np.concatenate((t, t[m-2:0:-1]))
+    N = len(c)
+    lam = np.fft.fft(c).real
+    if np.min(lam) < -1.0e-8*np.max(lam):
+        print('Circulant embedding is not positive definite, try a longer series')
+        sys.exit(0)
+    lam = np.maximum(lam, 0.0)
+
+    #   Real and imaginary parts are two independent realisations, keep one
+    z = rng.standard_normal(N) + 1j*rng.standard_normal(N)
+    y = np.fft.fft(np.sqrt(lam/N) * z)
+
+    return y.real[0:m]
+
+
+def simulate(cov, param, sigma_eta, m, timenoisestart, rng):
+    """
+    simulate :
+        Sum of the noise models, each driven by its own white noise.
+        Models with an impulse response are filtered by FFT from
+        'timenoisestart' samples before the first epoch, the others are
+        generated by circulant embedding.
+
+    Parameters
+    ----------
+    cov : Covariance
+        Noise models.
+    param : numpy array
+        Noise parameters as estimated by MLE.
+    sigma_eta : float
+        Driving noise.
+    m : int
+        Number of points.
+    timenoisestart : int
+        Number of samples of warm-up.
+    rng : numpy Generator
+        Random number generator.
+
+    Returns
+    -------
+    y : numpy array
+        Simulated noise.
+    """
+
+    n = m + timenoisestart
+    y = np.zeros(m)
+    k = cov.Nmodels-1
+    for i in range(0, cov.Nmodels):
+        fraction = cov.compute_fraction(i, param)
+        h = impulse_response(cov, i, k, param, n)
+        if cov.noisemodels[i] == 'White':
+            y_i = rng.standard_normal(m)
+        elif h is not None:
+            w = rng.standard_normal(n)
+            y_i = np.fft.irfft(np.fft.rfft(h, 2*n) * np.fft.rfft(w, 2*n), 2*n)[timenoisestart:n]
+        else:
+            method = getattr(cov, 'create_{0:s}_t'.format(cov.noisemodels[i]))
+            y_i = circulant_embedding(method(m, k, param), rng)
+        y += math.sqrt(fraction) * y_i
+        k += cov.Nparam_model[i]
+
+    return sigma_eta * y
+
+
+def simulate_file(args):
+    """
+    Pool worker, simulates one series and writes it.\n
+    """
+    cov, param, sigma_eta, m, timenoisestart, sp, mjd0, seed, filepath = args
+    rng = np.random.default_rng(seed)
+    y = simulate(cov, param, sigma_eta, m, timenoisestart, rng)
+    header = {'Sampling period' : sp, 'Offsets' : [], 'Log' : [], 'Exp' : []}
+    writeObservations(header, mjd0 + sp*np.arange(0, m), y, filepath)
+    return filepath
+
+
+def simulatenoise(ctl_file, param, sigma_eta, seed=None, processes=1, mjd0=51544.0):
+    """
+    simulatenoise :
+        Runs the simulations described in 'ctl_file' ('SimulationDir',
+        'SimulationLabel', 'NumberOfSimulations', 'NumberOfPoints',
+        'SamplingPeriod', 'TimeNoiseStart', 'NoiseModels') and writes each
+        one to a binary observations file.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file.
+    param : numpy array
+        Noise parameters as estimated by MLE.
+    sigma_eta : float
+        Driving noise.
+    seed : int
+        Seed of the random streams, simulations are reproducible when set.
+    processes : int
+        Number of worker processes.
+    mjd0 : float
+        Epoch of first point.
+
+    Returns
+    -------
+    filepaths : list
+        Paths to the written files.
+    """
+
+    o = Observations(ctl_file, None)
+    o.load_control()
+    control = o.get_control_dict()
+    cov = Covariance(o.get_noisemodels(), **o.get_noiseoptions())
+
+    param = np.array(param, dtype=float)
+    if len(param) != cov.get_Nparam():
+        print('Noise models need {0:d} parameters'.format(cov.get_Nparam()))
+        sys.exit(0)
+
+    n_sim = int(control['NumberOfSimulations'])
+    m = int(control['NumberOfPoints'])
+    sp = float(control['SamplingPeriod'])
+    timenoisestart = int(control['TimeNoiseStart']) if 'TimeNoiseStart' in control else 0
+    folder = control['SimulationDir'] if 'SimulationDir' in control else './'
+    label = control['SimulationLabel']
+
+    #   Independent streams, one per simulation
+    seeds = np.random.SeedSequence(seed).spawn(n_sim)
+    tasks = []
+    for i in range(0, n_sim):
+        filepath = os.path.join(folder, '{0:s}_{1:d}.npz'.format(label, i))
+        tasks.append((cov, param, sigma_eta, m, timenoisestart, sp, mjd0, seeds[i], filepath))
+
+    return map_tasks(simulate_file, tasks, processes)
+
+
+if __name__ == '__main__':
+
+    #   simulatenoise.py control.json sigma_eta [param ...]
+    if len(sys.argv) < 3:
+        print('Usage : simulatenoise.py control.json sigma_eta [param ...]')
+        sys.exit(0)
+
+    for filepath in simulatenoise(sys.argv[1], [float(p) for p in sys.argv[3:]], float(sys.argv[2])):
+        print(filepath)
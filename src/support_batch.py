@@ -0,0 +1,197 @@
+import os, sys
+import numpy as np
+from multiprocessing import Pool
+from Observations import Observations
+from CostModel import CostModel
+from DesignMatrix import DesignMatrix
+from support_conv import create_folder, search_files
+
+#   Steps shared by the scripts that process one observations file or every file of a folder
+
+
+def open_observations(ctl_file, obs_file):
+    """
+    open_observations :
+        Observations with loaded control and observations file.
+
+    Parameters
+    ----------
+    ctl_file : str
+        Path to control file.
+    obs_file : str
+        Path to observations file (.json or .npz).
+
+    Returns
+    -------
+    o : Observations
+        Loaded observations.
+    """
+
+    o = Observations(ctl_file, obs_file)
+    o.load_control()
+    o.load_observations()
+    return o
+
+
+def create_trajectory(o, offsets=None):
+    """
+    create_trajectory :
+        Design matrix of Observations 'o' with the trend, the periodic
+        signals, offsets and postseismic relaxations switched on in the
+        control file.
+
+    Parameters
+    ----------
+    o : Observations
+        Observations with loaded control and observations file.
+    offsets : list
+        Epochs of the offsets, by default the offsets that must be estimated
+        according to the control file.
+
+    Returns
+    -------
+    H : numpy array
+        Design matrix.
+    """
+
+    tsindexes = o.get_indexes()
+    if offsets is None:
+        offsets = o.get_estimated_offsets()
+    H = DesignMatrix.create_DesignMatrix(o.get_sp(), offsets, tsindexes, o.get_periods())
+    return np.hstack((H, DesignMatrix.create_postseismic(tsindexes, *o.get_postseismic())))
+
+
+def update_file(function, ctl_file, obs_file, output_file, *args):
+    """
+    update_file :
+        Applies 'function' to the observations of one file and writes them
+        in the same format.
+
+    Parameters
+    ----------
+    function : callable
+        Called as function(o, *args), modifies Observations 'o'.
+    ctl_file : str
+        Path to control file.
+    obs_file : str
+        Path to observations file.
+    output_file : str
+        Path to the written observations file.
+
+    Returns
+    -------
+    result : object
+        Value returned by 'function'.
+    """
+
+    o = open_observations(ctl_file, obs_file)
+    result = function(o, *args)
+    o.export_series(output_file)
+    return result
+
+
+def map_tasks(worker, tasks, processes=1):
+    """
+    map_tasks :
+        Applies 'worker' to every task, in a pool of processes when more
+        than one is asked for. The default memory budget of each worker is
+        its share of the physical memory (see CostModel.set_processes).
+
+    Parameters
+    ----------
+    worker : callable
+        Module level function, so that it can be sent to the pool.
+    tasks : list
+        Arguments of each call.
+    processes : int
+        Number of worker processes.
+
+    Returns
+    -------
+    results : list
+        Value returned by 'worker' for each task.
+    """
+
+    if processes > 1:
+        with Pool(processes, initializer=CostModel.set_processes, initargs=(processes,)) as pool:
+            return pool.map(worker, tasks)
+    return list(map(worker, tasks))
+
+
+def map_folder(worker, ctl_file, folder, existing_folder, folder_name, args=(), ftypes=('.json', '.npz'), extension=None, processes=1):
+    """
+    map_folder :
+        Applies 'worker' to every observations file in 'folder', with the
+        output files written in a new folder.
+
+    Parameters
+    ----------
+    worker : callable
+        Module level function called with (ctl_file, obs_file, output_file, *args).
+    ctl_file : str
+        Path to control file used for all files.
+    folder : str
+        Folder searched for observations files.
+    existing_folder : str
+        Folder where the output folder is created.
+    folder_name : str
+        Name of output folder.
+    args : tuple
+        Further arguments of 'worker'.
+    ftypes : tuple
+        File formats searched for.
+    extension : str
+        Extension of the output files, by default the one of the input file.
+    processes : int
+        Number of worker processes.
+
+    Returns
+    -------
+    results : dict
+        Pairs 'output file' : value returned by 'worker'.
+    """
+
+    output_folder = create_folder(existing_folder, folder_name)
+    tasks = []
+    for ftype in ftypes:
+        for fname, abspath in search_files(folder, ftype):
+            if extension is not None:
+                fname = os.path.splitext(fname)[0] + extension
+            tasks.append((ctl_file, abspath, os.path.join(output_folder, fname)) + tuple(args))
+
+    return dict(zip([task[2] for task in tasks], map_tasks(worker, tasks, processes)))
+
+
+def run_file_or_folder(script, file_worker, folder_function, message, args=()):
+    """
+    run_file_or_folder :
+        Command line of a script that processes one file or a folder,
+            script control.json observations.json output.json
+            script control.json folder output_folder [processes]
+
+    Parameters
+    ----------
+    script : str
+        Name of the script, shown in the usage.
+    file_worker : callable
+        Called with (ctl_file, obs_file, output_file, *args).
+    folder_function : callable
+        Called with (ctl_file, folder, existing_folder, folder_name, processes=processes),
+        returns pairs 'output file' : result.
+    message : str
+        Format of a result.
+    args : tuple
+        Further arguments of 'file_worker'.
+    """
+
+    if len(sys.argv) < 4:
+        print('Usage : {0:s} control.json (observations.json output.json | folder output_folder)'.format(script))
+        sys.exit(0)
+
+    if os.path.isdir(sys.argv[2]):
+        processes = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+        folder, name = os.path.split(os.path.abspath(sys.argv[3]))
+        for output_file, result in folder_function(sys.argv[1], sys.argv[2], folder, name, processes=processes).items():
+            print('{0:s} : {1:s}'.format(output_file, message.format(result)))
+    else:
+        print(message.format(file_worker((sys.argv[1], sys.argv[2], sys.argv[3]) + tuple(args))))
@@ -125,3 +125,36 @@ def x_printformat(theta, C_theta, ln_det_C, sigma_eta, offsets, cov_params, m):
     strlist.append('kappa : {0:f}\n'.format(cov_params[1]))
         
     return prettyformat(strlist)
+
+
+def profile_printformat(report):
+    """
+    profile_printformat :
+        Table of the stages, counters and optimizer trace length of a Profiler report.
+
+    Parameters
+    ----------
+    report : dict
+        Report returned by Profiler.report or Profiler.emit.
+
+    Returns
+    -------
+    table : str
+        One line per stage with its number of calls, total and mean time, then one line per counter.
+    """
+
+    lines = []
+    if report['label'] is not None:
+        lines.append('{0}\n'.format(report['label']))
+
+    total = sum(stage['seconds'] for stage in report['stages'].values())
+    for name, stage in sorted(report['stages'].items(), key=lambda item : -item[1]['seconds']):
+        share = 100.0*stage['seconds']/total if total > 0.0 else 0.0
+        lines.append('{0:12s} : {1:8d} calls {2:10.4f} s {3:10.6f} s/call {4:5.1f} %\n'.format( \
+                     name, stage['calls'], stage['seconds'], stage['seconds']/stage['calls'], share))
+
+    for name, value in sorted(report['counters'].items()):
+        lines.append('{0:12s} : {1}\n'.format(name, value))
+    lines.append('{0:12s} : {1} points\n'.format('trace', len(report['trace'])))
+
+    return ''.join(lines)
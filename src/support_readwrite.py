@@ -1,4 +1,5 @@
 import json, os, sys
+import numpy as np
 
 def readControl(filepath):
     """
@@ -39,6 +40,7 @@ def readObservations(filepath):
     readObservations :
         Read json file from filepath and parses its information into dictionaries.
         Information is expected to be from an observations' file.
+        Binary .npz files written by writeObservations and files written by writeColumns are read as well.
             
     Parameters
     ----------
@@ -59,8 +61,17 @@ def readObservations(filepath):
         if(os.path.exists(filepath) and filepath.endswith('.json')):
             fp = open(filepath, "r")
             header_dict = json.load(fp)
-            data_dict = header_dict.pop('Observations')
             fp.close()
+            if 'Columns' in header_dict:
+                return readColumnsAsRows(filepath)
+            data_dict = header_dict.pop('Observations')
+            return header_dict, data_dict
+        elif(os.path.exists(filepath) and filepath.endswith('.npz')):
+            with np.load(filepath) as data:
+                header_dict = json.loads(str(data['header']))
+                if 'Columns' in header_dict:
+                    return readColumnsAsRows(filepath)
+                data_dict = dict(zip(map(str, data['mjd'].tolist()), data['values'].tolist()))
             return header_dict, data_dict
         else:
             raise FileNotFoundError('Invalid file path for observations file.')
@@ -102,3 +113,234 @@ def writeToFile(dictionary, filepath):
     except Exception as e:
         print('Something unexpected ocurred :\n' + e)
         return False
+
+
+def writeObservations(header, mjd, values, filepath):
+    """
+    writeObservations :
+        Dumps an observations file into a binary .npz file format in 'filepath', readable by readObservations.
+
+    Parameters
+    ----------
+    header : dict
+        Dictionary with pairs 'Header' : Value, such as 'Sampling period' and 'Offsets'.
+    mjd : numpy array
+        Epochs of the observations.
+    values : numpy array
+        Observations, one row per epoch. May have the estimated value as second column.
+    filepath : path or str
+        Path to file where the observations will be stored.
+
+    Returns
+    -------
+    True or False :
+        Successful or unsuccessful operation.
+    """
+
+    try:
+        np.savez(filepath, header=json.dumps(header), mjd=np.asarray(mjd, dtype=float), \
+                 values=np.asarray(values, dtype=float))
+        return True
+
+    except Exception as e:
+        print('Something unexpected ocurred :\n' + str(e))
+        return False
+
+
+def writeArrays(arrays, filepath):
+    """
+    writeArrays :
+        Dumps the arrays in 'arrays' into a binary .npz file format in 'filepath'.
+
+    Parameters
+    ----------
+    arrays : dict
+        Dictionary of pairs 'Name' : numpy array.
+    filepath : path or str
+        Path to file where 'arrays' will be stored.
+
+    Returns
+    -------
+    True or False :
+        Successful or unsuccessful operation.
+    """
+
+    try:
+        np.savez(filepath, **arrays)
+        return True
+
+    except Exception as e:
+        print('Something unexpected ocurred :\n' + str(e))
+        return False
+
+
+def readArrays(filepath):
+    """
+    readArrays :
+        Read binary .npz file from filepath into a dictionary of arrays.
+
+    Parameters
+    ----------
+    filepath : str
+        The absolute filepath or relative from root to a .npz file.
+
+    Returns
+    -------
+    arrays : dict
+        Dictionary of pairs 'Name' : numpy array.
+    """
+
+    try:
+        if(os.path.exists(filepath) and filepath.endswith('.npz')):
+            with np.load(filepath) as data:
+                return {key : data[key] for key in data.files}
+        else:
+            raise FileNotFoundError('Invalid file path for binary file.')
+
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        sys.exit(0)
+
+
+def writeColumns(header, columns, filepath, blocksize=8192):
+    """
+    writeColumns :
+        Dumps a header and columns of equal length into 'filepath', one array per column instead of one entry per row.\n
+        A .json file is written while streaming the columns in blocks, without building the whole document in memory.\n
+        A .npz file is written in compressed binary format.
+
+    Parameters
+    ----------
+    header : dict
+        Dictionary with pairs 'Header' : Value, such as 'Sampling period' and 'Offsets'.
+    columns : dict
+        Dictionary of pairs 'Name' : numpy array, such as 'mjd', 'Value' and estimates.
+    filepath : path or str
+        Path to file where the header and columns will be stored.
+    blocksize : int
+        Number of values formatted at a time.
+
+    Returns
+    -------
+    True or False :
+        Successful or unsuccessful operation.
+    """
+
+    try:
+        header = dict(header, Columns=list(columns.keys()))
+        if filepath.endswith('.npz'):
+            np.savez_compressed(filepath, header=json.dumps(header), \
+                                **{'column{0:d}'.format(i) : np.asarray(v) for i, v in enumerate(columns.values())})
+            return True
+
+        with open(filepath, "w") as fp:
+            #   Header on the first line, then one line per column
+            fp.write(json.dumps(header)[:-1] + ',\n"Data": {')
+            for i, (name, values) in enumerate(columns.items()):
+                fp.write('{0:s}\n{1:s}: ['.format(',' if i > 0 else '', json.dumps(name)))
+                values = np.asarray(values)
+                for j in range(0, len(values), blocksize):
+                    fp.write((',' if j > 0 else '') + json.dumps(values[j:j+blocksize].tolist())[1:-1])
+                fp.write(']')
+            fp.write('}}\n')
+        return True
+
+    except Exception as e:
+        print('Something unexpected ocurred :\n' + str(e))
+        return False
+
+
+def readColumns(filepath):
+    """
+    readColumns :
+        Read an observations file of any format into its header and columns.\n
+        Accepts files written by writeColumns (.json or .npz), writeObservations (.npz) and writeToFile with pairs 'Date' : Value
+        or 'Date' : {'Column' : Value}.
+
+    Parameters
+    ----------
+    filepath : str
+        The absolute filepath or relative from root to an observations file.
+
+    Returns
+    -------
+    header_dict : dict
+        Dictionary with pairs 'Header' : Value.
+    columns : dict
+        Dictionary of pairs 'Name' : numpy array, 'mjd' and 'Value' first. A second value per date is named 'Estimate c++'.
+    """
+
+    if(os.path.exists(filepath) and filepath.endswith('.npz')):
+        with np.load(filepath) as data:
+            header_dict = json.loads(str(data['header']))
+            if 'Columns' in header_dict:
+                names = header_dict.pop('Columns')
+                return header_dict, {name : data['column{0:d}'.format(i)] for i, name in enumerate(names)}
+            mjd, values = data['mjd'], data['values']
+
+    elif(os.path.exists(filepath) and filepath.endswith('.json')):
+        with open(filepath, "r") as fp:
+            header_dict = json.load(fp)
+        if 'Columns' in header_dict:
+            names = header_dict.pop('Columns')
+            data = header_dict.pop('Data')
+            return header_dict, {name : np.array(data[name]) for name in names}
+
+        #   Pairs 'Date' : Value or 'Date' : [Value, Estimate]
+        rows = header_dict.pop('Observations')
+        mjd = np.array(list(rows.keys()), dtype=float)
+        values = list(rows.values())
+
+        #   Pairs 'Date' : {'Column' : Value}, every column named
+        if len(values) > 0 and isinstance(values[0], dict):
+            columns = {'mjd' : mjd}
+            for name in values[0]:
+                columns[name] = np.array([row.get(name, np.nan) for row in values], dtype=float)
+            return header_dict, columns
+
+        try:
+            values = np.array(values, dtype=float)
+        except ValueError:
+            #   Rows with and without estimates, only the values are kept
+            values = np.array([v[0] if isinstance(v, list) else v for v in values], dtype=float)
+
+    else:
+        print('Invalid file path for observations file.')
+        sys.exit(0)
+
+    columns = {'mjd' : np.asarray(mjd, dtype=float)}
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        columns['Value'] = values
+    else:
+        columns['Value'] = values[:, 0]
+        if values.shape[1] > 1:
+            columns['Estimate c++'] = values[:, 1]
+
+    return header_dict, columns
+
+
+def readColumnsAsRows(filepath):
+    """
+    readColumnsAsRows :
+        Read a file written by writeColumns into the dictionaries returned by readObservations.
+
+    Parameters
+    ----------
+    filepath : str
+        The absolute filepath or relative from root to a .json or .npz file.
+
+    Returns
+    -------
+    header_dict : dict
+        Dictionary with pairs 'Header' : Value.
+    data_dict : dict
+        Dictionary filled with observation values of pairs 'Date' : Value or 'Date' : [Value, Estimate].
+    """
+
+    header_dict, columns = readColumns(filepath)
+    mjd = columns.pop('mjd')
+    values = np.column_stack(list(columns.values())[0:2])
+    values = values[:, 0].tolist() if values.shape[1] == 1 else values.tolist()
+
+    return header_dict, dict(zip(map(str, mjd.tolist()), values))
@@ -1,10 +1,15 @@
 import math, sys
+import numpy as np
 from datetime import datetime
 
 #   Various date functionalities, regarding julian days
 #   From https://gist.github.com/jiffyclub/1294443
 #   Slightly modified
 
+#   MJD 0 and the length of a day, for whole arrays of epochs
+MJD_EPOCH = np.datetime64('1858-11-17T00:00:00', 'us')
+DAY_US = 86400000000
+
 def mjd_to_date(mjd):
     """
     mjd_to_date :
@@ -123,3 +128,68 @@ def mjd_to_datetime(mjd, isoformat):
         return date.isoformat()
         
     return date.strftime('%d/%m/%Y %H:%M:%S:%f')[:-3]
+
+
+def mjd_to_datetime64(mjd):
+    """
+    mjd_to_datetime64 :
+        Converts an array of Modified Julian Date values into datetime64 values, all at once.\n
+        Fractions of days are rounded to the nearest microsecond.
+
+    Parameters
+    ----------
+    mjd : array of float
+        Modified Julian Day values.
+
+    Returns
+    -------
+    dates : numpy array
+        Corresponding dates of dtype datetime64[us].
+    """
+
+    mjd = np.asarray(mjd, dtype=np.float64)
+
+    #   Whole days and fraction apart, the product mjd*DAY_US loses the microseconds
+    days = np.floor(mjd)
+    micro = days.astype(np.int64)*DAY_US + np.rint((mjd - days)*DAY_US).astype(np.int64)
+
+    return MJD_EPOCH + micro.astype('timedelta64[us]')
+
+
+def mjd_to_isostrings(mjd, isoformat=True):
+    """
+    mjd_to_isostrings :
+        Converts an array of Modified Julian Date values into date strings, all at once.\n
+        Same formats as mjd_to_datetime, whose julian day arithmetic may be a few microseconds off.
+
+    Parameters
+    ----------
+    mjd : array of float
+        Modified Julian Day values.
+    isoformat : bool
+        Flag as to wether result dates should be in ISO8601 format or in 'dd/mm/YYYY HH:MM:SS:mmm' format.
+
+    Returns
+    -------
+    dates : numpy array
+        Corresponding dates as strings.
+    """
+
+    dates = mjd_to_datetime64(mjd)
+
+    if isoformat:
+        #   Like datetime.isoformat, microseconds only when they are not zero
+        strings = np.datetime_as_string(dates, unit='s').astype('U26')
+        fraction = np.flatnonzero(dates != dates.astype('datetime64[s]'))
+        strings[fraction] = np.datetime_as_string(dates[fraction], unit='us')
+        return strings
+
+    #   'YYYY-MM-DDTHH:MM:SS.mmm' rearranged character by character
+    chars = np.datetime_as_string(dates, unit='ms').astype('S23').view(np.uint8).reshape(-1, 23)
+    order = [8, 9, 7, 5, 6, 4, 0, 1, 2, 3, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22]
+    chars = chars[:, order]
+    chars[:, [2, 5]] = ord('/')
+    chars[:, 10] = ord(' ')
+    chars[:, 19] = ord(':')
+
+    return np.ascontiguousarray(chars).view('S23').ravel().astype(str)
@@ -0,0 +1,67 @@
+import numpy as np
+from Covariance import Covariance
+
+
+#===============================================================================
+# Autocovariance against the integral of the PSD
+#===============================================================================
+
+#   Largest relative difference between t and the integral of the PSD accepted
+TOLERANCE = 1.0e-8
+
+#   Noise models with parameters, GGM_1mphi and PowerlawApprox_L keep the
+#   spectra smooth enough for the quadrature
+MODELS = [(['Powerlaw'], [-0.6]), (['White'], []), (['Flicker'], []), \
+          (['PowerlawApprox'], [-0.6]), (['GGM'], [-0.8]), (['FlickerGGM'], []), \
+          (['RandomWalkGGM'], []), (['ARMA'], [0.5, 0.3]), (['ARFIMA'], [0.5, 0.3, 0.2])]
+
+
+def quadrature(points=200, decades=16, panels=160):
+    """
+    Gauss-Legendre nodes and weights on (0, 0.5], on panels refined towards f=0.\n
+    """
+    x, w = np.polynomial.legendre.leggauss(points)
+    edges = np.concatenate(([0.0], 0.5*np.logspace(-decades, 0, panels+1)))
+    a, b = edges[:-1,None], edges[1:,None]
+    f = (0.5*(b - a)*x + 0.5*(a + b)).ravel()
+    return f, (0.5*(b - a)*w).ravel()
+
+
+def psd_variogram(cov, param, lags):
+    """
+    t[0] - t[j] = 2 int_0^0.5 G(f) (1 - cos(2 pi f j)) df, finite for every model including flicker noise.\n
+    """
+    f, w = quadrature()
+    G = cov.create_psd(f, param)
+    return 2.0*np.sum(w*G*(1.0 - np.cos(2.0*np.pi*np.outer(lags, f))), axis=1), 2.0*np.sum(w*G)
+
+
+def test_autocovariance_psd():
+    """
+    create_t and create_psd must describe the same noise: the variogram of t is the integral of the PSD,
+    and so is the variance of every model except flicker noise, whose variance is Powerlaw's at FLICKER_KAPPA.\n
+    """
+    lags = np.arange(0, 12)
+    for noisemodels, param in MODELS:
+        cov = Covariance(noisemodels, MA_q=1, GGM_1mphi=1.0e-2, PowerlawApprox_L=20)
+        param = np.array(param, dtype=float)
+        t = cov.create_t(200, param)[lags]
+        variogram, variance = psd_variogram(cov, param, lags)
+
+        error = np.max(np.abs(t[0] - t - variogram))/t[0]
+        print('{0} : variogram {1:.2e}, variance {2:.6f} / {3:.6f}'.format(noisemodels, error, t[0], variance))
+        assert error < TOLERANCE
+        if noisemodels != ['Flicker']:
+            assert abs(t[0] - variance)/t[0] < TOLERANCE
+
+    #   Flicker noise is power-law noise at FLICKER_KAPPA in time and frequency
+    cov = Covariance(['Flicker'])
+    f, w = quadrature(8, 4, 4)
+    assert np.array_equal(cov.create_Flicker_t(100, 0, []), cov.create_Powerlaw_t(100, 0, [Covariance.FLICKER_KAPPA]))
+    assert np.array_equal(cov.create_Flicker_psd(f, 0, []), cov.create_Powerlaw_psd(f, 0, [Covariance.FLICKER_KAPPA]))
+
+
+if __name__ == '__main__':
+
+    test_autocovariance_psd()
+    print('Autocovariances agree with the PSD within {0:g}'.format(TOLERANCE))
@@ -0,0 +1,81 @@
+import numpy as np
+from Covariance import Covariance
+from DesignMatrix import DesignMatrix
+from MLE import MLE
+from Matfree import Matfree
+from Toeplitz import Toeplitz
+
+
+#===============================================================================
+# Matfree against Fullcov
+#===============================================================================
+
+#   Largest difference of -logL, log(det(C)) and the parameters accepted
+TOLERANCE = 1.0e-6
+
+#   Largest difference of the stochastic log(det(C)) accepted
+SLQ_TOLERANCE = 0.25
+
+
+def synthetic(m=1500, share=0.2, seed=0):
+    """
+    Random walk plus white noise of m epochs with a share of random gaps.\n
+    """
+    rng = np.random.default_rng(seed)
+    x = 0.1*np.cumsum(rng.standard_normal(m)) + rng.standard_normal(m)
+    x[rng.random(m) < share] = np.nan
+    H = DesignMatrix.create_DesignMatrix(1.0, [], 51544.0 + np.arange(m), [365.25])
+    return x, H
+
+
+def test_matfree_fullcov():
+    """
+    Matfree and Fullcov must give the same likelihood, log(det(C)) and least-squares within TOLERANCE.\n
+    """
+    x, H = synthetic()
+    param = np.array([0.5, -0.5])
+
+    for noisemodels in [['RandomWalkGGM', 'White'], ['Powerlaw', 'White']]:
+        cov = Covariance(noisemodels)
+        results = {}
+        for min_method in ['Fullcov', 'Matfree']:
+            mle = MLE(x, None, min_method, H, cov)
+            t = mle.create_covariance(param)
+            [theta, C_theta, ln_det_C, sigma_eta] = mle.method.compute_leastsquares(t, H, x, mle.F)
+            results[min_method] = [mle.log_likelihood(param), ln_det_C, theta, sigma_eta]
+
+        exact, matfree = results['Fullcov'], results['Matfree']
+        print('{0} : -logL {1:.8f} / {2:.8f}, ln_det_C {3:.8f} / {4:.8f}'.format( \
+              noisemodels, exact[0], matfree[0], exact[1], matfree[1]))
+
+        assert abs(exact[0] - matfree[0]) < TOLERANCE
+        assert abs(exact[1] - matfree[1]) < TOLERANCE
+        assert np.max(np.abs(exact[2] - matfree[2])) < TOLERANCE
+        assert abs(exact[3] - matfree[3]) < TOLERANCE
+
+
+
+def test_matfree_slq():
+    """
+    The log(det(C)) estimated by stochastic Lanczos quadrature must be within SLQ_TOLERANCE of the exact one,
+    also with diagonal blocks of 64 gaps.\n
+    """
+    x, H = synthetic()
+    param = np.array([0.5, -0.5])
+
+    for noisemodels in [['RandomWalkGGM', 'White'], ['Powerlaw', 'White']]:
+        t = Covariance(noisemodels).create_t(len(x), param)
+        toeplitz = Toeplitz(t, ~np.isnan(x))
+        exact = Matfree().observed_logdet(toeplitz)
+        for chunk in [None, 64]:
+            slq = Matfree(chunk=chunk, logdet='slq').observed_logdet(toeplitz)
+            print('{0} : ln_det_C {1:.8f} / {2:.8f} (chunk {3})'.format(noisemodels, exact, slq, chunk))
+            assert abs(exact - slq) < SLQ_TOLERANCE
+
+
+if __name__ == '__main__':
+
+    test_matfree_fullcov()
+    print('Matfree agrees with Fullcov within {0:g}'.format(TOLERANCE))
+    test_matfree_slq()
+    print('Stochastic log(det(C)) agrees within {0:g}'.format(SLQ_TOLERANCE))
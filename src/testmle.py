@@ -1,9 +1,10 @@
 import os, time
-from support_print import x_printformat
+from support_print import x_printformat, profile_printformat
 from Observations import Observations
 from DesignMatrix import DesignMatrix
 from Covariance import Covariance
 from MLE import MLE
+from Profiler import Profiler
 
 
 #===============================================================================
@@ -89,8 +90,9 @@ obs.ts_append_results(Ohat, 'MLE_Fullcov')
 # MLE TEST 2
 # ---------------------------------------------- #
 
-#--- MLE
-mle2 = MLE(x, F, 'AmmarGrag', H, cov)
+#--- MLE, with stage timers
+profiler = Profiler(label='synthethic')
+mle2 = MLE(x, F, 'AmmarGrag', H, cov, profiler=profiler)
 print("Timing MLE ammar...\n")
 
 #--- run MLE
@@ -119,6 +121,7 @@ print("--- {0:8.3f} seconds ---\n".format(end_time - start_time))
 #   AmmarGrag results
 print(results2)
 print("--- {0:8.3f} seconds ---\n".format(end_time2 - start_time2))
+print(profile_printformat(profiler.report()))
 print(obs.timeseries.head(5))
 
 
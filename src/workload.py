@@ -0,0 +1,201 @@
+import os, sys
+import numpy as np
+from Covariance import Covariance
+from simulatenoise import simulate
+from support_batch import map_tasks
+from support_conv import create_folder
+from support_readwrite import readControl, writeToFile, writeObservations
+
+#   Synthetic observations of controlled size, trajectory and gap structure
+
+
+def generate_gaps(m, gaps, rng):
+    """
+    generate_gaps :
+        Mask of missing epochs, the union of the requested gap patterns.
+
+    Parameters
+    ----------
+    m : int
+        Number of epochs.
+    gaps : dict
+        Any of 'random' : fraction of epochs missing at random,
+        'blocks' : [number, length] of outages at random epochs and
+        'leading' : number of missing epochs at the start.
+    rng : numpy Generator
+        Random number generator.
+
+    Returns
+    -------
+    mask : numpy array
+        True where an epoch is missing.
+    """
+
+    mask = np.zeros(m, dtype=bool)
+    if gaps is None:
+        return mask
+
+    if 'random' in gaps:
+        mask |= rng.random(m) < float(gaps['random'])
+
+    if 'blocks' in gaps:
+        number, length = gaps['blocks']
+        starts = rng.integers(0, max(1, m - int(length)), int(number))
+        #   Every block as a range of indexes, all at once
+        i = (starts[:,None] + np.arange(0, int(length))[None,:]).ravel()
+        mask[i[i < m]] = True
+
+    if 'leading' in gaps:
+        mask[0:int(gaps['leading'])] = True
+
+    return mask
+
+
+def generate(m, rng, noisemodels=None, param=None, sigma_eta=1.0, sp=1.0, \
+             mjd0=51544.0, bias=0.0, trend=0.0, seasonal=None, offsets=0, offset_size=5.0, gaps=None, \
+             timenoisestart=1000, noiseoptions=None):
+    """
+    generate :
+        Observations with a linear trend, periodic signals, offsets at
+        random epochs and noise of the given noise models.
+
+    Parameters
+    ----------
+    m : int
+        Number of epochs.
+    rng : numpy Generator
+        Random number generator.
+    noisemodels : list
+        Noise models, as in the control file, by default ['Powerlaw', 'White'].
+    param : list
+        Noise parameters as estimated by MLE, by default [0.3, -0.6].
+    sigma_eta : float
+        Driving noise.
+    sp : float
+        Sampling period in days.
+    mjd0 : float
+        Epoch of first point.
+    bias : float
+        Value at first epoch.
+    trend : float
+        Trend per day.
+    seasonal : dict
+        Pairs period (days) : amplitude, the phases are random.
+    offsets : int
+        Number of offsets.
+    offset_size : float
+        Standard deviation of the offsets.
+    gaps : dict
+        Gap patterns, see generate_gaps.
+    timenoisestart : int
+        Number of samples of noise warm-up.
+    noiseoptions : dict
+        'AR_p', 'MA_q', 'GGM_1mphi' or 'PowerlawApprox_L' passed to Covariance.
+
+    Returns
+    -------
+    header : dict
+        'Sampling period', 'Offsets', 'Log' and 'Exp'.
+    mjd : numpy array
+        Epochs.
+    x : numpy array
+        Observations, NaN where missing.
+    """
+
+    if noisemodels is None:
+        noisemodels = ['Powerlaw', 'White']
+    if param is None:
+        param = [0.3, -0.6]
+    if noiseoptions is None:
+        noiseoptions = {}
+
+    cov = Covariance(noisemodels, **noiseoptions)
+    t = sp*np.arange(0, m, dtype=float)
+    x = bias + trend*t + simulate(cov, np.array(param, dtype=float), sigma_eta, m, timenoisestart, rng)
+
+    if seasonal is not None:
+        for period, amplitude in seasonal.items():
+            x += float(amplitude)*np.sin(2.0*np.pi*t/float(period) + rng.uniform(0.0, 2.0*np.pi))
+
+    #   Steps at distinct epochs, never the first one
+    epochs = []
+    if offsets > 0:
+        j = np.sort(rng.choice(np.arange(1, m), min(int(offsets), m-1), replace=False))
+        sizes = offset_size*rng.standard_normal(len(j))
+        x += np.cumsum(np.bincount(j, weights=sizes, minlength=m))
+        epochs = (mjd0 + t[j]).tolist()
+
+    x[generate_gaps(m, gaps, rng)] = np.nan
+    header = {'Sampling period' : sp, 'Offsets' : epochs, 'Log' : [], 'Exp' : []}
+
+    return header, mjd0 + t, x
+
+
+def write_workload(args):
+    """
+    Pool worker, generates one series and writes it in .json or .npz format.\n
+    """
+    case, seed, filepath = args
+    header, mjd, x = generate(rng=np.random.default_rng(seed), **case)
+    if filepath.endswith('.npz'):
+        writeObservations(header, mjd, x, filepath)
+    else:
+        header['Observations'] = dict(zip(map(str, mjd.tolist()), x.tolist()))
+        writeToFile(header, filepath)
+    return filepath
+
+
+def generate_workloads(cases, folder, fmt='npz', seed=None, processes=1):
+    """
+    generate_workloads :
+        Writes one observations file per case, each with its own random
+        stream so the workload is reproducible for a given seed.
+
+    Parameters
+    ----------
+    cases : list
+        Keyword arguments of generate (without 'rng'), a case with key
+        'count' is repeated that many times and 'name' sets its file names.
+    folder : str
+        Folder of the written files.
+    fmt : str
+        'npz' for binary files, 'json' for files like the test observations.
+    seed : int
+        Seed of the random streams.
+    processes : int
+        Number of worker processes.
+
+    Returns
+    -------
+    filepaths : list
+        Paths to the written files.
+    """
+
+    tasks = []
+    for i, case in enumerate(cases):
+        case = dict(case)
+        count = int(case.pop('count', 1))
+        name = case.pop('name', 'case{0:d}'.format(i))
+        for j in range(0, count):
+            tasks.append([case, None, os.path.join(folder, '{0:s}_{1:d}.{2:s}'.format(name, j, fmt))])
+
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    for task, s in zip(tasks, seeds):
+        task[1] = s
+
+    return map_tasks(write_workload, tasks, processes)
+
+
+if __name__ == '__main__':
+
+    #   workload.py workload.json existing_folder folder_name [processes]
+    #   workload.json : {"seed" : 0, "format" : "npz", "cases" : [{"count" : 10, "m" : 5000, ...}, ...]}
+    if len(sys.argv) < 4:
+        print('Usage : workload.py workload.json existing_folder folder_name [processes]')
+        sys.exit(0)
+
+    spec = readControl(sys.argv[1])
+    folder = create_folder(sys.argv[2], sys.argv[3])
+    processes = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    filepaths = generate_workloads(spec['cases'], folder, spec.get('format', 'npz'), spec.get('seed'), processes)
+    print('{0:d} files written in:\n{1}'.format(len(filepaths), folder))